@@ -0,0 +1,149 @@
+import types
+
+from PyQt6.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal, pyqtSlot
+
+from db import Database
+
+
+class BackgroundRequest(QObject):
+    """
+    Основа фоновых запросов: задача выполняется в пуле потоков, а ее результаты
+    передаются через post() в поток, где создан запрос (GUI-поток).
+    Запрос не удаляется сборщиком мусора, пока не вызван finish().
+    """
+    _active = set()  # Запросы, ожидающие доставки результата
+
+    # Испускается из рабочего потока, принимается в потоке запроса
+    _posted = pyqtSignal(object, object)
+
+    def __init__(self, owner: QObject = None):
+        super().__init__()
+        self._cancelled = False
+        self.done = False
+        self._posted.connect(self._run_posted)
+        BackgroundRequest._active.add(self)
+        # Если владелец удален, результат ему уже не нужен
+        if owner is not None:
+            owner.destroyed.connect(self.cancel)
+
+    def cancel(self):
+        """Отменяет запрос: задача проверяет is_cancelled() и может не выполняться"""
+        self._cancelled = True
+
+    def is_cancelled(self) -> bool:
+        return self._cancelled
+
+    def post(self, fn, *args):
+        """Вызывает fn(*args) в потоке запроса; можно вызывать из рабочего потока"""
+        self._posted.emit(fn, args)
+
+    @pyqtSlot(object, object)
+    def _run_posted(self, fn, args):
+        fn(*args)
+
+    def finish(self):
+        """Запрос завершен: больше ничего не будет доставлено"""
+        self.done = True
+        BackgroundRequest._active.discard(self)
+
+    @classmethod
+    def pending(cls) -> list:
+        """Незавершенные запросы этого типа"""
+        return [request for request in BackgroundRequest._active if isinstance(request, cls)]
+
+
+_shared_instances = {}  # (класс, id(db)) -> экземпляр
+
+
+def instance_for(cls, db: Database):
+    """Общий экземпляр cls(db) для экземпляра Database (один фасад или очередь на базу)"""
+    key = (cls, id(db))
+    instance = _shared_instances.get(key)
+    if instance is None or instance.db is not db:
+        instance = cls(db)
+        _shared_instances[key] = instance
+    return instance
+
+
+class DbRequest(BackgroundRequest):
+    """
+    Запрос к БД, выполняемый в фоновом потоке.
+    Результат доставляется в поток, где создан запрос (GUI-поток), через сигналы.
+    """
+    finished = pyqtSignal(object)  # Результат запроса
+    failed = pyqtSignal(str)       # Текст ошибки
+
+    def __init__(self, on_result=None, on_error=None, owner: QObject = None):
+        super().__init__(owner)
+        if on_result:
+            self.finished.connect(on_result)
+        if on_error:
+            self.failed.connect(on_error)
+
+    def _deliver_result(self, result):
+        self.finish()
+        if not self.is_cancelled():
+            self.finished.emit(result)
+
+    def _deliver_error(self, message):
+        self.finish()
+        if not self.is_cancelled():
+            print(f"Ошибка запроса к БД: {message}")
+            self.failed.emit(message)
+
+
+class _DbTask(QRunnable):
+    def __init__(self, request: DbRequest, fn, args, kwargs):
+        super().__init__()
+        self.request = request
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+
+    def run(self):
+        request = self.request
+        if request.is_cancelled():
+            request.post(request._deliver_result, None)
+            return
+        try:
+            result = self.fn(*self.args, **self.kwargs)
+            # Часть методов Database возвращает генераторы — вычисляем их здесь, а не в GUI-потоке
+            if isinstance(result, types.GeneratorType):
+                result = list(result)
+        except Exception as e:
+            request.post(request._deliver_error, str(e))
+        else:
+            request.post(request._deliver_result, result)
+
+
+class AsyncDatabase(QObject):
+    """
+    Асинхронный фасад над Database: запросы выполняются в выделенном пуле потоков,
+    каждый поток держит собственное соединение из пула соединений Database.
+    """
+    def __init__(self, db: Database, max_threads: int = 2):
+        super().__init__()
+        self.db = db
+        self.thread_pool = QThreadPool()
+        self.thread_pool.setMaxThreadCount(max_threads)
+        # Потоки не завершаются по таймауту, чтобы их соединения с БД оставались «теплыми»
+        self.thread_pool.setExpiryTimeout(-1)
+
+    @classmethod
+    def of(cls, db: Database) -> 'AsyncDatabase':
+        """Возвращает общий асинхронный фасад для экземпляра Database"""
+        return instance_for(cls, db)
+
+    def call(self, method, *args, on_result=None, on_error=None, owner: QObject = None, **kwargs) -> DbRequest:
+        """
+        Выполняет метод Database (имя метода или любую функцию) в фоновом потоке.
+        on_result(result) вызывается в GUI-потоке, если запрос не отменен.
+        """
+        fn = getattr(self.db, method) if isinstance(method, str) else method
+        request = DbRequest(on_result=on_result, on_error=on_error, owner=owner)
+        self.thread_pool.start(_DbTask(request, fn, args, kwargs))
+        return request
+
+    def wait_for_done(self, msecs: int = -1) -> bool:
+        """Ожидает завершения всех запросов (например, перед закрытием БД)"""
+        return self.thread_pool.waitForDone(msecs)
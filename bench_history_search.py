@@ -0,0 +1,181 @@
+# bench_history_search.py
+# Замер времени поиска по истории просмотров при росте истории одного пользователя.
+# Запуск: python bench_history_search.py [макс. размер истории]
+import os
+import random
+import sys
+import tempfile
+import time
+
+from db import Database
+
+
+CATALOG_SIZE = 100_000
+HISTORY_SIZES = [1_000, 10_000, 50_000, 100_000]
+# Частое слово, составной запрос и редкое слово (~0.4% каталога)
+QUERIES = ['кошки', 'гайд по', 'тема042']
+# Запросы, которые находятся и как начало слова, и внутри слов ("ст" — "стрим" и "история"),
+# и подстроки от трех символов внутри слов и имени автора (триграммный индекс):
+# новый поиск должен находить все видео, которые находил прежний LIKE
+MIXED_QUERIES = ['ст', 'ce', 'тор', 'hor_1']
+CHECK_HISTORY_SIZE = 5_000
+REPEATS = 20
+
+WORDS = [
+    'обзор', 'гайд', 'по', 'игре', 'музыка', 'стрим', 'кошки', 'собаки', 'рецепт', 'пирога',
+    'влог', 'путешествие', 'новости', 'история', 'наука', 'космос', 'фитнес', 'йога', 'лекция',
+    'tutorial', 'gameplay', 'review', 'music', 'travel', 'news', 'science', 'space', 'coding',
+]
+TOPICS = [f'тема{i:03d}' for i in range(500)]
+
+# Поиск по истории до перехода на VideoSearch — для сравнения
+LEGACY_QUERY = '''
+    SELECT DISTINCT
+        h.*,
+        v.*,
+        u.username,
+        u.pfp_path,
+        (
+            CASE WHEN LOWER(v.title) = ? THEN 50 ELSE 0 END
+            + CASE WHEN LOWER(v.title) LIKE ? THEN 30 ELSE 0 END
+            + CASE WHEN LOWER(v.title) LIKE ? THEN 15 ELSE 0 END
+            + CASE WHEN LOWER(u.username) = ? THEN 40 ELSE 0 END
+            + CASE WHEN LOWER(u.username) LIKE ? THEN 25 ELSE 0 END
+            + CASE WHEN LOWER(u.username) LIKE ? THEN 10 ELSE 0 END
+        ) as relevance_score
+    FROM History h
+    JOIN Videos v ON h.video_id = v.id
+    JOIN Users u ON v.user_id = u.id
+    LEFT JOIN VideoTags vt ON v.id = vt.video_id
+    LEFT JOIN Tags t ON vt.tag_id = t.id
+    WHERE
+        h.user_id = ?
+        AND (
+            LOWER(v.title) LIKE ?
+            OR LOWER(u.username) LIKE ?
+            OR LOWER(t.name) LIKE ?
+        )
+    GROUP BY h.id
+    HAVING relevance_score > 0
+    ORDER BY relevance_score DESC, h.watched_at DESC
+    LIMIT ?
+'''
+
+
+def legacy_search(db, user_id, query, limit=50):
+    query = query.strip().lower()
+    with db.get_connection() as conn:
+        return conn.execute(
+            LEGACY_QUERY,
+            (query, f'{query}%', f'%{query}%', query, f'{query}%', f'%{query}%',
+             user_id, f'%{query}%', f'%{query}%', f'%{query}%', limit)
+        ).fetchall()
+
+
+def fill_catalog(db, rng):
+    with db.get_connection() as conn:
+        author_ids = []
+        for i in range(50):
+            cursor = conn.execute(
+                'INSERT INTO Users (username, email, password) VALUES (?, ?, ?)',
+                (f'author_{i}', f'author_{i}@example.com', 'password')
+            )
+            author_ids.append(cursor.lastrowid)
+        conn.executemany(
+            '''
+            INSERT INTO Videos (user_id, title, description, video_path, thumbnail, duration)
+            VALUES (?, ?, ?, '', '', 60)
+            ''',
+            (
+                (
+                    rng.choice(author_ids),
+                    ' '.join(rng.choices(WORDS, k=2) + rng.choices(TOPICS, k=2)),
+                    ' '.join(rng.choices(WORDS, k=12))
+                )
+                for _ in range(CATALOG_SIZE)
+            )
+        )
+        viewer_id = conn.execute(
+            "INSERT INTO Users (username, email, password) VALUES ('viewer', 'viewer@example.com', 'password')"
+        ).lastrowid
+    return viewer_id
+
+
+def grow_history(db, user_id, video_ids, start, stop):
+    with db.get_connection() as conn:
+        conn.executemany(
+            '''
+            INSERT INTO History (user_id, video_id, watch_duration, watched_at)
+            VALUES (?, ?, 0, datetime('now', ?))
+            ''',
+            ((user_id, video_ids[i], f'-{i} minutes') for i in range(start, stop))
+        )
+
+
+def check_same_videos(db, user_id, queries):
+    """
+    Проверяет, что новый поиск находит все видео прежнего LIKE. Он может найти больше:
+    слова запроса ищутся в любом порядке ("гайд по" — и "по игре гайд").
+    Возвращает число запросов, для которых видео потеряны.
+    """
+    mismatches = 0
+    for query in queries:
+        legacy = {row['video_id'] for row in legacy_search(db, user_id, query, limit=CATALOG_SIZE)}
+        found = {row['video_id'] for row in db.search_user_history(user_id, query, limit=CATALOG_SIZE)}
+        lost = legacy - found
+        status = f'ПОТЕРЯНО {len(lost)}' if lost else 'все найдены'
+        print(f"проверка {query!r}: LIKE {len(legacy)}, поиск {len(found)} — {status}")
+        if lost:
+            mismatches += 1
+    return mismatches
+
+
+def measure(fn, *args):
+    timings = []
+    for _ in range(REPEATS):
+        started = time.perf_counter()
+        fn(*args)
+        timings.append(time.perf_counter() - started)
+    timings.sort()
+    return timings[len(timings) // 2] * 1000
+
+
+def main():
+    max_history = int(sys.argv[1]) if len(sys.argv) > 1 else HISTORY_SIZES[-1]
+    rng = random.Random(315)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db = Database(os.path.join(tmp_dir, 'bench.db'))
+        print(f"Заполнение каталога: {CATALOG_SIZE} видео...")
+        user_id = fill_catalog(db, rng)
+
+        # История из разных видео (как после cleanup_history_duplicates)
+        video_ids = list(range(1, CATALOG_SIZE + 1))
+        rng.shuffle(video_ids)
+
+        # Проверка на истории без тегов: прежний запрос отбрасывал совпадения только по тегу
+        grow_history(db, user_id, video_ids, 0, CHECK_HISTORY_SIZE)
+        if check_same_videos(db, user_id, MIXED_QUERIES + QUERIES):
+            db.close()
+            sys.exit(1)
+
+        print(f"{'история':>10} {'запрос':>10} {'найдено':>8} {'LIKE, мс':>10} {'FTS, мс':>10}")
+        filled = CHECK_HISTORY_SIZE
+        for size in HISTORY_SIZES:
+            if size > max_history:
+                break
+            if size < filled:
+                continue
+            grow_history(db, user_id, video_ids, filled, size)
+            filled = size
+            for query in QUERIES:
+                legacy_ms = measure(legacy_search, db, user_id, query)
+                indexed_ms = measure(db.search_user_history, user_id, query)
+                found = len(db.search_user_history(user_id, query, limit=CATALOG_SIZE))
+                print(f"{size:>10} {query:>10} {found:>8} {legacy_ms:>10.2f} {indexed_ms:>10.2f}")
+
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
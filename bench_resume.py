@@ -0,0 +1,130 @@
+# bench_resume.py
+# Замер продолжения просмотра: время от загрузки видео до первого кадра на сохраненной позиции.
+# Сравниваются прежний путь (play через 100 мс и setPosition сразу после setSource),
+# точная позиция после LoadedMedia и ближайший ключевой кадр после LoadedMedia (load_video).
+# Запуск: python bench_resume.py [видеофайлы...]; без аргументов — самые длинные видео из БД
+import os
+import sqlite3
+import sys
+import time
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+from PyQt6.QtCore import QEventLoop, QTimer, QUrl
+from PyQt6.QtMultimedia import QMediaPlayer, QVideoSink
+from PyQt6.QtWidgets import QApplication
+
+from media_probe import get_media_probe, nearest_keyframe_ms, probe_media
+
+
+REPEATS = 3
+POSITIONS = (0.25, 0.5, 0.9)   # Позиции продолжения, доля длительности
+LONGEST_VIDEOS = 3
+TIMEOUT_MS = 15000
+FRAME_TOLERANCE_MS = 50        # Кадр раньше цели на большее время считается лишним
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+MODES = {
+    'прежний': 'play через 100 мс, setPosition сразу',
+    'точная': 'LoadedMedia, setPosition(позиция)',
+    'ключевой': 'LoadedMedia, setPosition(ключевой кадр)',
+}
+
+
+def median(values):
+    values = sorted(values)
+    return values[len(values) // 2]
+
+
+def longest_videos(limit):
+    """Пути самых длинных видео из БД (только чтение, база не изменяется)"""
+    db_path = os.environ.get('VIDEO_PLATFORM_DB', os.path.join(ROOT, 'video_platform.db'))
+    conn = sqlite3.connect(f'file:{db_path}?mode=ro', uri=True)
+    try:
+        rows = conn.execute("SELECT video_path FROM Videos ORDER BY duration DESC").fetchall()
+    finally:
+        conn.close()
+    return [path for path, in rows if path and os.path.exists(path)][:limit]
+
+
+def measure(path, start_ms, mode):
+    """(мс до первого кадра на позиции, кадров показано до нее) или (None, ...) по таймауту"""
+    player = QMediaPlayer()
+    sink = QVideoSink()
+    player.setVideoOutput(sink)
+    loop = QEventLoop()
+    target = nearest_keyframe_ms(path, start_ms) if mode == 'ключевой' else start_ms
+    result = {'ms': None, 'early': 0}
+    started = time.perf_counter()
+
+    def on_frame(frame):
+        if not frame.isValid() or result['ms'] is not None:
+            return
+        if frame.startTime() // 1000 < target - FRAME_TOLERANCE_MS:
+            result['early'] += 1
+            return
+        result['ms'] = (time.perf_counter() - started) * 1000
+        loop.quit()
+
+    def on_status(status):
+        if mode != 'прежний' and status == QMediaPlayer.MediaStatus.LoadedMedia:
+            player.setPosition(target)
+            player.play()
+
+    sink.videoFrameChanged.connect(on_frame)
+    player.mediaStatusChanged.connect(on_status)
+    player.setSource(QUrl.fromLocalFile(path))
+    if mode == 'прежний':
+        QTimer.singleShot(100, player.play)
+        player.setPosition(start_ms)
+    QTimer.singleShot(TIMEOUT_MS, loop.quit)
+    loop.exec()
+
+    player.stop()
+    player.setSource(QUrl())
+    return result['ms'], result['early']
+
+
+def main():
+    app = QApplication(sys.argv)
+    paths = sys.argv[1:] or longest_videos(LONGEST_VIDEOS)
+    if not paths:
+        print("Нет видео для замера: передайте пути к файлам")
+        return
+
+    for name, description in MODES.items():
+        print(f"{name:>9}: {description}")
+
+    for path in paths:
+        info = probe_media(path)
+        if info is None or not info.duration_ms:
+            print(f"\n{path}: не удалось определить длительность, пропуск")
+            continue
+        started = time.perf_counter()
+        keyframes = get_media_probe().keyframes(path)
+        index_ms = (time.perf_counter() - started) * 1000
+        print(f"\n{os.path.basename(path)}: {info.duration_seconds} с, "
+              f"ключевых кадров в индексе: {len(keyframes) if keyframes else 'нет'} "
+              f"(чтение индекса {index_ms:.1f} мс)")
+
+        # Прогрев: первый запуск читает файл с диска и загружает плагины декодеров
+        measure(path, 0, 'точная')
+
+        print(f"{'позиция':>9} {'режим':>9} {'медиана, мс':>12} {'макс, мс':>10} {'лишних кадров':>14}")
+        for fraction in POSITIONS:
+            start_ms = int(info.duration_ms * fraction)
+            for mode in MODES:
+                runs = [measure(path, start_ms, mode) for _ in range(REPEATS)]
+                times = [ms for ms, _ in runs if ms is not None]
+                early = max(count for _, count in runs)
+                if not times:
+                    print(f"{start_ms // 1000:>8}с {mode:>9} {'таймаут':>12}")
+                    continue
+                print(f"{start_ms // 1000:>8}с {mode:>9} {median(times):>12.0f} "
+                      f"{max(times):>10.0f} {early:>14}")
+
+    app.quit()
+
+
+if __name__ == '__main__':
+    main()
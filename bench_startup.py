@@ -0,0 +1,87 @@
+# bench_startup.py
+# Замер холодного запуска приложения: время импорта модулей и этапов запуска
+# до заполнения ленты (см. startup_timing.py). Каждый запуск — отдельный процесс.
+# Запуск: python bench_startup.py [число запусков]
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+
+RUNS = 5
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+# Импорт окна без создания QApplication: какие тяжелые модули загружаются сразу
+IMPORT_PROBE = '''
+import json, sys, time
+started = time.perf_counter()
+import windows.main_window
+elapsed_ms = (time.perf_counter() - started) * 1000
+heavy = [name for name in ('cv2', 'PyQt6.QtMultimedia', 'PyQt6.QtMultimediaWidgets') if name in sys.modules]
+print(json.dumps({'import_ms': elapsed_ms, 'heavy': heavy}))
+'''
+
+
+def median(values):
+    values = sorted(values)
+    return values[len(values) // 2]
+
+
+def run_import_probe():
+    output = subprocess.run(
+        [sys.executable, '-c', IMPORT_PROBE], cwd=ROOT, capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def run_app(db_path):
+    env = dict(os.environ, VIDEO_PLATFORM_DB=db_path)
+    env.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    started = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, 'main.py', '--exit-after-startup'],
+        cwd=ROOT, env=env, capture_output=True, text=True, timeout=120
+    )
+    wall_ms = (time.perf_counter() - started) * 1000
+    for line in result.stdout.splitlines():
+        if line.startswith('STARTUP_REPORT '):
+            return json.loads(line[len('STARTUP_REPORT '):]), wall_ms
+    raise RuntimeError(f"Приложение не сообщило время запуска:\n{result.stdout}\n{result.stderr}")
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else RUNS
+
+    probe = run_import_probe()
+    print(f"Импорт windows.main_window: {probe['import_ms']:.1f} мс")
+    print(f"Тяжелые модули, загруженные при импорте: {', '.join(probe['heavy']) or 'нет'}")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        # Копия базы: запуск пишет служебные данные (AppMeta, очистка истории)
+        db_path = os.path.join(tmp_dir, 'bench.db')
+        shutil.copyfile(os.path.join(ROOT, 'video_platform.db'), db_path)
+
+        reports = []
+        for i in range(runs):
+            marks, wall_ms = run_app(db_path)
+            marks['процесс целиком'] = wall_ms
+            reports.append(marks)
+            # Первый запуск на свежей копии базы — холодный (миграции, заполнение категорий)
+            print(f"запуск {i + 1}{' (холодный)' if i == 0 else ''}: "
+                  f"лента заполнена за {marks.get('лента заполнена', float('nan')):.0f} мс")
+
+    phases = list(reports[0])
+    warm = reports[1:] or reports
+    print(f"\n{'этап':>24} {'холодный, мс':>14} {'медиана, мс':>12} {'мин, мс':>10}")
+    for phase in phases:
+        values = [report[phase] for report in warm if phase in report]
+        if not values:
+            continue
+        print(f"{phase:>24} {reports[0][phase]:>14.0f} {median(values):>12.0f} {min(values):>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
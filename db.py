@@ -1,6 +1,438 @@
+import os
+import re
+import json
+import base64
+import binascii
+import hashlib
+import heapq
 import sqlite3
 import datetime
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
 from typing import List, Optional, Tuple
+from urllib.request import pathname2url
+
+from media_store import MediaStore
+from migrations import migrate, RECENCY_SQL
+from queries import QUERIES, NamedQueryConnection
+from write_buffer import WriteBehindBuffer
+
+
+def fold_search_text(value):
+    """Нижний регистр с учетом кириллицы и замена ё -> е (так же индексируется VideoSearch)"""
+    if not isinstance(value, str):
+        return value
+    return value.lower().replace('ё', 'е')
+
+
+def normalize_search_text(text: str) -> str:
+    """Нормализует поисковый запрос для сравнения с названием и автором"""
+    return ' '.join(fold_search_text(text or '').split())
+
+
+def build_fts_query(text: str, columns: Optional[List[str]] = None) -> str:
+    """
+    Строит запрос FTS5 из пользовательского текста: каждое слово ищется по префиксу,
+    все слова должны встретиться. columns ограничивает поиск колонками VideoSearch.
+    Возвращает пустую строку, если слов нет.
+    """
+    # Подчеркивание — разделитель, как и в токенизаторе unicode61 (теги хранятся как tag_name)
+    tokens = re.findall(r'[^\W_]+', fold_search_text(text or ''))
+    if not tokens:
+        return ''
+    match_query = ' '.join(f'"{token}"*' for token in tokens)
+    if columns:
+        match_query = f"{{{' '.join(columns)}}} : ({match_query})"
+    return match_query
+
+
+# Справочник категорий: раздел -> подкатегории (в Categories хранятся подкатегории)
+VIDEO_CATEGORIES = {
+    "Образование и обучение": [
+        "Лекции и уроки",
+        "Научпоп",
+        "Языки и лингвистика",
+        "Онлайн-курсы",
+        "История и культура",
+        "Карьера и саморазвитие"
+    ],
+    "Развлечения": [
+        "Комедия и юмор",
+        "Шоу и челленджи",
+        "Интервью и подкасты",
+        "Реалити-контент",
+        "Мемы и скетчи",
+        "Анимация"
+    ],
+    "Фильмы и сериалы": [
+        "Трейлеры",
+        "Обзоры и реакции",
+        "Полнометражные фильмы",
+        "Сериалы",
+        "Короткометражки и независимые проекты"
+    ],
+    "Игры": [
+        "Геймплей и стримы",
+        "Обзоры игр",
+        "Гайды и советы",
+        "Киберспорт и турниры",
+        "Игровые новости"
+    ],
+    "Музыка": [
+        "Музыкальные клипы",
+        "Живые выступления",
+        "Каверы и ремиксы",
+        "Музыкальные подборки",
+        "Саундтреки"
+    ],
+    "Быт и хобби": [
+        "Кулинария",
+        "DIY и рукоделие",
+        "Дом и сад",
+        "Путешествия и влоги",
+        "Домашние животные"
+    ],
+    "Здоровье и спорт": [
+        "Тренировки и фитнес",
+        "Йога и медитация",
+        "Питание и диеты",
+        "Спортивные соревнования"
+    ],
+    "Мотивация и личностный рост": [
+        "Психология",
+        "Саморазвитие",
+        "Истории успеха",
+        "Философия и мышление"
+    ],
+    "Технологии и наука": [
+        "Гаджеты и обзоры техники",
+        "Программирование и IT",
+        "Искусственный интеллект",
+        "Научные открытия",
+        "Космос и астрономия"
+    ],
+    "Новости и общество": [
+        "Мировые и локальные новости",
+        "Аналитика и мнения",
+        "Социальные темы",
+        "Документальные видео"
+    ]
+}
+
+
+def categories_checksum(categories: dict) -> str:
+    """Контрольная сумма набора категорий (порядок не важен)"""
+    names = sorted(subcategory for category in categories.values() for subcategory in category)
+    raw = json.dumps(names, ensure_ascii=False).encode('utf-8')
+    return hashlib.sha1(raw).hexdigest()
+
+
+class Page(list):
+    """
+    Страница результатов: обычный список плюс next_cursor — непрозрачный токен
+    для запроса следующей страницы (None, если страница последняя).
+    """
+
+    def __init__(self, items=(), next_cursor: Optional[str] = None):
+        super().__init__(items)
+        self.next_cursor = next_cursor
+
+
+def encode_cursor(data) -> str:
+    """Упаковывает ключ последней строки страницы в токен продолжения"""
+    raw = json.dumps(data, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(token: str):
+    """Распаковывает токен продолжения, ValueError для поврежденного токена"""
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        return json.loads(raw.decode('utf-8'))
+    except (binascii.Error, UnicodeDecodeError, ValueError, TypeError):
+        raise ValueError("Некорректный курсор страницы")
+
+
+def keyset_page(rows, limit: int, key_columns, items=None) -> Page:
+    """
+    Собирает страницу из строк, отсортированных по key_columns.
+    Если страница заполнена, next_cursor — ключ ее последней строки.
+    items — что вернуть вместо самих строк (например, только ID).
+    """
+    next_cursor = None
+    if limit and limit > 0 and len(rows) == limit:
+        last = rows[-1]
+        next_cursor = encode_cursor([last[column] for column in key_columns])
+    return Page(rows if items is None else items, next_cursor)
+
+
+@dataclass
+class DatabaseConfig:
+    """
+    Настройки SQLite для конкретной установки: режим журнала, PRAGMA соединений
+    и обслуживание WAL. Передается в Database(config=...).
+    """
+    journal_mode: str = 'WAL'
+    # В режиме WAL NORMAL сохраняет целостность БД, fsync выполняется только при checkpoint
+    synchronous: str = 'NORMAL'
+    cache_size_kib: int = 16 * 1024           # Кэш страниц на каждое соединение
+    mmap_size: int = 128 * 1024 * 1024        # Чтение файла БД через отображение в память
+    temp_store: str = 'MEMORY'                # Временные таблицы и сортировки в памяти
+    busy_timeout_ms: int = 5000
+    # Кэш подготовленных выражений sqlite3 на соединение (по умолчанию 128):
+    # запросов в Database и триггеров миграций больше, кэш не должен вытеснять горячие запросы
+    cached_statements: int = 512
+    # Автоматический checkpoint при коммите — страховка, основной выполняется в фоне
+    wal_autocheckpoint_pages: int = 4000
+    checkpoint_interval: float = 30.0         # Секунды между фоновыми checkpoint
+    read_only_readers: bool = True            # Чтение через отдельные соединения mode=ro
+
+    def connection_pragmas(self) -> List[str]:
+        """PRAGMA, выполняемые на каждом новом соединении"""
+        return [
+            f'PRAGMA busy_timeout = {int(self.busy_timeout_ms)}',
+            f'PRAGMA cache_size = {-int(self.cache_size_kib)}',
+            f'PRAGMA mmap_size = {int(self.mmap_size)}',
+            f'PRAGMA temp_store = {self.temp_store}',
+        ]
+
+    def writer_pragmas(self) -> List[str]:
+        """PRAGMA соединения для записи (режим журнала хранится в самом файле БД)"""
+        return [
+            f'PRAGMA journal_mode = {self.journal_mode}',
+            f'PRAGMA synchronous = {self.synchronous}',
+            f'PRAGMA wal_autocheckpoint = {int(self.wal_autocheckpoint_pages)}',
+        ]
+
+
+def open_connection(db_path: str, config: DatabaseConfig, read_only: bool = False) -> sqlite3.Connection:
+    """Открывает соединение с SQLite и применяет настройки config"""
+    options = {
+        'timeout': config.busy_timeout_ms / 1000,
+        'cached_statements': config.cached_statements,
+        'factory': NamedQueryConnection,
+        # Соединение может перейти к другому потоку
+        'check_same_thread': False,
+    }
+    if read_only and db_path != ':memory:':
+        uri = f'file:{pathname2url(os.path.abspath(db_path))}?mode=ro'
+        conn = sqlite3.connect(uri, uri=True, **options)
+    else:
+        conn = sqlite3.connect(db_path, **options)
+    conn.row_factory = sqlite3.Row  # Для доступа к колонкам по имени
+    # Встроенный LOWER в SQLite понимает только ASCII
+    conn.create_function('fold_search', 1, fold_search_text, deterministic=True)
+    for pragma in config.connection_pragmas():
+        conn.execute(pragma)
+    if not read_only:
+        for pragma in config.writer_pragmas():
+            conn.execute(pragma)
+    return conn
+
+
+class WriterConnection:
+    """
+    Единственное соединение для записи. Потоки получают его по очереди (RLock),
+    транзакция фиксируется только на внешнем уровне вложенности.
+    """
+
+    def __init__(self, db_path: str, config: DatabaseConfig):
+        self.db_path = db_path
+        self.config = config
+        self._lock = threading.RLock()
+        self._conn = None
+        self._depth = 0
+        self._owner = None  # Поток, держащий открытую транзакцию
+
+        # Ожидание блокировки записи другими потоками
+        self.lock_waits = 0
+        self.lock_wait_ms = 0.0
+
+    def holds_transaction(self) -> bool:
+        """True, если текущий поток находится внутри транзакции записи"""
+        return self._owner == threading.get_ident()
+
+    @contextmanager
+    def connection(self):
+        if not self._lock.acquire(blocking=False):
+            started = time.perf_counter()
+            self._lock.acquire()
+            self.lock_waits += 1
+            self.lock_wait_ms += (time.perf_counter() - started) * 1000
+        try:
+            if self._conn is None:
+                self._conn = open_connection(self.db_path, self.config)
+            conn = self._conn
+            if self._depth == 0:
+                self._owner = threading.get_ident()
+            self._depth += 1
+            try:
+                yield conn
+            except BaseException:
+                self._depth -= 1
+                if self._depth == 0:
+                    self._owner = None
+                    conn.rollback()
+                raise
+            else:
+                self._depth -= 1
+                if self._depth == 0:
+                    self._owner = None
+                    conn.commit()
+        finally:
+            self._lock.release()
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+class ConnectionPool:
+    """
+    Пул постоянных соединений с SQLite для чтения.
+    Каждый поток получает собственное соединение и держит его между запросами,
+    освобожденные соединения (release) переиспользуются другими потоками.
+    """
+
+    def __init__(self, db_path: str, size: int = 5, health_check_interval: float = 30.0,
+                 config: DatabaseConfig = None, read_only: bool = False):
+        self.db_path = db_path
+        self.size = size  # Максимальное число свободных соединений в пуле
+        self.health_check_interval = health_check_interval
+        self.config = config or DatabaseConfig()
+        self.read_only = read_only
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._idle = []
+        self._connections = set()
+
+        # Счетчики попаданий/промахов пула
+        self.hits = 0
+        self.misses = 0
+        self.health_check_failures = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = open_connection(self.db_path, self.config, read_only=self.read_only)
+        with self._lock:
+            self.misses += 1
+            self._connections.add(conn)
+        return conn
+
+    def _discard(self, conn: sqlite3.Connection):
+        with self._lock:
+            self._connections.discard(conn)
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+
+    def _is_healthy(self, conn: sqlite3.Connection) -> bool:
+        try:
+            conn.execute('SELECT 1').fetchone()
+            return True
+        except sqlite3.Error:
+            with self._lock:
+                self.health_check_failures += 1
+            return False
+
+    def acquire(self) -> sqlite3.Connection:
+        """Возвращает соединение текущего потока, создавая его при необходимости"""
+        local = self._local
+        conn = getattr(local, 'conn', None)
+
+        if conn is not None:
+            # Внутри открытой транзакции соединение не проверяем
+            if local.depth > 0:
+                return conn
+            if time.monotonic() - local.checked_at < self.health_check_interval or self._is_healthy(conn):
+                local.checked_at = time.monotonic()
+                with self._lock:
+                    self.hits += 1
+                return conn
+            self._discard(conn)
+            conn = None
+
+        # Пробуем взять свободное соединение, освобожденное другим потоком
+        while conn is None:
+            with self._lock:
+                candidate = self._idle.pop() if self._idle else None
+            if candidate is None:
+                conn = self._connect()
+            elif self._is_healthy(candidate):
+                conn = candidate
+                with self._lock:
+                    self.hits += 1
+            else:
+                self._discard(candidate)
+
+        local.conn = conn
+        local.depth = 0
+        local.checked_at = time.monotonic()
+        return conn
+
+    @contextmanager
+    def connection(self):
+        """
+        Контекстный менеджер соединения. Транзакция фиксируется (или откатывается)
+        только на внешнем уровне вложенности, поэтому методы Database могут вызывать друг друга.
+        """
+        conn = self.acquire()
+        local = self._local
+        local.depth += 1
+        try:
+            yield conn
+        except BaseException:
+            local.depth -= 1
+            if local.depth == 0:
+                conn.rollback()
+            raise
+        else:
+            local.depth -= 1
+            if local.depth == 0:
+                conn.commit()
+
+    def release(self):
+        """Возвращает соединение текущего потока в пул (вызывать перед завершением потока)"""
+        local = self._local
+        conn = getattr(local, 'conn', None)
+        if conn is None or local.depth > 0:
+            return
+        local.conn = None
+        with self._lock:
+            if len(self._idle) < self.size:
+                self._idle.append(conn)
+                return
+        self._discard(conn)
+
+    def close_all(self):
+        """Закрывает все соединения пула"""
+        with self._lock:
+            connections = list(self._connections)
+            self._connections.clear()
+            self._idle.clear()
+        for conn in connections:
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
+        self._local = threading.local()
+
+    def stats(self) -> dict:
+        """Статистика использования пула"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / total if total else 0.0,
+                'health_check_failures': self.health_check_failures,
+                'open_connections': len(self._connections),
+                'idle_connections': len(self._idle),
+            }
 
 
 class Database:
@@ -9,15 +441,85 @@ class Database:
     SCORE_LIKE = 5.0
     SCORE_DISLIKE = -7.0
     SCORE_COMMENT = 2.0
+
+    # Как часто пересчитывать корзины актуальности в VideoScores (секунды)
+    RECENCY_REFRESH_INTERVAL = 15 * 60
     
-    def __init__(self, db_path: str = "video_platform.db"):
+    def __init__(self, db_path: str = "video_platform.db", pool_size: int = 5,
+                 health_check_interval: float = 30.0, flush_interval_ms: int = 1000,
+                 config: DatabaseConfig = None):
         self.db_path = db_path
+        self.config = config or DatabaseConfig()
+        self.queries = QUERIES  # Именованные запросы горячих путей (queries.py)
+        # Запись — через одно соединение, чтение — через пул соединений только для чтения
+        self.writer = WriterConnection(db_path, self.config)
+        self.pool = ConnectionPool(
+            db_path, size=pool_size, health_check_interval=health_check_interval,
+            config=self.config, read_only=self.config.read_only_readers
+        )
+        self._checkpoint_lock = threading.Lock()
+        self._checkpoint_conn = None
+        self._checkpointed_at = time.monotonic()
+        self._recency_refreshed_at = float('-inf')
+        self.write_buffer = WriteBehindBuffer(self, flush_interval_ms=flush_interval_ms)
+        # Загруженные видео и превью хранятся в каталоге media рядом с файлом БД
+        self.media_store = MediaStore(os.path.join(os.path.dirname(os.path.abspath(db_path)), 'media'))
         self.init_database()
 
     def get_connection(self):
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row  # Для доступа к колонкам по имени
-        return conn
+        """Соединение для записи (и для чтения внутри транзакции записи)"""
+        return self.writer.connection()
+
+    def read_connection(self):
+        """
+        Соединение для чтения из пула. Внутри транзакции записи текущего потока
+        возвращает соединение записи, чтобы видеть еще не зафиксированные изменения.
+        """
+        if self.writer.holds_transaction():
+            return self.writer.connection()
+        return self.pool.connection()
+
+    def release_connection(self):
+        """Возвращает соединение текущего потока в пул"""
+        self.pool.release()
+
+    def pool_stats(self) -> dict:
+        """Счетчики попаданий/промахов пула соединений и ожидания записи"""
+        stats = self.pool.stats()
+        stats['writer_lock_waits'] = self.writer.lock_waits
+        stats['writer_lock_wait_ms'] = self.writer.lock_wait_ms
+        return stats
+
+    def query_stats(self) -> dict:
+        """Время именованных запросов: первое выполнение на соединении против повторных"""
+        return self.queries.stats()
+
+    def add_query_hook(self, hook):
+        """hook(name, elapsed_ms, first) вызывается после каждого именованного запроса"""
+        self.queries.add_hook(hook)
+
+    def checkpoint(self, mode: str = 'PASSIVE') -> Optional[Tuple[int, int, int]]:
+        """
+        Переносит страницы из WAL в файл БД. Возвращает (busy, страниц в WAL, перенесено).
+        PASSIVE не ждет читателей и писателя, TRUNCATE вдобавок обнуляет файл WAL.
+        """
+        mode = mode.upper()
+        if mode not in ('PASSIVE', 'FULL', 'RESTART', 'TRUNCATE'):
+            raise ValueError(f"Неизвестный режим checkpoint: {mode}")
+        if self.config.journal_mode.upper() != 'WAL':
+            return None
+        with self._checkpoint_lock:
+            # Отдельное соединение: checkpoint не занимает соединение записи
+            if self._checkpoint_conn is None:
+                self._checkpoint_conn = open_connection(self.db_path, self.config)
+            result = self._checkpoint_conn.execute(f'PRAGMA wal_checkpoint({mode})').fetchone()
+            self._checkpointed_at = time.monotonic()
+            return tuple(result)
+
+    def checkpoint_if_due(self):
+        """Фоновый PASSIVE checkpoint раз в config.checkpoint_interval секунд"""
+        if time.monotonic() - self._checkpointed_at >= self.config.checkpoint_interval:
+            self.checkpoint('PASSIVE')
 
     def init_database(self):
         with self.get_connection() as conn:
@@ -170,7 +672,8 @@ class Database:
             '''
             )
 
-            conn.commit()
+            # Доводим схему существующей базы до актуальной версии (индексы и т.д.)
+            migrate(conn)
 
     # === МЕТОДЫ ДЛЯ РАБОТЫ С ПОЛЬЗОВАТЕЛЯМИ ===
     def create_user(self, username: str, email: str, password: str, pfp_path: str = None) -> int:
@@ -187,13 +690,13 @@ class Database:
 
     def get_user_info(self, user_id: int) -> Optional[sqlite3.Row]:
         """Получает пользователя по ID"""
-        with self.get_connection() as conn:
+        with self.read_connection() as conn:
             cursor = conn.cursor()
             cursor.execute('SELECT username, pfp_path, subscribers_count FROM Users WHERE id = ?', (user_id,))
             return cursor.fetchone()
     
     def get_user_nickname(self, user_id: int) -> Optional[str]:
-        with self.get_connection() as conn:
+        with self.read_connection() as conn:
             cursor = conn.cursor()
             cursor.execute('SELECT username FROM Users WHERE id = ?', (user_id,))
             result = cursor.fetchone()
@@ -202,7 +705,7 @@ class Database:
             return result[0]
     
     def get_user_subscribers_count(self, user_id: int) -> int:
-        with self.get_connection() as conn:
+        with self.read_connection() as conn:
             cursor = conn.cursor()
             cursor.execute('SELECT subscribers_count FROM Users WHERE id = ?', (user_id,))
             result = cursor.fetchone()
@@ -212,14 +715,14 @@ class Database:
 
     def get_user_by_username(self, username: str) -> Optional[sqlite3.Row]:
         """Получает пользователя по имени пользователя"""
-        with self.get_connection() as conn:
+        with self.read_connection() as conn:
             cursor = conn.cursor()
             cursor.execute('SELECT * FROM Users WHERE username = ?', (username,))
             return cursor.fetchone()
 
     def get_user_by_email(self, email: str) -> Optional[sqlite3.Row]:
         """Получает пользователя по email"""
-        with self.get_connection() as conn:
+        with self.read_connection() as conn:
             cursor = conn.cursor()
             cursor.execute('SELECT * FROM Users WHERE email = ?', (email,))
             return cursor.fetchone()
@@ -245,17 +748,68 @@ class Database:
             return cursor.lastrowid
     
     def delete_video(self, video_id: int):
-        """Удаляет видео по ID"""
+        """Удаляет видео по ID и файлы хранилища, на которые больше нет ссылок"""
+        with self.media_store.lock:
+            with self.get_connection() as conn:
+                conn.execute('DELETE FROM Videos WHERE id = ?', (video_id,))
+                orphans = self.take_unreferenced_media(conn)
+            # Файлы удаляются после фиксации транзакции: при откате они еще нужны
+            self.media_store.remove(orphans)
+
+    # === ХРАНИЛИЩЕ МЕДИА ===
+    def register_media_blob(self, digest: str, path: str, size: int):
+        """
+        Регистрирует файл хранилища (повторная регистрация того же содержимого ничего не меняет).
+        Ссылки на него считают триггеры Videos, поэтому вызывается в одной транзакции с записью видео.
+        """
         with self.get_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute('DELETE FROM Videos WHERE id = ?', (video_id,))
-            conn.commit()
-    
+            conn.execute(
+                'INSERT OR IGNORE INTO MediaBlobs (sha256, path, size) VALUES (?, ?, ?)',
+                (digest, path, size)
+            )
+
+    def get_video_thumbnails(self, video_id: int) -> dict:
+        """Варианты превью видео: {вариант: путь}"""
+        with self.read_connection() as conn:
+            rows = conn.execute(
+                'SELECT variant, path FROM VideoThumbnails WHERE video_id = ?', (video_id,)
+            ).fetchall()
+            return {row['variant']: row['path'] for row in rows}
+
+    def get_media_blob(self, digest: str) -> Optional[sqlite3.Row]:
+        with self.read_connection() as conn:
+            return conn.execute(
+                'SELECT sha256, path, size, ref_count FROM MediaBlobs WHERE sha256 = ?', (digest,)
+            ).fetchone()
+
+    def take_unreferenced_media(self, conn) -> List[str]:
+        """Удаляет записи файлов без ссылок и возвращает их пути (внутри транзакции записи)"""
+        rows = conn.execute('SELECT sha256, path FROM MediaBlobs WHERE ref_count <= 0').fetchall()
+        conn.executemany('DELETE FROM MediaBlobs WHERE sha256 = ?', [(row['sha256'],) for row in rows])
+        return [row['path'] for row in rows]
+
+    def collect_media_garbage(self) -> int:
+        """Удаляет файлы хранилища, на которые не ссылается ни одно видео. Возвращает их число"""
+        with self.media_store.lock:
+            with self.get_connection() as conn:
+                orphans = self.take_unreferenced_media(conn)
+            self.media_store.remove(orphans)
+        return len(orphans)
+
 
     def upload_video(self, user_id: int, file_path: str, thumbnail_path: str, title: str, 
-                 description: str, category: str, tags: List[str], duration: int) -> int:
-        """Загружает новое видео с указанными параметрами"""
+                 description: str, category: str, tags: List[str], duration: int,
+                 media_blobs: List[Tuple[str, str, int]] = (),
+                 thumbnail_variants: List[Tuple[str, str, int, int]] = ()) -> int:
+        """
+        Загружает новое видео с указанными параметрами.
+        media_blobs — файлы хранилища (sha256, путь, размер), на которые ссылается видео,
+        thumbnail_variants — варианты превью (вариант, путь, ширина, высота).
+        """
         with self.get_connection() as conn:
+            for digest, path, size in media_blobs:
+                self.register_media_blob(digest, path, size)
+
             cursor = conn.cursor()
             
             # Проверяем существование категории
@@ -277,6 +831,11 @@ class Database:
                 thumbnail=thumbnail_path,
                 duration=duration
             )
+
+            cursor.executemany(
+                'INSERT INTO VideoThumbnails (video_id, variant, path, width, height) VALUES (?, ?, ?, ?, ?)',
+                [(video_id, *variant) for variant in thumbnail_variants]
+            )
             
             # Обрабатываем теги
             for tag_name in tags:
@@ -292,20 +851,26 @@ class Database:
             return video_id
 
     def get_video_info(self, video_id: int) -> Optional[Tuple]:
-        with self.get_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute(
-                '''
-                SELECT u.username, v.title, v.video_path, v.description, v.views_count, v.upload_date, v.thumbnail, v.duration
-                FROM Videos v
-                JOIN Users u ON v.user_id = u.id
-                WHERE v.id = ?
-            ''', (video_id,)
-            )
+        with self.read_connection() as conn:
+            cursor = self.queries.execute(conn, 'video_info', (video_id,))
             return cursor.fetchone()
+
+    def get_videos_info_bulk(self, video_ids: List[int]) -> List[sqlite3.Row]:
+        """
+        Данные карточек для списка видео одним запросом (вместо get_video_info на каждое видео).
+        Порядок строк совпадает с порядком video_ids, несуществующие видео пропускаются.
+        """
+        video_ids = list(video_ids or [])
+        if not video_ids:
+            return []
+        with self.read_connection() as conn:
+            # Список ID передается одним JSON-параметром: нет лимита на число параметров,
+            # а ключ json_each задает исходный порядок
+            cursor = self.queries.execute(conn, 'videos_info_bulk', (json.dumps(video_ids),))
+            return cursor.fetchall()
     
     def get_video_profile_info(self, video_id: int) -> Optional[Tuple]:
-        with self.get_connection() as conn:
+        with self.read_connection() as conn:
             cursor = conn.cursor()
             cursor.execute(
                 '''
@@ -318,7 +883,7 @@ class Database:
             return cursor.fetchone()
     
     def get_video_path(self, video_id: int) -> Optional[str]:
-        with self.get_connection() as conn:
+        with self.read_connection() as conn:
             cursor = conn.cursor()
             cursor.execute(
                 '''
@@ -333,7 +898,7 @@ class Database:
             return None
     
     def get_video_description(self, video_id: int) -> Optional[str]:
-        with self.get_connection() as conn:
+        with self.read_connection() as conn:
             cursor = conn.cursor()
             cursor.execute(
                 '''
@@ -348,7 +913,7 @@ class Database:
             return None
 
     def get_20_videos_id(self):
-        with self.get_connection() as conn:
+        with self.read_connection() as conn:
             cursor = conn.cursor()
             cursor.execute(
                 '''
@@ -363,28 +928,27 @@ class Database:
                 return None
             return (i['id'] for i in result)
 
-    def get_videos_by_user(self, user_id: int, limit: int = 50) -> List[sqlite3.Row]:
-        """Получает видео пользователя"""
-        with self.get_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute(
-                '''
-                SELECT v.id
-                FROM Videos v
-                LEFT JOIN Users u ON v.user_id = u.id
-                WHERE v.user_id = ?
-                ORDER BY v.upload_date DESC
-                LIMIT ?
-            ''', (user_id, limit)
-            )
-            result = cursor.fetchall()
-            if not result:
-                return None
-            return (i['id'] for i in result)
+    def get_videos_by_user(self, user_id: int, limit: int = 50, with_info: bool = False,
+                           cursor: Optional[str] = None) -> Page:
+        """
+        Получает страницу видео пользователя, новые первыми.
+        with_info=True возвращает строки с данными карточек (как get_videos_info_bulk) вместо ID.
+        cursor — next_cursor предыдущей страницы.
+        """
+        name = 'videos_by_user_info' if with_info else 'videos_by_user'
+        params = {'user_id': user_id, 'limit': limit}
+        if cursor:
+            params['date'], params['id'] = decode_cursor(cursor)
+            name = f'{name}_after'
+
+        with self.read_connection() as conn:
+            result = self.queries.execute(conn, name, params).fetchall()
+        items = None if with_info else [row['id'] for row in result]
+        return keyset_page(result, limit, ('upload_date', 'id'), items)
 
     def get_popular_videos(self, limit: int = 20) -> List[sqlite3.Row]:
         """Получает популярные видео (по просмотрам)"""
-        with self.get_connection() as conn:
+        with self.read_connection() as conn:
             cursor = conn.cursor()
             cursor.execute(
                 '''
@@ -401,85 +965,31 @@ class Database:
                 return None
             return (i['id'] for i in result)
 
-    def search_videos(self, query: str, limit: int = 20) -> List[int]:
+    def search_videos(self, query: str, limit: int = 20, with_info: bool = False,
+                      cursor: Optional[str] = None) -> Page:
         """
-        Ищет видео по названию, автору и тегам с ранжированием результатов.
-        Возвращает список ID видео, отсортированных по релевантности.
+        Ищет видео по названию, автору, описанию и тегам через полнотекстовый индекс VideoSearch.
+        Возвращает страницу ID видео, отсортированных по релевантности,
+        или строк с данными карточек при with_info=True.
+        cursor — next_cursor предыдущей страницы.
         """
-        if not query or not query.strip():
-            return []
-            
-        query = query.strip().lower()
-        
-        with self.get_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute(
-                '''
-                SELECT DISTINCT
-                    v.id,
-                    v.title,
-                    u.username,
-                    v.views_count,
-                    -- Релевантность по совпадению
-                    (
-                        -- Точное совпадение в названии (50 баллов)
-                        CASE WHEN LOWER(v.title) = ? THEN 50 ELSE 0 END
-                        +
-                        -- Название начинается с запроса (30 баллов)
-                        CASE WHEN LOWER(v.title) LIKE ? THEN 30 ELSE 0 END
-                        +
-                        -- Название содержит запрос (15 баллов)
-                        CASE WHEN LOWER(v.title) LIKE ? THEN 15 ELSE 0 END
-                        +
-                        -- Точное совпадение автора (40 баллов)
-                        CASE WHEN LOWER(u.username) = ? THEN 40 ELSE 0 END
-                        +
-                        -- Автор начинается с запроса (25 баллов)
-                        CASE WHEN LOWER(u.username) LIKE ? THEN 25 ELSE 0 END
-                        +
-                        -- Автор содержит запрос (10 баллов)
-                        CASE WHEN LOWER(u.username) LIKE ? THEN 10 ELSE 0 END
-                        +
-                        -- Описание содержит запрос (5 баллов)
-                        CASE WHEN LOWER(v.description) LIKE ? THEN 5 ELSE 0 END
-                        +
-                        -- Популярность (логарифмическая, макс 5 баллов)
-                        CASE 
-                            WHEN v.views_count > 0 THEN MIN(5.0, LOG10(v.views_count + 1))
-                            ELSE 0
-                        END
-                    ) as relevance_score
-                FROM Videos v
-                JOIN Users u ON v.user_id = u.id
-                LEFT JOIN VideoTags vt ON v.id = vt.video_id
-                LEFT JOIN Tags t ON vt.tag_id = t.id
-                WHERE 
-                    LOWER(v.title) LIKE ?
-                    OR LOWER(u.username) LIKE ?
-                    OR LOWER(v.description) LIKE ?
-                    OR LOWER(t.name) LIKE ?
-                GROUP BY v.id
-                HAVING relevance_score > 0
-                ORDER BY relevance_score DESC, v.views_count DESC
-                LIMIT ?
-                ''',
-                (
-                    query,                    # точное совпадение названия
-                    f'{query}%',              # название начинается с
-                    f'%{query}%',             # название содержит
-                    query,                    # точное совпадение автора
-                    f'{query}%',              # автор начинается с
-                    f'%{query}%',             # автор содержит
-                    f'%{query}%',             # описание содержит
-                    f'%{query}%',             # WHERE: название
-                    f'%{query}%',             # WHERE: автор
-                    f'%{query}%',             # WHERE: описание
-                    f'%{query}%',             # WHERE: теги
-                    limit
-                )
-            )
-            results = cursor.fetchall()
-            return [row['id'] for row in results] if results else []
+        match_query = build_fts_query(query)
+        if not match_query:
+            return Page()
+
+        normalized = normalize_search_text(query)
+        params = {'query': normalized, 'match': match_query, 'limit': limit}
+        name = 'search_videos'
+        if cursor:
+            # Продолжаем после (relevance_score, views_count, id) последней строки
+            params['score'], params['views'], params['id'] = decode_cursor(cursor)
+            name = 'search_videos_after'
+
+        with self.read_connection() as conn:
+            results = self.queries.execute(conn, name, params).fetchall()
+
+        items = None if with_info else [row['id'] for row in results]
+        return keyset_page(results, limit, ('relevance_score', 'views_count', 'id'), items)
 
     def increment_views(self, video_id: int):
         """Увеличивает счетчик просмотров видео"""
@@ -553,7 +1063,7 @@ class Database:
 
     def get_user_like(self, video_id: int, user_id: int) -> Optional[bool]:
         """Получает реакцию пользователя на видео (True - лайк, False - дизлайк, None - нет реакции)"""
-        with self.get_connection() as conn:
+        with self.read_connection() as conn:
             cursor = conn.cursor()
             cursor.execute(
                 'SELECT is_like FROM Likes WHERE video_id = ? AND user_id = ?',
@@ -596,7 +1106,7 @@ class Database:
 
     def is_subscribed(self, subscriber_id: int, channel_id: int) -> bool:
         """Проверяет, подписан ли пользователь на канал"""
-        with self.get_connection() as conn:
+        with self.read_connection() as conn:
             cursor = conn.cursor()
             cursor.execute(
                 'SELECT 1 FROM Subscriptions WHERE subscriber_id = ? AND channel_id = ?',
@@ -606,7 +1116,7 @@ class Database:
 
     def get_user_subscriptions(self, user_id: int) -> List[sqlite3.Row]:
         """Получает каналы, на которые подписан пользователь"""
-        with self.get_connection() as conn:
+        with self.read_connection() as conn:
             cursor = conn.cursor()
             cursor.execute(
                 '''
@@ -621,7 +1131,7 @@ class Database:
 
     def get_channel_subscribers(self, channel_id: int) -> List[sqlite3.Row]:
         """Получает подписчиков канала"""
-        with self.get_connection() as conn:
+        with self.read_connection() as conn:
             cursor = conn.cursor()
             cursor.execute(
                 '''
@@ -646,93 +1156,49 @@ class Database:
             ''', (video_id, user_id, watch_duration)
             )
 
-    def get_user_history(self, user_id: int, limit: int = 50) -> List[sqlite3.Row]:
-        """Получает историю просмотров пользователя"""
-        with self.get_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute(
-                '''
-                SELECT h.*, v.*, u.username, u.pfp_path
-                FROM History h
-                JOIN Videos v ON h.video_id = v.id
-                JOIN Users u ON v.user_id = u.id
-                WHERE h.user_id = ?
-                ORDER BY h.watched_at DESC
-                LIMIT ?
-            ''', (user_id, limit)
-            )
-            return cursor.fetchall()
+    def get_user_history(self, user_id: int, limit: int = 50, cursor: Optional[str] = None) -> Page:
+        """Получает страницу истории просмотров пользователя (cursor — next_cursor предыдущей)"""
+        name = 'user_history'
+        params = {'user_id': user_id, 'limit': limit}
+        if cursor:
+            params['watched_at'], params['id'] = decode_cursor(cursor)
+            name = 'user_history_after'
+
+        with self.read_connection() as conn:
+            result = self.queries.execute(conn, name, params).fetchall()
+        return keyset_page(result, limit, ('watched_at', 'history_id'))
     
     def search_user_history(self, user_id: int, query: str, limit: int = 50) -> List[sqlite3.Row]:
         """
         Ищет видео в истории просмотров пользователя по названию, автору и тегам.
         Возвращает результаты с сортировкой по релевантности и дате просмотра.
+
+        Видео ищутся в истории пользователя (индекс History по user_id): запрос
+        как подстрока названия, автора или тега ("thon" в "python", индекс VideoSubstringSearch),
+        а также слова запроса по префиксу через индекс VideoSearch (в любом порядке).
+        Для каждого видео выбирается последний просмотр.
         """
-        if not user_id or not query or not query.strip():
+        if not user_id:
             return []
-            
-        query = query.strip().lower()
-        
-        with self.get_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute(
-                '''
-                SELECT DISTINCT
-                    h.*,
-                    v.*,
-                    u.username,
-                    u.pfp_path,
-                    (
-                        -- Точное совпадение в названии (50 баллов)
-                        CASE WHEN LOWER(v.title) = ? THEN 50 ELSE 0 END
-                        +
-                        -- Название начинается с запроса (30 баллов)
-                        CASE WHEN LOWER(v.title) LIKE ? THEN 30 ELSE 0 END
-                        +
-                        -- Название содержит запрос (15 баллов)
-                        CASE WHEN LOWER(v.title) LIKE ? THEN 15 ELSE 0 END
-                        +
-                        -- Точное совпадение автора (40 баллов)
-                        CASE WHEN LOWER(u.username) = ? THEN 40 ELSE 0 END
-                        +
-                        -- Автор начинается с запроса (25 баллов)
-                        CASE WHEN LOWER(u.username) LIKE ? THEN 25 ELSE 0 END
-                        +
-                        -- Автор содержит запрос (10 баллов)
-                        CASE WHEN LOWER(u.username) LIKE ? THEN 10 ELSE 0 END
-                    ) as relevance_score
-                FROM History h
-                JOIN Videos v ON h.video_id = v.id
-                JOIN Users u ON v.user_id = u.id
-                LEFT JOIN VideoTags vt ON v.id = vt.video_id
-                LEFT JOIN Tags t ON vt.tag_id = t.id
-                WHERE 
-                    h.user_id = ?
-                    AND (
-                        LOWER(v.title) LIKE ?
-                        OR LOWER(u.username) LIKE ?
-                        OR LOWER(t.name) LIKE ?
-                    )
-                GROUP BY h.id
-                HAVING relevance_score > 0
-                ORDER BY relevance_score DESC, h.watched_at DESC
-                LIMIT ?
-                ''',
-                (
-                    query,                    # точное совпадение названия
-                    f'{query}%',              # название начинается с
-                    f'%{query}%',             # название содержит
-                    query,                    # точное совпадение автора
-                    f'{query}%',              # автор начинается с
-                    f'%{query}%',             # автор содержит
-                    user_id,                  # WHERE: user_id
-                    f'%{query}%',             # WHERE: название
-                    f'%{query}%',             # WHERE: автор
-                    f'%{query}%',             # WHERE: теги
-                    limit
-                )
-            )
-            return cursor.fetchall()
+
+        normalized = normalize_search_text(query)
+        if not normalized:
+            return []
+        match_query = build_fts_query(query, columns=['title', 'author', 'tags'])
+        params = {
+            'match': match_query,
+            'query': normalized,
+            'substring': '"' + normalized.replace('"', '""') + '"',
+            'user_id': user_id,
+            'limit': limit,
+        }
+        name = 'search_user_history' if match_query else 'search_user_history_substring'
+        if len(normalized) < 3:
+            # Триграммный индекс не находит подстроки короче трех символов
+            name += '_short'
+
+        with self.read_connection() as conn:
+            return self.queries.execute(conn, name, params).fetchall()
 
     # === МЕТОДЫ ДЛЯ РАБОТЫ С КОММЕНТАРИЯМИ ===
     def add_comment(self, video_id: int, user_id: int, text: str) -> int:
@@ -747,20 +1213,20 @@ class Database:
             )
             return cursor.lastrowid
 
-    def get_video_comments(self, video_id: int) -> List[sqlite3.Row]:
-        """Получает комментарии к видео"""
-        with self.get_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute(
-                '''
-                SELECT c.*, u.username, u.pfp_path
-                FROM Comments c
-                JOIN Users u ON c.user_id = u.id
-                WHERE c.video_id = ?
-                ORDER BY c.created_at DESC
-            ''', (video_id,)
-            )
-            return cursor.fetchall()
+    def get_video_comments(self, video_id: int, limit: int = -1, cursor: Optional[str] = None) -> Page:
+        """
+        Получает комментарии к видео, новые первыми.
+        По умолчанию (limit=-1) все комментарии, иначе страница по limit (cursor — next_cursor предыдущей).
+        """
+        name = 'video_comments'
+        params = {'video_id': video_id, 'limit': limit}
+        if cursor:
+            params['created_at'], params['id'] = decode_cursor(cursor)
+            name = 'video_comments_after'
+
+        with self.read_connection() as conn:
+            result = self.queries.execute(conn, name, params).fetchall()
+        return keyset_page(result, limit, ('created_at', 'id'))
 
     # === МЕТОДЫ ДЛЯ РАБОТЫ С ТЕГАМИ ===
     def add_tag(self, name: str) -> int:
@@ -789,7 +1255,7 @@ class Database:
 
     def get_video_tags(self, video_id: int) -> List[sqlite3.Row]:
         """Получает теги видео"""
-        with self.get_connection() as conn:
+        with self.read_connection() as conn:
             cursor = conn.cursor()
             cursor.execute(
                 '''
@@ -816,117 +1282,71 @@ class Database:
 
     def get_all_categories_names(self) -> List[str]:
         """Получает все категории"""
-        with self.get_connection() as conn:
+        with self.read_connection() as conn:
             cursor = conn.cursor()
             cursor.execute('SELECT name FROM Categories ORDER BY name')
             return [row['name'] for row in cursor.fetchall()]
 
     # === ВСПОМОГАТЕЛЬНЫЕ МЕТОДЫ ===
-    def get_liked_videos(self, user_id: int) -> List[sqlite3.Row]:
-        """Получает лайкнутые видео пользователя"""
-        with self.get_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute(
-                '''
-                SELECT v.*, u.username, u.pfp_path
-                FROM Videos v
-                JOIN Likes l ON v.id = l.video_id
-                JOIN Users u ON v.user_id = u.id
-                WHERE l.user_id = ? AND l.is_like = 1
-                ORDER BY l.timestamp DESC
-            ''', (user_id,)
-            )
-            return cursor.fetchall()
+    def get_liked_videos(self, user_id: int, limit: int = -1, cursor: Optional[str] = None) -> Page:
+        """
+        Получает лайкнутые видео пользователя, последние лайки первыми.
+        По умолчанию (limit=-1) все видео, иначе страница по limit (cursor — next_cursor предыдущей).
+        """
+        name = 'liked_videos'
+        params = {'user_id': user_id, 'limit': limit}
+        if cursor:
+            params['liked_at'], params['id'] = decode_cursor(cursor)
+            name = 'liked_videos_after'
+
+        with self.read_connection() as conn:
+            result = self.queries.execute(conn, name, params).fetchall()
+        return keyset_page(result, limit, ('liked_at', 'like_id'))
     
     def delete_all_categories(self):
         with self.get_connection() as conn:
             cursor = conn.cursor()
             cursor.execute('DELETE FROM Categories')
-            conn.commit()
+            # Справочник придется заполнить заново при следующем create_categories
+            cursor.execute("DELETE FROM AppMeta WHERE key = 'categories_checksum'")
     
-    def create_categories(self):
-        self.delete_all_categories()
-        
-        video_categories = {
-            "Образование и обучение": [
-                "Лекции и уроки",
-                "Научпоп",
-                "Языки и лингвистика",
-                "Онлайн-курсы",
-                "История и культура",
-                "Карьера и саморазвитие"
-            ],
-            "Развлечения": [
-                "Комедия и юмор",
-                "Шоу и челленджи",
-                "Интервью и подкасты",
-                "Реалити-контент",
-                "Мемы и скетчи",
-                "Анимация"
-            ],
-            "Фильмы и сериалы": [
-                "Трейлеры",
-                "Обзоры и реакции",
-                "Полнометражные фильмы",
-                "Сериалы",
-                "Короткометражки и независимые проекты"
-            ],
-            "Игры": [
-                "Геймплей и стримы",
-                "Обзоры игр",
-                "Гайды и советы",
-                "Киберспорт и турниры",
-                "Игровые новости"
-            ],
-            "Музыка": [
-                "Музыкальные клипы",
-                "Живые выступления",
-                "Каверы и ремиксы",
-                "Музыкальные подборки",
-                "Саундтреки"
-            ],
-            "Быт и хобби": [
-                "Кулинария",
-                "DIY и рукоделие",
-                "Дом и сад",
-                "Путешествия и влоги",
-                "Домашние животные"
-            ],
-            "Здоровье и спорт": [
-                "Тренировки и фитнес",
-                "Йога и медитация",
-                "Питание и диеты",
-                "Спортивные соревнования"
-            ],
-            "Мотивация и личностный рост": [
-                "Психология",
-                "Саморазвитие",
-                "Истории успеха",
-                "Философия и мышление"
-            ],
-            "Технологии и наука": [
-                "Гаджеты и обзоры техники",
-                "Программирование и IT",
-                "Искусственный интеллект",
-                "Научные открытия",
-                "Космос и астрономия"
-            ],
-            "Новости и общество": [
-                "Мировые и локальные новости",
-                "Аналитика и мнения",
-                "Социальные темы",
-                "Документальные видео"
-            ]
-        }
+    def create_categories(self) -> bool:
+        """
+        Заполняет справочник категорий из VIDEO_CATEGORIES без удаления существующих:
+        id категорий не меняются, ссылки Videos.category_id остаются верными.
+        Если контрольная сумма набора совпадает с сохраненной, ничего не делает.
+        Возвращает True, если справочник пришлось обновлять.
+        """
+        checksum = categories_checksum(VIDEO_CATEGORIES)
+        if self.get_meta('categories_checksum') == checksum:
+            return False
+
+        with self.get_connection() as conn:
+            conn.executemany(
+                'INSERT OR IGNORE INTO Categories (name) VALUES (?)',
+                [(subcategory,) for category in VIDEO_CATEGORIES.values() for subcategory in category]
+            )
+            self.set_meta('categories_checksum', checksum)
+        return True
 
+    # === СЛУЖЕБНЫЕ ДАННЫЕ ===
+    def get_meta(self, key: str, default: Optional[str] = None) -> Optional[str]:
+        """Значение из служебной таблицы AppMeta"""
+        with self.read_connection() as conn:
+            row = conn.execute('SELECT value FROM AppMeta WHERE key = ?', (key,)).fetchone()
+            return row['value'] if row else default
 
-        for _, category in video_categories.items():
-            for subcategory in category:
-                self.add_category(subcategory)
+    def set_meta(self, key: str, value):
+        with self.get_connection() as conn:
+            conn.execute(
+                'INSERT INTO AppMeta (key, value) VALUES (?, ?) '
+                'ON CONFLICT(key) DO UPDATE SET value = excluded.value',
+                (key, str(value))
+            )
 
     def get_video_path(self, video_id):
         """Получает путь к видеофайлу"""
-        with self.get_connection() as conn:
+        with self.read_connection() as conn:
             cursor = conn.cursor()
             cursor.execute("SELECT video_path FROM Videos WHERE id=?", (video_id,))
             result = cursor.fetchone()
@@ -934,7 +1354,7 @@ class Database:
 
     def get_video_description(self, video_id):
         """Получает описание видео"""
-        with self.get_connection() as conn:
+        with self.read_connection() as conn:
             cursor = conn.cursor()
             cursor.execute("SELECT description FROM Videos WHERE id=?", (video_id,))
             result = cursor.fetchone()
@@ -942,7 +1362,7 @@ class Database:
 
     def get_author_subscribers(self, username):
         """Получает количество подписчиков автора по username"""
-        with self.get_connection() as conn:
+        with self.read_connection() as conn:
             cursor = conn.cursor()
             cursor.execute("SELECT subscribers_count FROM Users WHERE username=?", (username,))
             result = cursor.fetchone()
@@ -950,7 +1370,7 @@ class Database:
 
     def get_video_likes(self, video_id):
         """Получает количество лайков видео"""
-        with self.get_connection() as conn:
+        with self.read_connection() as conn:
             cursor = conn.cursor()
             cursor.execute("SELECT likes_count FROM Videos WHERE id=?", (video_id,))
             result = cursor.fetchone()
@@ -958,7 +1378,7 @@ class Database:
 
     def get_video_dislikes(self, video_id):
         """Получает количество дизлайков видео"""
-        with self.get_connection() as conn:
+        with self.read_connection() as conn:
             cursor = conn.cursor()
             cursor.execute("SELECT dislikes_count FROM Videos WHERE id=?", (video_id,))
             result = cursor.fetchone()
@@ -966,7 +1386,7 @@ class Database:
 
     def get_author_avatar_by_username(self, username):
         """Получает путь к аватару автора по username"""
-        with self.get_connection() as conn:
+        with self.read_connection() as conn:
             cursor = conn.cursor()
             cursor.execute("SELECT pfp_path FROM Users WHERE username=?", (username,))
             result = cursor.fetchone()
@@ -979,35 +1399,99 @@ class Database:
             
         with self.get_connection() as conn:
             cursor = conn.cursor()
-            # Ищем последнюю запись для этого видео (не старше 1 часа)
+            self._upsert_watch_history(cursor, user_id, video_id, watch_duration)
+
+    def _upsert_watch_history(self, cursor, user_id, video_id, watch_duration, watched_at=None):
+        """Обновляет запись истории за последний час или создает новую"""
+        if watched_at is None:
+            cursor.execute("SELECT datetime('now')")
+            watched_at = cursor.fetchone()[0]
+
+        # Ищем последнюю запись для этого видео (не старше 1 часа)
+        cursor.execute(
+            """
+            SELECT id, watched_at FROM History 
+            WHERE user_id=? AND video_id=? 
+            AND watched_at > datetime(?, '-1 hour')
+            ORDER BY watched_at DESC LIMIT 1
+            """,
+            (user_id, video_id, watched_at)
+        )
+        existing = cursor.fetchone()
+        
+        if existing:
+            # Обновляем существующую запись
+            cursor.execute(
+                "UPDATE History SET watch_duration=?, watched_at=? WHERE id=?",
+                (watch_duration, watched_at, existing['id'])
+            )
+        else:
+            # Создаем новую запись
             cursor.execute(
+                "INSERT INTO History (user_id, video_id, watch_duration, watched_at) VALUES (?, ?, ?, ?)",
+                (user_id, video_id, watch_duration, watched_at)
+            )
+
+    # === ОТЛОЖЕННАЯ ЗАПИСЬ ===
+    def queue_view(self, video_id: int):
+        """Засчитывает просмотр через буфер отложенной записи"""
+        self.write_buffer.add_view(video_id)
+
+    def queue_watch_history(self, user_id: int, video_id: int, watch_duration: int = 0):
+        """Обновляет историю просмотров через буфер отложенной записи"""
+        self.write_buffer.add_history(user_id, video_id, watch_duration)
+
+    def queue_preference_on_watch(self, user_id: int, video_id: int):
+        """Обновляет предпочтения при просмотре через буфер отложенной записи"""
+        self.write_buffer.add_preference(user_id, video_id, self.SCORE_WATCH_VIDEO)
+
+    def flush(self) -> int:
+        """Немедленно записывает все отложенные изменения"""
+        return self.write_buffer.flush()
+
+    def start_maintenance(self):
+        """Запускает фоновый поток записи: он же делает checkpoint WAL и пересчет актуальности"""
+        self.write_buffer.start()
+
+    def request_flush(self):
+        """Запускает запись отложенных изменений в фоновом потоке, не дожидаясь ее"""
+        self.write_buffer.request_flush()
+
+    def write_buffer_metrics(self) -> dict:
+        return self.write_buffer.metrics()
+
+    def apply_buffered_writes(self, views: dict, history: dict, preferences: list):
+        """
+        Применяет пачку отложенных изменений одной транзакцией.
+        views: {video_id: прирост}, history: {(user_id, video_id): (watch_duration, watched_at)},
+        preferences: [(user_id, video_id, score_delta)]
+        """
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+
+            cursor.executemany(
+                'UPDATE Videos SET views_count = views_count + ? WHERE id = ?',
+                [(count, video_id) for video_id, count in views.items()]
+            )
+
+            for (user_id, video_id), (watch_duration, watched_at) in history.items():
+                self._upsert_watch_history(cursor, user_id, video_id, watch_duration, watched_at)
+
+            # Как в update_user_preference: score не опускается ниже нуля после каждого изменения
+            cursor.executemany(
                 """
-                SELECT id, watched_at FROM History 
-                WHERE user_id=? AND video_id=? 
-                AND datetime(watched_at) > datetime('now', '-1 hour')
-                ORDER BY watched_at DESC LIMIT 1
+                INSERT INTO UserPreferences (user_id, category_id, score)
+                SELECT ?, category_id, MAX(0.0, ?)
+                FROM Videos
+                WHERE id = ? AND category_id IS NOT NULL
+                ON CONFLICT (user_id, category_id) DO UPDATE SET score = MAX(0.0, score + ?)
                 """,
-                (user_id, video_id)
+                [(user_id, delta, video_id, delta) for user_id, video_id, delta in preferences]
             )
-            existing = cursor.fetchone()
-            
-            if existing:
-                # Обновляем существующую запись
-                cursor.execute(
-                    "UPDATE History SET watch_duration=?, watched_at=datetime('now') WHERE id=?",
-                    (watch_duration, existing['id'])
-                )
-            else:
-                # Создаем новую запись
-                cursor.execute(
-                    "INSERT INTO History (user_id, video_id, watch_duration, watched_at) VALUES (?, ?, ?, datetime('now'))",
-                    (user_id, video_id, watch_duration)
-                )
-            conn.commit()
 
     def get_user_id_by_username(self, username):
         """Получает ID пользователя по username"""
-        with self.get_connection() as conn:
+        with self.read_connection() as conn:
             cursor = conn.cursor()
             cursor.execute("SELECT id FROM Users WHERE username=?", (username,))
             result = cursor.fetchone()
@@ -1015,7 +1499,7 @@ class Database:
     
     def get_watch_duration(self, user_id: int, video_id: int) -> int:
         """Получает сохраненное время просмотра видео"""
-        with self.get_connection() as conn:
+        with self.read_connection() as conn:
             cursor = conn.cursor()
             cursor.execute(
                 "SELECT watch_duration FROM History WHERE user_id=? AND video_id=? ORDER BY watched_at DESC LIMIT 1",
@@ -1024,28 +1508,53 @@ class Database:
             result = cursor.fetchone()
             return result['watch_duration'] if result else 0
     
-    def cleanup_history_duplicates(self):
-        """Очищает дубликаты в истории, оставляя только последнюю запись для каждого видео"""
-        with self.get_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute(
-                """
-                DELETE FROM History 
-                WHERE id NOT IN (
-                    SELECT MAX(id) 
-                    FROM History 
-                    GROUP BY user_id, video_id
+    def cleanup_history_duplicates(self, batch_size: int = 5000) -> int:
+        """
+        Очищает дубликаты в истории, оставляя только последнюю запись для каждого видео.
+
+        Работает инкрементально: в AppMeta хранится последний проверенный id истории,
+        проверяются только пары (пользователь, видео), у которых с тех пор появились записи.
+        Записи обрабатываются пачками по batch_size, каждая пачка — короткая транзакция,
+        поэтому очистку можно запускать в фоне, не блокируя запись надолго.
+        """
+        since = int(self.get_meta('history_dedup_last_id', 0))
+        with self.read_connection() as conn:
+            max_id = conn.execute('SELECT MAX(id) FROM History').fetchone()[0] or 0
+
+        deleted_count = 0
+        while since < max_id:
+            # Не выходим за MAX(id): более новые записи проверит следующий запуск
+            upper = min(since + batch_size, max_id)
+            with self.get_connection() as conn:
+                cursor = conn.execute(
+                    """
+                    DELETE FROM History
+                    WHERE id IN (
+                        SELECT h.id
+                        FROM (
+                            SELECT DISTINCT user_id, video_id
+                            FROM History
+                            WHERE id > :since AND id <= :upper
+                        ) AS touched
+                        JOIN History h ON h.user_id = touched.user_id AND h.video_id = touched.video_id
+                        WHERE h.id < (
+                            SELECT MAX(h2.id)
+                            FROM History h2
+                            WHERE h2.user_id = touched.user_id AND h2.video_id = touched.video_id
+                        )
+                    )
+                    """,
+                    {'since': since, 'upper': upper}
                 )
-                """
-            )
-            deleted_count = cursor.rowcount
-            conn.commit()
-            return deleted_count
+                deleted_count += cursor.rowcount
+                self.set_meta('history_dedup_last_id', upper)
+            since = upper
+        return deleted_count
 
     # Методы для работы с подписками
     def is_subscribed(self, subscriber_id: int, channel_id: int) -> bool:
         """Проверяет, подписан ли пользователь на канал"""
-        with self.get_connection() as conn:
+        with self.read_connection() as conn:
             cursor = conn.cursor()
             cursor.execute(
                 "SELECT id FROM Subscriptions WHERE subscriber_id=? AND channel_id=?",
@@ -1068,7 +1577,6 @@ class Database:
                     "UPDATE Users SET subscribers_count = subscribers_count + 1 WHERE id=?",
                     (channel_id,)
                 )
-                conn.commit()
             except sqlite3.IntegrityError:
                 pass
 
@@ -1085,13 +1593,10 @@ class Database:
                     "UPDATE Users SET subscribers_count = subscribers_count - 1 WHERE id=? AND subscribers_count > 0",
                     (channel_id,)
                 )
-                conn.commit()
-            else:
-                pass
 
     def get_channel_id_by_video(self, video_id: int) -> Optional[int]:
         """Получает ID канала (автора) по ID видео"""
-        with self.get_connection() as conn:
+        with self.read_connection() as conn:
             cursor = conn.cursor()
             cursor.execute("SELECT user_id FROM Videos WHERE id=?", (video_id,))
             result = cursor.fetchone()
@@ -1103,7 +1608,7 @@ class Database:
         Получает статус оценки пользователя для видео
         Возвращает: None (нет оценки), True (лайк), False (дизлайк)
         """
-        with self.get_connection() as conn:
+        with self.read_connection() as conn:
             cursor = conn.cursor()
             cursor.execute(
                 "SELECT is_like FROM Likes WHERE user_id=? AND video_id=?",
@@ -1159,8 +1664,6 @@ class Database:
                         "UPDATE Videos SET likes_count = likes_count - 1, dislikes_count = dislikes_count + 1 WHERE id=?",
                         (video_id,)
                     )
-            
-            conn.commit()
 
     def remove_like(self, user_id: int, video_id: int):
         """Убирает оценку пользователя с видео"""
@@ -1186,7 +1689,6 @@ class Database:
                         "UPDATE Videos SET dislikes_count = dislikes_count - 1 WHERE id=? AND dislikes_count > 0",
                         (video_id,)
                     )
-                conn.commit()
 
     # === МЕТОДЫ ДЛЯ РАБОТЫ С ПРЕДПОЧТЕНИЯМИ ПОЛЬЗОВАТЕЛЯ ===
     def update_user_preference(self, user_id: int, category_id: int, score_delta: float):
@@ -1218,12 +1720,10 @@ class Database:
                     "INSERT INTO UserPreferences (user_id, category_id, score) VALUES (?, ?, ?)",
                     (user_id, category_id, new_score)
                 )
-            
-            conn.commit()
     
     def get_category_id_by_video(self, video_id: int) -> Optional[int]:
         """Получает ID категории по ID видео"""
-        with self.get_connection() as conn:
+        with self.read_connection() as conn:
             cursor = conn.cursor()
             cursor.execute("SELECT category_id FROM Videos WHERE id=?", (video_id,))
             result = cursor.fetchone()
@@ -1267,86 +1767,103 @@ class Database:
         if category_id:
             self.update_user_preference(user_id, category_id, self.SCORE_COMMENT)
     
-    def get_recommended_videos(self, user_id: int = None, limit: int = 20) -> List[int]:
+    def refresh_recency_buckets(self) -> int:
+        """
+        Пересчитывает корзины актуальности в VideoScores.
+        Затрагивает только видео, которые еще не попали в последнюю корзину (моложе 30 дней).
+        """
+        recency = RECENCY_SQL.format(date='upload_date')
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                f'''
+                UPDATE VideoScores SET
+                    recency = {recency},
+                    base_score = popularity + {recency}
+                WHERE recency > 1.0 AND recency != {recency}
+                '''
+            )
+            updated = cursor.rowcount
+        self._recency_refreshed_at = time.monotonic()
+        return updated
+
+    def refresh_recency_if_due(self):
+        """Пересчет корзин актуальности раз в RECENCY_REFRESH_INTERVAL (из фонового потока записи)"""
+        if time.monotonic() - self._recency_refreshed_at >= self.RECENCY_REFRESH_INTERVAL:
+            self.refresh_recency_buckets()
+
+    def get_recommended_videos(self, user_id: int = None, limit: int = 20, with_info: bool = False,
+                               cursor: Optional[str] = None) -> Page:
         """
         Возвращает рекомендованные видео на основе:
         - Популярности (просмотры)
         - Актуальности (дата загрузки)
         - Предпочтений пользователя (если user_id указан)
+
+        Базовый рейтинг хранится в VideoScores. Видео делятся на источники: каждая
+        предпочитаемая категория (внутри нее бонус одинаков) и все остальные видео.
+        Каждый источник читается по индексу в порядке итогового рейтинга, поэтому
+        лучшие limit видео — это слияние первых limit строк каждого источника.
+
+        Возвращает страницу ID (или строк с данными карточек при with_info=True).
+        cursor — next_cursor предыдущей страницы: он хранит бонусы категорий на момент
+        первой страницы и позицию в каждом источнике, так что глубокие страницы
+        читаются так же, как первая.
         """
-        with self.get_connection() as conn:
-            cursor = conn.cursor()
-            
-            if user_id:
-                # С учетом предпочтений пользователя
-                cursor.execute(
-                    """
-                    SELECT 
-                        v.id,
-                        v.views_count,
-                        v.upload_date,
-                        v.category_id,
-                        COALESCE(up.score, 0) as preference_score,
-                        -- Формула рекомендации:
-                        -- Популярность (нормализованная) + Актуальность (дней назад) + Предпочтение
-                        (
-                            -- Популярность: логарифм просмотров (макс 10 баллов)
-                            CASE 
-                                WHEN v.views_count > 0 THEN MIN(10.0, LOG10(v.views_count + 1) * 2)
-                                ELSE 0
-                            END
-                            +
-                            -- Актуальность: чем новее, тем больше баллов (макс 10 баллов)
-                            CASE
-                                WHEN JULIANDAY('now') - JULIANDAY(v.upload_date) < 1 THEN 10.0
-                                WHEN JULIANDAY('now') - JULIANDAY(v.upload_date) < 7 THEN 7.0
-                                WHEN JULIANDAY('now') - JULIANDAY(v.upload_date) < 30 THEN 4.0
-                                ELSE 1.0
-                            END
-                            +
-                            -- Предпочтения пользователя (нормализованные, макс 10 баллов)
-                            MIN(10.0, COALESCE(up.score, 0) / 10.0)
-                        ) as recommendation_score
-                    FROM Videos v
-                    LEFT JOIN UserPreferences up
-                        ON v.category_id = up.category_id AND up.user_id = ?
-                    ORDER BY recommendation_score DESC, v.upload_date DESC
-                    LIMIT ?
-                    """,
-                    (user_id, limit)
-                )
+        state = decode_cursor(cursor) if cursor else None
+
+        with self.read_connection() as conn:
+            if state is None:
+                # Предпочтения пользователя (нормализованные, макс 10 баллов)
+                bonuses = {}
+                if user_id:
+                    rows = self.queries.execute(conn, 'recommended_bonuses', (user_id,)).fetchall()
+                    bonuses = {str(row['category_id']): row['bonus'] for row in rows}
+                positions = {}
             else:
-                # Без учета предпочтений (для неавторизованных пользователей)
-                cursor.execute(
-                    """
-                    SELECT 
-                        v.id,
-                        (
-                            -- Популярность
-                            CASE 
-                                WHEN v.views_count > 0 THEN MIN(10.0, LOG10(v.views_count + 1) * 2)
-                                ELSE 0
-                            END
-                            +
-                            -- Актуальность
-                            CASE
-                                WHEN JULIANDAY('now') - JULIANDAY(v.upload_date) < 1 THEN 10.0
-                                WHEN JULIANDAY('now') - JULIANDAY(v.upload_date) < 7 THEN 7.0
-                                WHEN JULIANDAY('now') - JULIANDAY(v.upload_date) < 30 THEN 4.0
-                                ELSE 1.0
-                            END
-                        ) as recommendation_score
-                    FROM Videos v
-                    ORDER BY recommendation_score DESC, v.upload_date DESC
-                    LIMIT ?
-                    """,
-                    (limit,)
+                bonuses = state['bonuses']
+                positions = state['positions']
+
+            # Видео непредпочитаемых категорий и топ каждой предпочитаемой категории
+            excluded = json.dumps([int(category_id) for category_id in bonuses])
+            sources = {'*': self._read_scores(conn, 'recommended_top', {'excluded': excluded},
+                                              positions.get('*'), limit)}
+            for category_id in bonuses:
+                sources[category_id] = self._read_scores(
+                    conn, 'recommended_category_top', {'category_id': int(category_id)},
+                    positions.get(category_id), limit
                 )
-            
-            results = cursor.fetchall()
-            return [row['id'] for row in results] if results else []
-            
-    
+
+        candidates = []
+        for source, rows in sources.items():
+            bonus = bonuses.get(source, 0.0)
+            for row in rows:
+                rank = (row['base_score'] + bonus, row['upload_date'] or '', row['video_id'])
+                candidates.append((rank, source, row))
+
+        top = heapq.nlargest(limit, candidates, key=lambda candidate: candidate[0])
+
+        next_cursor = None
+        if len(top) == limit:
+            # Последнее взятое видео каждого источника — с него продолжится следующая страница
+            positions = dict(positions)
+            for _, source, row in top:
+                positions[source] = [row['base_score'], row['upload_date'], row['video_id']]
+            next_cursor = encode_cursor({'bonuses': bonuses, 'positions': positions})
+
+        video_ids = [rank[2] for rank, _, _ in top]
+        if with_info:
+            return Page(self.get_videos_info_bulk(video_ids), next_cursor)
+        return Page(video_ids, next_cursor)
+
+    def _read_scores(self, conn, name: str, params: dict, position, limit: int) -> List[sqlite3.Row]:
+        """Читает следующие limit строк источника рекомендаций после позиции position"""
+        params = dict(params, limit=limit)
+        if position:
+            params['base'], params['date'], params['id'] = position
+            name = f'{name}_after'
+        return self.queries.execute(conn, name, params).fetchall()
+
     def clear_all_data(self):
         """Удаляет все данные из всех таблиц базы данных"""
         with self.get_connection() as conn:
@@ -1366,12 +1883,21 @@ class Database:
             cursor.execute("DELETE FROM Tags")
             cursor.execute("DELETE FROM Categories")
             cursor.execute("DELETE FROM Users")
+            cursor.execute("DELETE FROM AppMeta")
             
             # Включаем проверку внешних ключей обратно
             cursor.execute("PRAGMA foreign_keys = ON")
-            
-            conn.commit()
 
     def close(self):
-        if hasattr(self, 'conn'):
-            self.conn.close()
+        self.write_buffer.close()
+        self.pool.close_all()
+        # При закрытии переносим WAL в основной файл и обнуляем его
+        try:
+            self.checkpoint('TRUNCATE')
+        except sqlite3.Error as e:
+            print(f"Ошибка checkpoint при закрытии БД: {e}")
+        with self._checkpoint_lock:
+            if self._checkpoint_conn is not None:
+                self._checkpoint_conn.close()
+                self._checkpoint_conn = None
+        self.writer.close()
@@ -0,0 +1,69 @@
+import os
+import threading
+import time
+
+
+class DiskBudget:
+    """
+    Ограничение размера дискового кэша. Записанные байты суммируются, и только когда сумма
+    превышает max_bytes, каталог сканируется и самые старые файлы удаляются до LOW_WATER лимита.
+    Прочитанные из кэша файлы отмечаются через touch(), поэтому удаляются давно не читавшиеся.
+    """
+    LOW_WATER = 0.9  # Запас после очистки, чтобы не чистить кэш на каждой следующей записи
+    TOUCH_INTERVAL = 60 * 60  # Время изменения обновляется не чаще раза в час на файл
+
+    def __init__(self, root: str, max_bytes: int):
+        self.root = root
+        self.max_bytes = max_bytes
+        self._total = None  # Размер кэша; None — каталог еще не сканировался
+        self._lock = threading.Lock()
+
+    def add(self, size: int):
+        """Учитывает новый файл размером size (уже записанный) и чистит кэш при превышении лимита"""
+        with self._lock:
+            if self._total is None:
+                # Первая запись за сеанс: размер оставшегося от прошлых запусков кэша
+                self._total = self.prune(self.max_bytes)
+            else:
+                self._total += size
+            if self._total > self.max_bytes:
+                self._total = self.prune(int(self.max_bytes * self.LOW_WATER))
+
+    def touch(self, path: str):
+        """Отмечает чтение файла из кэша: обновляет время изменения, если оно старше TOUCH_INTERVAL"""
+        try:
+            if time.time() - os.stat(path).st_mtime >= self.TOUCH_INTERVAL:
+                os.utime(path)
+        except OSError:
+            pass
+
+    def prune(self, target_bytes: int) -> int:
+        """Удаляет самые старые файлы, пока кэш больше target_bytes. Возвращает итоговый размер"""
+        files = []
+        total = 0
+        for root, _, names in os.walk(self.root):
+            for name in names:
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                files.append((stat.st_mtime, stat.st_size, path))
+                total += stat.st_size
+        files.sort()
+        for _, file_size, path in files:
+            if total <= target_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= file_size
+            except OSError:
+                continue
+            # Пустой каталог записи (шард, папка листа кадров) больше не нужен
+            folder = os.path.dirname(path)
+            if os.path.abspath(folder) != os.path.abspath(self.root):
+                try:
+                    os.rmdir(folder)
+                except OSError:
+                    pass
+        return total
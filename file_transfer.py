@@ -0,0 +1,92 @@
+import hashlib
+import os
+import time
+
+
+CHUNK_SIZE = 4 * 1024 * 1024  # Размер блока копирования (4 МБ)
+PROGRESS_INTERVAL = 0.1       # Не чаще, чем раз в 100 мс, сообщать о прогрессе
+
+
+class TransferCancelled(Exception):
+    """Копирование отменено пользователем"""
+
+
+class TransferVerificationError(Exception):
+    """Копия не совпала с исходным файлом (размер или контрольная сумма)"""
+
+
+def file_digest(path: str, chunk_size: int = CHUNK_SIZE, is_cancelled=None) -> str:
+    """SHA-256 содержимого файла, читается блоками"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        while True:
+            if is_cancelled is not None and is_cancelled():
+                raise TransferCancelled()
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def copy_file_chunked(source_path: str, target_path: str, chunk_size: int = CHUNK_SIZE,
+                      on_progress=None, is_cancelled=None, verify: bool = True) -> str:
+    """
+    Копирует файл блоками во временный target_path + '.part' и после проверки
+    переименовывает его в target_path. Возвращает SHA-256 содержимого.
+
+    on_progress(copied_bytes, total_bytes, bytes_per_second) вызывается из потока копирования.
+    is_cancelled() проверяется перед каждым блоком; при отмене или ошибке временный файл удаляется.
+    """
+    total = os.path.getsize(source_path)
+    part_path = target_path + '.part'
+    os.makedirs(os.path.dirname(os.path.abspath(target_path)), exist_ok=True)
+
+    digest = hashlib.sha256()
+    copied = 0
+    started = last_report = time.perf_counter()
+    try:
+        with open(source_path, 'rb') as src, open(part_path, 'wb') as dst:
+            while True:
+                if is_cancelled is not None and is_cancelled():
+                    raise TransferCancelled()
+                chunk = src.read(chunk_size)
+                if not chunk:
+                    break
+                dst.write(chunk)
+                digest.update(chunk)
+                copied += len(chunk)
+
+                now = time.perf_counter()
+                if on_progress is not None and now - last_report >= PROGRESS_INTERVAL:
+                    last_report = now
+                    on_progress(copied, total, copied / max(now - started, 1e-6))
+            dst.flush()
+            os.fsync(dst.fileno())
+
+        source_digest = digest.hexdigest()
+        if copied != total or os.path.getsize(part_path) != total:
+            raise TransferVerificationError(
+                f"Размер копии не совпадает с исходным файлом: {os.path.getsize(part_path)} из {total} байт"
+            )
+        # Контрольная сумма копии, прочитанной с диска, должна совпасть с суммой прочитанного оригинала
+        if verify and file_digest(part_path, chunk_size, is_cancelled) != source_digest:
+            raise TransferVerificationError("Контрольная сумма копии не совпадает с исходным файлом")
+
+        os.replace(part_path, target_path)
+    except BaseException:
+        remove_quietly(part_path)
+        raise
+
+    if on_progress is not None:
+        elapsed = time.perf_counter() - started
+        on_progress(total, total, total / max(elapsed, 1e-6))
+    return source_digest
+
+
+def remove_quietly(path: str):
+    """Удаляет файл, если он существует, не поднимая ошибок"""
+    try:
+        os.remove(path)
+    except OSError:
+        pass
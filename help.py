@@ -3,7 +3,7 @@ from PyQt6.QtWidgets import QComboBox
 from PyQt6.QtCore import Qt, QObject, QEvent
 from PyQt6.QtGui import QFont
 
-import cv2
+from media_probe import probe_media
 
 
 class Page:
@@ -69,12 +69,10 @@ def apply_scroll_style(scroll_area):
 
 
 def get_duration(file_path):
-    video = cv2.VideoCapture(file_path)
-    fps = video.get(cv2.CAP_PROP_FPS)
-    frame_count = video.get(cv2.CAP_PROP_FRAME_COUNT)
-    duration = frame_count / fps
-    video.release()
-    return int(duration)
+    """Длительность видео в секундах (0, если ее не удалось определить)"""
+    # Сначала заголовки контейнера (MP4/MKV/AVI), OpenCV — только если формат не разобран
+    info = probe_media(file_path)
+    return info.duration_seconds if info is not None else 0
 
 def get_font():
     font = QFont("Segoe UI")
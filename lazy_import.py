@@ -0,0 +1,55 @@
+import importlib
+import sys
+import threading
+import time
+import types
+
+
+class LazyModule(types.ModuleType):
+    """
+    Заместитель тяжелого модуля: настоящий импорт выполняется при первом обращении к атрибуту.
+    Позволяет держать импорт на уровне модуля, не оплачивая его при запуске приложения.
+    """
+
+    def __init__(self, name: str):
+        super().__init__(name)
+        self.__dict__['_lazy_module'] = None
+        self.__dict__['_lazy_lock'] = threading.Lock()
+        self.__dict__['load_ms'] = None
+
+    def _load(self):
+        module = self.__dict__['_lazy_module']
+        if module is not None:
+            return module
+        with self.__dict__['_lazy_lock']:
+            module = self.__dict__['_lazy_module']
+            if module is None:
+                started = time.perf_counter()
+                module = importlib.import_module(self.__name__)
+                self.__dict__['load_ms'] = (time.perf_counter() - started) * 1000
+                self.__dict__['_lazy_module'] = module
+        return module
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __dir__(self):
+        return dir(self._load())
+
+    def is_loaded(self) -> bool:
+        return self.__dict__['_lazy_module'] is not None
+
+    def __repr__(self):
+        state = 'загружен' if self.is_loaded() else 'не загружен'
+        return f"<lazy module '{self.__name__}' ({state})>"
+
+
+def lazy_module(name: str):
+    """
+    Возвращает модуль name, если он уже импортирован, иначе ленивый заместитель.
+    ImportError (например, не установлен opencv) возникнет при первом использовании модуля.
+    """
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+    return LazyModule(name)
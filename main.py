@@ -1,9 +1,21 @@
+from startup_timing import STARTUP, ImportProfiler  # Первым импортом: отсчет времени запуска
+import json
+import os
+import sys
+
+# python main.py --profile-imports — отчет о времени импорта модулей (как python -X importtime)
+IMPORT_PROFILER = ImportProfiler().install() if '--profile-imports' in sys.argv else None
+# Этапы запуска печатаются только при профилировании, обычный запуск их не выводит
+STARTUP.verbose = '--profile-imports' in sys.argv or '--exit-after-startup' in sys.argv
+
+from PyQt6.QtCore import QTimer
 from PyQt6.QtWidgets import QApplication
 from PyQt6.QtGui import QPalette, QColor
 from windows.main_window import MainWindow
-import sys
 
 from db import Database
+from async_db import AsyncDatabase
+from upload_jobs import UploadManager
 from help import get_font
 
 
@@ -25,14 +37,27 @@ def set_color_palette(app):
     app.setPalette(palette)
 
 
+def start_background_maintenance(db: Database):
+    """Служебные задачи, которые не должны задерживать первый кадр"""
+    def on_history_cleaned(deleted):
+        STARTUP.mark('история очищена')
+        if deleted:
+            print(f"Очищено {deleted} дубликатов из истории просмотров")
+
+    # Фоновый поток записи также пересчитывает актуальность видео для рекомендаций
+    db.start_maintenance()
+    # Запрос встает в очередь после первой страницы ленты
+    AsyncDatabase.of(db).call('cleanup_history_duplicates', on_result=on_history_cleaned)
+
+
 if __name__ == "__main__":
-    db = Database()
-    db.init_database()
+    STARTUP.mark('импорт модулей')
+    # Схема и миграции применяются в конструкторе
+    db = Database(os.environ.get('VIDEO_PLATFORM_DB', 'video_platform.db'))
+    STARTUP.mark('база данных открыта')
+    # Справочник обновляется, только если набор категорий изменился
     db.create_categories()
-    
-    deleted = db.cleanup_history_duplicates()
-    if deleted > 0:
-        print(f"Очищено {deleted} дубликатов из истории просмотров")
+    STARTUP.mark('категории проверены')
 
     app = QApplication(sys.argv)
 
@@ -41,6 +66,28 @@ if __name__ == "__main__":
     
     app.setStyle('Fusion')
     set_color_palette(app)
-    window = MainWindow(db)
+    window = MainWindow(db, startup_timer=STARTUP)
+    STARTUP.mark('окно создано')
     window.show()
-    sys.exit(app.exec())
\ No newline at end of file
+    start_background_maintenance(db)
+
+    if IMPORT_PROFILER is not None:
+        IMPORT_PROFILER.uninstall()
+        print(IMPORT_PROFILER.report())
+
+    # python main.py --exit-after-startup — выйти, как только лента заполнена (для bench_startup.py)
+    if '--exit-after-startup' in sys.argv:
+        def exit_after_startup(_count):
+            print('STARTUP_REPORT ' + json.dumps(STARTUP.report(), ensure_ascii=False), flush=True)
+            QTimer.singleShot(0, app.quit)
+        window.main_page.video_container.pageLoaded.connect(exit_after_startup)
+    exit_code = app.exec()
+
+    # Прерываем незавершенные загрузки, дожидаемся фоновых запросов,
+    # записываем отложенные изменения и закрываем соединения
+    uploads = UploadManager.of(db)
+    uploads.cancel_all()
+    uploads.wait_for_done()
+    AsyncDatabase.of(db).wait_for_done()
+    db.close()
+    sys.exit(exit_code)
\ No newline at end of file
@@ -0,0 +1,654 @@
+import bisect
+import functools
+import hashlib
+import os
+import struct
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, asdict
+from typing import List, Optional
+
+from lazy_import import lazy_module
+
+cv2 = lazy_module('cv2')
+
+# Ошибки разбора поврежденных или обрезанных заголовков: файл считается неразобранным
+PARSE_ERRORS = (struct.error, ValueError, OverflowError, IndexError)
+
+
+@dataclass
+class MediaInfo:
+    """Параметры видеофайла, прочитанные из заголовков контейнера"""
+    duration_ms: int
+    width: int = 0
+    height: int = 0
+    video_codec: str = ''
+    audio_codec: str = ''
+    bitrate: int = 0        # Средний битрейт файла, бит/с
+    container: str = ''     # mp4, matroska, webm, avi
+    source: str = 'header'  # header — разбор заголовков, cv2 — запасной путь через OpenCV
+
+    @property
+    def duration_seconds(self) -> int:
+        return self.duration_ms // 1000
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+# === MP4 / MOV ===
+MP4_CONTAINERS = {b'moov', b'trak', b'mdia', b'minf', b'stbl'}
+
+
+def _iter_boxes(f, start: int, end: int):
+    """Перебирает боксы ISO BMFF в диапазоне [start, end): (тип, начало данных, конец бокса)"""
+    offset = start
+    while offset + 8 <= end:
+        f.seek(offset)
+        header = f.read(8)
+        if len(header) < 8:
+            return
+        size, box_type = struct.unpack('>I4s', header)
+        data_start = offset + 8
+        if size == 1:
+            large_size = f.read(8)
+            if len(large_size) < 8:
+                return
+            size = struct.unpack('>Q', large_size)[0]
+            data_start += 8
+        elif size == 0:
+            size = end - offset  # Бокс до конца файла
+        if size < data_start - offset:
+            return  # Поврежденный заголовок
+        yield box_type, data_start, min(offset + size, end)
+        offset += size
+
+
+def _read_at(f, offset: int, size: int) -> bytes:
+    f.seek(offset)
+    return f.read(size)
+
+
+def _probe_mp4_track(f, start: int, end: int, info: MediaInfo):
+    handler = None
+    codec = ''
+    width = height = 0
+    stack = [(start, end)]
+    while stack:
+        box_start, box_end = stack.pop()
+        for box_type, data_start, data_end in _iter_boxes(f, box_start, box_end):
+            if box_type in MP4_CONTAINERS:
+                stack.append((data_start, data_end))
+            elif box_type == b'hdlr':
+                handler = _read_at(f, data_start + 8, 4)
+            elif box_type == b'stsd':
+                # Первая запись описания: размер, формат (avc1, hvc1, mp4a...) и для видео — размеры кадра
+                entry = _read_at(f, data_start + 8, 36)
+                if len(entry) >= 8:
+                    codec = entry[4:8].decode('latin-1').strip()
+                if len(entry) >= 36:
+                    width, height = struct.unpack('>HH', entry[32:36])
+
+    if handler == b'vide' and not info.video_codec:
+        info.video_codec = codec
+        info.width, info.height = width, height
+    elif handler == b'soun' and not info.audio_codec:
+        info.audio_codec = codec
+
+
+def probe_mp4(f, file_size: int) -> Optional[MediaInfo]:
+    moov = None
+    for box_type, data_start, data_end in _iter_boxes(f, 0, file_size):
+        if box_type == b'moov':
+            moov = (data_start, data_end)
+            break
+    if moov is None:
+        return None
+
+    info = None
+    for box_type, data_start, data_end in _iter_boxes(f, *moov):
+        if box_type == b'mvhd':
+            header = _read_at(f, data_start, 32)
+            if len(header) < 32:
+                return None  # Файл обрезан внутри moov
+            if header[0] == 1:
+                timescale, duration = struct.unpack('>IQ', header[20:32])
+            else:
+                timescale, duration = struct.unpack('>II', header[12:20])
+            if not timescale:
+                return None
+            info = MediaInfo(duration_ms=duration * 1000 // timescale, container='mp4')
+        elif box_type == b'trak' and info is not None:
+            _probe_mp4_track(f, data_start, data_end, info)
+    return info
+
+
+def _mp4_track_boxes(f, start: int, end: int) -> dict:
+    """Боксы дорожки, нужные для индекса ключевых кадров: {тип: (начало данных, конец)}"""
+    boxes = {}
+    stack = [(start, end)]
+    while stack:
+        box_start, box_end = stack.pop()
+        for box_type, data_start, data_end in _iter_boxes(f, box_start, box_end):
+            if box_type in MP4_CONTAINERS:
+                stack.append((data_start, data_end))
+            elif box_type in (b'hdlr', b'mdhd', b'stts', b'stss'):
+                boxes[box_type] = (data_start, data_end)
+    return boxes
+
+
+def keyframes_mp4(f, file_size: int) -> Optional[List[int]]:
+    """
+    Время ключевых кадров видеодорожки (мс) из таблиц stss (номера кадров) и stts (длительности).
+    None, если ключевые кадры не отмечены (stss отсутствует — каждый кадр ключевой).
+    """
+    moov = None
+    for box_type, data_start, data_end in _iter_boxes(f, 0, file_size):
+        if box_type == b'moov':
+            moov = (data_start, data_end)
+            break
+    if moov is None:
+        return None
+
+    for box_type, data_start, data_end in _iter_boxes(f, *moov):
+        if box_type != b'trak':
+            continue
+        boxes = _mp4_track_boxes(f, data_start, data_end)
+        if b'hdlr' not in boxes or _read_at(f, boxes[b'hdlr'][0] + 8, 4) != b'vide':
+            continue
+        if b'stss' not in boxes or b'stts' not in boxes or b'mdhd' not in boxes:
+            return None
+
+        mdhd = _read_at(f, boxes[b'mdhd'][0], 24)
+        if len(mdhd) < 24:
+            return None
+        timescale = struct.unpack('>I', mdhd[20:24] if mdhd[0] == 1 else mdhd[12:16])[0]
+        if not timescale:
+            return None
+
+        stts_start, stts_end = boxes[b'stts']
+        stts = _read_at(f, stts_start, stts_end - stts_start)
+        if len(stts) < 8:
+            return None
+        stts_count = min(struct.unpack('>I', stts[4:8])[0], (len(stts) - 8) // 8)
+        stts_entries = struct.unpack(f'>{stts_count * 2}I', stts[8:8 + stts_count * 8])
+
+        stss_start, stss_end = boxes[b'stss']
+        stss = _read_at(f, stss_start, stss_end - stss_start)
+        if len(stss) < 8:
+            return None
+        stss_count = min(struct.unpack('>I', stss[4:8])[0], (len(stss) - 8) // 4)
+        sync_samples = struct.unpack(f'>{stss_count}I', stss[8:8 + stss_count * 4])
+
+        # Один проход по stts: номера кадров (с 1) переводятся во время начала кадра
+        times = []
+        sample = 1
+        decode_time = 0
+        entry = 0
+        for sync_sample in sync_samples:
+            while entry < stts_count:
+                count, delta = stts_entries[entry * 2], stts_entries[entry * 2 + 1]
+                if sync_sample < sample + count:
+                    break
+                sample += count
+                decode_time += count * delta
+                entry += 1
+            else:
+                break  # Номер кадра за пределами таблицы stts
+            time_units = decode_time + (sync_sample - sample) * stts_entries[entry * 2 + 1]
+            times.append(time_units * 1000 // timescale)
+        return times
+    return None
+
+
+# === MATROSKA / WEBM ===
+EBML_HEADER = 0x1A45DFA3
+MKV_DOC_TYPE = 0x4282
+MKV_SEGMENT = 0x18538067
+MKV_INFO = 0x1549A966
+MKV_TIMECODE_SCALE = 0x2AD7B1
+MKV_DURATION = 0x4489
+MKV_TRACKS = 0x1654AE6B
+MKV_TRACK_ENTRY = 0xAE
+MKV_TRACK_TYPE = 0x83
+MKV_CODEC_ID = 0x86
+MKV_VIDEO = 0xE0
+MKV_PIXEL_WIDTH = 0xB0
+MKV_PIXEL_HEIGHT = 0xBA
+MKV_CLUSTER = 0x1F43B675
+MKV_SEEK_HEAD = 0x114D9B74
+MKV_SEEK = 0x4DBB
+MKV_SEEK_ID = 0x53AB
+MKV_SEEK_POSITION = 0x53AC
+MKV_CUES = 0x1C53BB6B
+MKV_CUE_POINT = 0xBB
+MKV_CUE_TIME = 0xB3
+
+
+def _read_vint(f, keep_marker: bool):
+    """Число переменной длины EBML: (значение, длина) или (None, 0) в конце файла"""
+    first = f.read(1)
+    if not first:
+        return None, 0
+    first = first[0]
+    length = 1
+    mask = 0x80
+    while length <= 8 and not first & mask:
+        mask >>= 1
+        length += 1
+    if length > 8:
+        return None, 0
+    value = first if keep_marker else first & (mask - 1)
+    rest = f.read(length - 1)
+    for byte in rest:
+        value = (value << 8) | byte
+    if not keep_marker and value == (1 << (7 * length)) - 1:
+        value = -1  # Неизвестный размер элемента
+    return value, length
+
+
+def _iter_ebml(f, start: int, end: int):
+    """Перебирает элементы EBML в диапазоне [start, end): (id, начало данных, конец данных)"""
+    offset = start
+    while offset < end:
+        f.seek(offset)
+        element_id, id_length = _read_vint(f, keep_marker=True)
+        size, size_length = _read_vint(f, keep_marker=False)
+        if element_id is None or size is None:
+            return
+        data_start = offset + id_length + size_length
+        data_end = end if size < 0 else min(data_start + size, end)
+        yield element_id, data_start, data_end
+        if size < 0:
+            return
+        offset = data_end
+
+
+def _read_uint(f, start: int, end: int) -> int:
+    return int.from_bytes(_read_at(f, start, end - start), 'big')
+
+
+def _read_float(f, start: int, end: int) -> float:
+    data = _read_at(f, start, end - start)
+    if len(data) == 4:
+        return struct.unpack('>f', data)[0]
+    if len(data) == 8:
+        return struct.unpack('>d', data)[0]
+    return 0.0
+
+
+def probe_matroska(f, file_size: int) -> Optional[MediaInfo]:
+    doc_type = 'matroska'
+    segment = None
+    for element_id, data_start, data_end in _iter_ebml(f, 0, file_size):
+        if element_id == EBML_HEADER:
+            for child_id, child_start, child_end in _iter_ebml(f, data_start, data_end):
+                if child_id == MKV_DOC_TYPE:
+                    doc_type = _read_at(f, child_start, child_end - child_start).decode('ascii', 'ignore').strip('\0')
+        elif element_id == MKV_SEGMENT:
+            segment = (data_start, data_end)
+            break
+    if segment is None:
+        return None
+
+    timecode_scale = 1_000_000  # нс на единицу времени, значение по умолчанию
+    duration = None
+    info = MediaInfo(duration_ms=0, container=doc_type)
+    for element_id, data_start, data_end in _iter_ebml(f, *segment):
+        if element_id == MKV_INFO:
+            for child_id, child_start, child_end in _iter_ebml(f, data_start, data_end):
+                if child_id == MKV_TIMECODE_SCALE:
+                    timecode_scale = _read_uint(f, child_start, child_end)
+                elif child_id == MKV_DURATION:
+                    duration = _read_float(f, child_start, child_end)
+        elif element_id == MKV_TRACKS:
+            for entry_id, entry_start, entry_end in _iter_ebml(f, data_start, data_end):
+                if entry_id == MKV_TRACK_ENTRY:
+                    _probe_matroska_track(f, entry_start, entry_end, info)
+        elif element_id == MKV_CLUSTER:
+            break  # Дальше идут только данные кадров
+
+    if duration is None:
+        return None
+    info.duration_ms = int(duration * timecode_scale / 1_000_000)
+    return info
+
+
+def _matroska_segment(f, file_size: int):
+    for element_id, data_start, data_end in _iter_ebml(f, 0, file_size):
+        if element_id == MKV_SEGMENT:
+            return data_start, data_end
+    return None
+
+
+def keyframes_matroska(f, file_size: int) -> Optional[List[int]]:
+    """Время точек Cues (мс) — по ним плееры выполняют перемотку. Cues обычно в конце файла (SeekHead)"""
+    segment = _matroska_segment(f, file_size)
+    if segment is None:
+        return None
+    segment_start, segment_end = segment
+
+    timecode_scale = 1_000_000
+    cues = None
+    cues_position = None
+    for element_id, data_start, data_end in _iter_ebml(f, segment_start, segment_end):
+        if element_id == MKV_INFO:
+            for child_id, child_start, child_end in _iter_ebml(f, data_start, data_end):
+                if child_id == MKV_TIMECODE_SCALE:
+                    timecode_scale = _read_uint(f, child_start, child_end)
+        elif element_id == MKV_SEEK_HEAD:
+            for seek_id, seek_start, seek_end in _iter_ebml(f, data_start, data_end):
+                if seek_id != MKV_SEEK:
+                    continue
+                target = position = None
+                for child_id, child_start, child_end in _iter_ebml(f, seek_start, seek_end):
+                    if child_id == MKV_SEEK_ID:
+                        target = _read_uint(f, child_start, child_end)
+                    elif child_id == MKV_SEEK_POSITION:
+                        position = _read_uint(f, child_start, child_end)
+                if target == MKV_CUES and position is not None:
+                    cues_position = segment_start + position
+        elif element_id == MKV_CUES:
+            cues = (data_start, data_end)
+            break
+        elif element_id == MKV_CLUSTER:
+            break  # Кластеры не перебираем: Cues ищем по SeekHead
+
+    if cues is None and cues_position is not None:
+        for element_id, data_start, data_end in _iter_ebml(f, cues_position, segment_end):
+            if element_id == MKV_CUES:
+                cues = (data_start, data_end)
+            break
+    if cues is None:
+        return None
+
+    times = set()
+    for point_id, point_start, point_end in _iter_ebml(f, *cues):
+        if point_id != MKV_CUE_POINT:
+            continue
+        for child_id, child_start, child_end in _iter_ebml(f, point_start, point_end):
+            if child_id == MKV_CUE_TIME:
+                times.add(_read_uint(f, child_start, child_end) * timecode_scale // 1_000_000)
+    return sorted(times)
+
+
+def _probe_matroska_track(f, start: int, end: int, info: MediaInfo):
+    track_type = 0
+    codec = ''
+    width = height = 0
+    for element_id, data_start, data_end in _iter_ebml(f, start, end):
+        if element_id == MKV_TRACK_TYPE:
+            track_type = _read_uint(f, data_start, data_end)
+        elif element_id == MKV_CODEC_ID:
+            codec = _read_at(f, data_start, data_end - data_start).decode('ascii', 'ignore').strip('\0')
+        elif element_id == MKV_VIDEO:
+            for child_id, child_start, child_end in _iter_ebml(f, data_start, data_end):
+                if child_id == MKV_PIXEL_WIDTH:
+                    width = _read_uint(f, child_start, child_end)
+                elif child_id == MKV_PIXEL_HEIGHT:
+                    height = _read_uint(f, child_start, child_end)
+    if track_type == 1 and not info.video_codec:
+        info.video_codec = codec
+        info.width, info.height = width, height
+    elif track_type == 2 and not info.audio_codec:
+        info.audio_codec = codec
+
+
+# === AVI ===
+def _iter_riff(f, start: int, end: int):
+    """Перебирает чанки RIFF: (id, тип списка или None, начало данных, конец данных)"""
+    offset = start
+    while offset + 8 <= end:
+        header = _read_at(f, offset, 12)
+        if len(header) < 8:
+            return
+        chunk_id, size = struct.unpack('<4sI', header[:8])
+        data_start = offset + 8
+        chunk_end = data_start + size
+        list_type = None
+        if chunk_id in (b'LIST', b'RIFF') and len(header) == 12:
+            list_type = header[8:12]
+            data_start += 4
+        yield chunk_id, list_type, data_start, min(chunk_end, end)
+        offset = chunk_end + (size & 1)  # Чанки выровнены по 2 байта
+
+
+def probe_avi(f, file_size: int) -> Optional[MediaInfo]:
+    header_list = None
+    for chunk_id, list_type, data_start, data_end in _iter_riff(f, 0, file_size):
+        if chunk_id == b'RIFF' and list_type == b'AVI ':
+            for child_id, child_type, child_start, child_end in _iter_riff(f, data_start, data_end):
+                if child_id == b'LIST' and child_type == b'hdrl':
+                    header_list = (child_start, child_end)
+                    break
+        break
+    if header_list is None:
+        return None
+
+    info = None
+    total_frames = 0
+    usec_per_frame = 0
+    video_duration_ms = None
+    for chunk_id, list_type, data_start, data_end in _iter_riff(f, *header_list):
+        if chunk_id == b'avih':
+            header = _read_at(f, data_start, 40)
+            if len(header) < 40:
+                return None
+            fields = struct.unpack('<10I', header)
+            usec_per_frame, total_frames = fields[0], fields[4]
+            info = MediaInfo(duration_ms=0, width=fields[8], height=fields[9], container='avi')
+        elif chunk_id == b'LIST' and list_type == b'strl' and info is not None:
+            for child_id, _, child_start, child_end in _iter_riff(f, data_start, data_end):
+                if child_id != b'strh':
+                    continue
+                stream_header = _read_at(f, child_start, 36)
+                if len(stream_header) < 36:
+                    continue
+                stream_type, handler = stream_header[0:4], stream_header[4:8]
+                scale, rate, _, length = struct.unpack('<4I', stream_header[20:36])
+                if stream_type == b'vids' and not info.video_codec:
+                    info.video_codec = handler.decode('latin-1').strip('\0 ')
+                    if rate:
+                        video_duration_ms = length * scale * 1000 // rate
+                elif stream_type == b'auds' and not info.audio_codec:
+                    info.audio_codec = 'pcm' if handler == b'\0\0\0\0' else handler.decode('latin-1').strip('\0 ')
+        elif chunk_id == b'LIST' and list_type == b'odml':
+            # OpenDML (AVI больше 1 ГБ): в avih записаны кадры только первого RIFF-блока
+            for child_id, _, child_start, child_end in _iter_riff(f, data_start, data_end):
+                frames = _read_at(f, child_start, 4)
+                if child_id == b'dmlh' and len(frames) == 4:
+                    total_frames = max(total_frames, struct.unpack('<I', frames)[0])
+
+    if info is None:
+        return None
+    if video_duration_ms:
+        info.duration_ms = video_duration_ms
+    else:
+        info.duration_ms = total_frames * usec_per_frame // 1000
+    return info
+
+
+# === ЗАПАСНОЙ ПУТЬ ===
+def probe_cv2(path: str) -> Optional[MediaInfo]:
+    """Через OpenCV — для форматов без разборщика заголовков (медленно: открывает декодер)"""
+    try:
+        video = cv2.VideoCapture(path)
+    except ImportError:
+        return None
+    try:
+        if not video.isOpened():
+            return None
+        fps = video.get(cv2.CAP_PROP_FPS)
+        frame_count = video.get(cv2.CAP_PROP_FRAME_COUNT)
+        fourcc = int(video.get(cv2.CAP_PROP_FOURCC))
+        # Часть контейнеров не сообщает fps или число кадров
+        duration_ms = int(frame_count * 1000 / fps) if fps > 0 and frame_count > 0 else 0
+        return MediaInfo(
+            duration_ms=duration_ms,
+            width=int(video.get(cv2.CAP_PROP_FRAME_WIDTH)),
+            height=int(video.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+            video_codec=fourcc.to_bytes(4, 'little').decode('latin-1').strip('\0 ') if fourcc else '',
+            source='cv2'
+        )
+    finally:
+        video.release()
+
+
+# === ОПРЕДЕЛЕНИЕ КОНТЕЙНЕРА И КЭШ ===
+def detect_container(head: bytes) -> Optional[str]:
+    if len(head) >= 8 and head[4:8] in (b'ftyp', b'moov', b'mdat', b'free', b'wide', b'skip'):
+        return 'mp4'
+    if head[:4] == b'\x1a\x45\xdf\xa3':
+        return 'matroska'
+    if head[:4] == b'RIFF' and head[8:12] == b'AVI ':
+        return 'avi'
+    return None
+
+
+PROBERS = {
+    'mp4': probe_mp4,
+    'matroska': probe_matroska,
+    'avi': probe_avi,
+}
+
+# Индексы ключевых кадров. В AVI idx1 хранит только смещения чанков, для него перемотка без привязки
+KEYFRAME_READERS = {
+    'mp4': keyframes_mp4,
+    'matroska': keyframes_matroska,
+}
+
+HASH_CHUNK = 64 * 1024
+
+
+def file_fingerprint(path: str) -> str:
+    """
+    Быстрый хэш файла для кэша: размер, первые и последние 64 КБ.
+    Заголовки контейнера (включая moov в конце файла) попадают в хэш, а весь файл не читается.
+    """
+    size = os.path.getsize(path)
+    digest = hashlib.sha1(str(size).encode())
+    with open(path, 'rb') as f:
+        digest.update(f.read(HASH_CHUNK))
+        if size > HASH_CHUNK:
+            f.seek(max(HASH_CHUNK, size - HASH_CHUNK))
+            digest.update(f.read(HASH_CHUNK))
+    return digest.hexdigest()
+
+
+class MediaProbe:
+    """Определяет параметры видео по заголовкам контейнера, с кэшем по хэшу файла"""
+
+    def __init__(self, max_items: int = 512):
+        self.max_items = max_items
+        self._cache = OrderedDict()
+        self._keyframes = OrderedDict()
+        self._lock = threading.Lock()
+
+        # Статистика
+        self.hits = 0
+        self.header_probes = 0
+        self.fallback_probes = 0
+
+    def probe(self, path: str) -> Optional[MediaInfo]:
+        """MediaInfo файла или None, если файл не читается или не является видео"""
+        try:
+            key = file_fingerprint(path)
+        except OSError:
+            return None
+        with self._lock:
+            info = self._cache.get(key)
+            if info is not None:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return info
+
+        info = self._probe_uncached(path)
+        if info is not None:
+            with self._lock:
+                self._cache[key] = info
+                while len(self._cache) > self.max_items:
+                    self._cache.popitem(last=False)
+        return info
+
+    def _probe_uncached(self, path: str) -> Optional[MediaInfo]:
+        file_size = os.path.getsize(path)
+        info = None
+        with open(path, 'rb') as f:
+            container = detect_container(f.read(12))
+            prober = PROBERS.get(container)
+            if prober is not None:
+                try:
+                    info = prober(f, file_size)
+                except PARSE_ERRORS as e:
+                    print(f"Не удалось разобрать заголовки {path}: {e}")
+                    info = None
+
+        if info is not None and info.duration_ms > 0:
+            self.header_probes += 1
+        else:
+            fallback = probe_cv2(path)
+            self.fallback_probes += 1
+            if fallback is None:
+                return info
+            info = fallback
+
+        if info.duration_ms > 0:
+            info.bitrate = file_size * 8 * 1000 // info.duration_ms
+        return info
+
+    def keyframes(self, path: str) -> Optional[List[int]]:
+        """Время ключевых кадров видео (мс, по возрастанию) или None, если индекса нет"""
+        try:
+            key = file_fingerprint(path)
+        except OSError:
+            return None
+        with self._lock:
+            if key in self._keyframes:
+                self._keyframes.move_to_end(key)
+                return self._keyframes[key]
+
+        times = None
+        with open(path, 'rb') as f:
+            reader = KEYFRAME_READERS.get(detect_container(f.read(12)))
+            if reader is not None:
+                try:
+                    times = reader(f, os.path.getsize(path)) or None
+                except PARSE_ERRORS as e:
+                    print(f"Не удалось прочитать индекс ключевых кадров {path}: {e}")
+
+        with self._lock:
+            self._keyframes[key] = times
+            while len(self._keyframes) > self.max_items:
+                self._keyframes.popitem(last=False)
+        return times
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'cached': len(self._cache),
+                'hits': self.hits,
+                'header_probes': self.header_probes,
+                'fallback_probes': self.fallback_probes,
+            }
+
+
+@functools.cache
+def get_media_probe() -> MediaProbe:
+    """Общий экземпляр MediaProbe приложения"""
+    return MediaProbe()
+
+
+def probe_media(path: str) -> Optional[MediaInfo]:
+    return get_media_probe().probe(path)
+
+
+def nearest_keyframe_ms(path: str, position_ms: int) -> int:
+    """
+    Ближайший ключевой кадр не позже position_ms: с него декодер начинает показ сразу,
+    без декодирования кадров от предыдущего ключевого. Без индекса возвращает position_ms.
+    """
+    times = get_media_probe().keyframes(path)
+    if not times or position_ms <= 0:
+        return max(0, position_ms)
+    index = bisect.bisect_right(times, position_ms) - 1
+    return times[index] if index >= 0 else 0
@@ -0,0 +1,96 @@
+import hashlib
+import os
+import threading
+import uuid
+from typing import Optional
+
+from file_transfer import CHUNK_SIZE, copy_file_chunked, remove_quietly
+
+
+class MediaStore:
+    """
+    Контентно-адресуемое хранилище файлов видео и превью.
+    Файл хранится один раз под именем SHA-256 своего содержимого: root/ab/cd/<sha256><расширение>.
+    Учет ссылок из Videos ведется в таблице MediaBlobs (триггеры миграции 6),
+    неиспользуемые файлы удаляет Database.delete_video.
+    """
+    STAGING_DIR = 'tmp'  # Незавершенные копии до того, как известен хэш
+
+    def __init__(self, root: str):
+        self.root = os.path.abspath(root)
+        # Размещение файла и запись о нем в БД не должны пересекаться с удалением того же файла
+        self.lock = threading.RLock()
+
+    def blob_path(self, digest: str, extension: str = '') -> str:
+        """Путь файла с хэшем digest (каталоги — первые два байта хэша)"""
+        return os.path.join(self.root, digest[:2], digest[2:4], digest + extension.lower())
+
+    def find(self, digest: str) -> Optional[str]:
+        """Уже сохраненный файл с хэшем digest (с любым расширением) или None"""
+        directory = os.path.dirname(self.blob_path(digest))
+        try:
+            names = os.listdir(directory)
+        except OSError:
+            return None
+        for name in names:
+            if os.path.splitext(name)[0] == digest:
+                return os.path.join(directory, name)
+        return None
+
+    def stage(self, source_path: str, chunk_size: int = CHUNK_SIZE, on_progress=None, is_cancelled=None):
+        """
+        Копирует файл во временный каталог хранилища, вычисляя хэш по ходу копирования.
+        Возвращает (путь временной копии, sha256).
+        """
+        extension = os.path.splitext(source_path)[1].lower()
+        staged_path = os.path.join(self.root, self.STAGING_DIR, uuid.uuid4().hex + extension)
+        digest = copy_file_chunked(
+            source_path, staged_path, chunk_size, on_progress=on_progress, is_cancelled=is_cancelled
+        )
+        return staged_path, digest
+
+    def stage_bytes(self, data: bytes, extension: str):
+        """Сохраняет данные (например, созданное превью) во временный каталог. Возвращает (путь, sha256)"""
+        staged_path = os.path.join(self.root, self.STAGING_DIR, uuid.uuid4().hex + extension.lower())
+        os.makedirs(os.path.dirname(staged_path), exist_ok=True)
+        with open(staged_path + '.part', 'wb') as f:
+            f.write(data)
+        os.replace(staged_path + '.part', staged_path)
+        return staged_path, hashlib.sha256(data).hexdigest()
+
+    def place(self, staged_path: str, digest: str) -> str:
+        """
+        Переносит временную копию на ее постоянное место и возвращает путь. Если файл с тем же
+        содержимым уже есть (в том числе с другим расширением — .mp4 и .m4v), копия удаляется
+        и возвращается путь существующего файла: у содержимого одна запись MediaBlobs и один файл.
+        Вызывается под self.lock.
+        """
+        existing = self.find(digest)
+        if existing is not None and os.path.getsize(existing) == os.path.getsize(staged_path):
+            remove_quietly(staged_path)
+            return existing
+        path = self.blob_path(digest, os.path.splitext(staged_path)[1])
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.replace(staged_path, path)
+        return path
+
+    def contains(self, path: str) -> bool:
+        """True, если path лежит внутри хранилища"""
+        try:
+            return os.path.commonpath([self.root, os.path.abspath(path)]) == self.root
+        except ValueError:  # Разные диски в Windows
+            return False
+
+    def remove(self, paths):
+        """Удаляет файлы хранилища и опустевшие каталоги шардов. Вызывается под self.lock"""
+        for path in paths:
+            if not self.contains(path):
+                continue
+            remove_quietly(path)
+            directory = os.path.dirname(path)
+            for _ in range(2):
+                try:
+                    os.rmdir(directory)
+                except OSError:
+                    break
+                directory = os.path.dirname(directory)
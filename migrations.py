@@ -0,0 +1,418 @@
+import sqlite3
+
+
+# Популярность: логарифм просмотров (макс 10 баллов)
+POPULARITY_SQL = '(CASE WHEN {views} > 0 THEN MIN(10.0, LOG10({views} + 1) * 2) ELSE 0.0 END)'
+
+# Актуальность: чем новее, тем больше баллов (макс 10 баллов)
+RECENCY_SQL = '''(CASE
+    WHEN JULIANDAY('now') - JULIANDAY({date}) < 1 THEN 10.0
+    WHEN JULIANDAY('now') - JULIANDAY({date}) < 7 THEN 7.0
+    WHEN JULIANDAY('now') - JULIANDAY({date}) < 30 THEN 4.0
+    ELSE 1.0
+END)'''
+
+
+# Версионные миграции схемы. Номер текущей версии хранится в PRAGMA user_version.
+# Каждая миграция — (версия, описание, список SQL-запросов или функция fn(conn)).
+# Новые миграции добавляются только в конец списка, уже выпущенные не меняются.
+MIGRATIONS = [
+    (
+        1,
+        "Индексы по горячим внешним ключам",
+        [
+            # get_user_history: WHERE user_id = ? ORDER BY watched_at DESC
+            'CREATE INDEX IF NOT EXISTS idx_history_user_watched ON History (user_id, watched_at)',
+            # add_to_watch_history / get_watch_duration: WHERE user_id = ? AND video_id = ? ORDER BY watched_at DESC
+            'CREATE INDEX IF NOT EXISTS idx_history_user_video_watched ON History (user_id, video_id, watched_at)',
+            # get_video_comments: WHERE video_id = ? ORDER BY created_at DESC
+            'CREATE INDEX IF NOT EXISTS idx_comments_video_created ON Comments (video_id, created_at)',
+            # get_videos_by_user: WHERE user_id = ? ORDER BY upload_date DESC
+            'CREATE INDEX IF NOT EXISTS idx_videos_user_upload ON Videos (user_id, upload_date)',
+            # get_20_videos_id: ORDER BY upload_date DESC
+            'CREATE INDEX IF NOT EXISTS idx_videos_upload_date ON Videos (upload_date)',
+            # Рекомендации и update_preference_on_*: JOIN/WHERE по category_id
+            'CREATE INDEX IF NOT EXISTS idx_videos_category ON Videos (category_id)',
+            # get_channel_subscribers: WHERE channel_id = ?
+            'CREATE INDEX IF NOT EXISTS idx_subscriptions_channel ON Subscriptions (channel_id)',
+            # get_liked_videos: WHERE user_id = ? AND is_like = 1 ORDER BY timestamp DESC
+            'CREATE INDEX IF NOT EXISTS idx_likes_user_liked ON Likes (user_id, is_like, timestamp)',
+            'ANALYZE',
+        ]
+    ),
+    (
+        2,
+        "Полнотекстовый индекс FTS5 для поиска видео",
+        [
+            # unicode61 приводит к нижнему регистру любые буквы (в т.ч. кириллицу) и убирает латинскую диакритику.
+            # Букву ё он не раскладывает, поэтому тексты индексируются с заменой ё -> е (см. fold_search_text в db.py)
+            '''
+            CREATE VIRTUAL TABLE IF NOT EXISTS VideoSearch USING fts5(
+                title, description, author, tags,
+                tokenize = 'unicode61 remove_diacritics 2',
+                prefix = '2 3'
+            )
+            ''',
+            '''
+            INSERT INTO VideoSearch (rowid, title, description, author, tags)
+            SELECT
+                v.id,
+                replace(replace(v.title, 'ё', 'е'), 'Ё', 'Е'),
+                replace(replace(COALESCE(v.description, ''), 'ё', 'е'), 'Ё', 'Е'),
+                replace(replace(COALESCE(u.username, ''), 'ё', 'е'), 'Ё', 'Е'),
+                replace(replace(COALESCE((
+                    SELECT group_concat(t.name, ' ')
+                    FROM VideoTags vt
+                    JOIN Tags t ON t.id = vt.tag_id
+                    WHERE vt.video_id = v.id
+                ), ''), 'ё', 'е'), 'Ё', 'Е')
+            FROM Videos v
+            LEFT JOIN Users u ON u.id = v.user_id
+            ''',
+            # Синхронизация индекса триггерами
+            '''
+            CREATE TRIGGER IF NOT EXISTS trg_video_search_insert AFTER INSERT ON Videos BEGIN
+                INSERT INTO VideoSearch (rowid, title, description, author, tags)
+                VALUES (
+                    NEW.id,
+                    replace(replace(NEW.title, 'ё', 'е'), 'Ё', 'Е'),
+                    replace(replace(COALESCE(NEW.description, ''), 'ё', 'е'), 'Ё', 'Е'),
+                    replace(replace(COALESCE((SELECT username FROM Users WHERE id = NEW.user_id), ''), 'ё', 'е'), 'Ё', 'Е'),
+                    ''
+                );
+            END
+            ''',
+            '''
+            CREATE TRIGGER IF NOT EXISTS trg_video_search_update AFTER UPDATE OF title, description, user_id ON Videos BEGIN
+                UPDATE VideoSearch SET
+                    title = replace(replace(NEW.title, 'ё', 'е'), 'Ё', 'Е'),
+                    description = replace(replace(COALESCE(NEW.description, ''), 'ё', 'е'), 'Ё', 'Е'),
+                    author = replace(replace(COALESCE((SELECT username FROM Users WHERE id = NEW.user_id), ''), 'ё', 'е'), 'Ё', 'Е')
+                WHERE rowid = NEW.id;
+            END
+            ''',
+            '''
+            CREATE TRIGGER IF NOT EXISTS trg_video_search_delete AFTER DELETE ON Videos BEGIN
+                DELETE FROM VideoSearch WHERE rowid = OLD.id;
+            END
+            ''',
+            '''
+            CREATE TRIGGER IF NOT EXISTS trg_video_search_tag_insert AFTER INSERT ON VideoTags BEGIN
+                UPDATE VideoSearch SET tags = replace(replace(COALESCE((
+                    SELECT group_concat(t.name, ' ')
+                    FROM VideoTags vt
+                    JOIN Tags t ON t.id = vt.tag_id
+                    WHERE vt.video_id = NEW.video_id
+                ), ''), 'ё', 'е'), 'Ё', 'Е')
+                WHERE rowid = NEW.video_id;
+            END
+            ''',
+            '''
+            CREATE TRIGGER IF NOT EXISTS trg_video_search_tag_delete AFTER DELETE ON VideoTags BEGIN
+                UPDATE VideoSearch SET tags = replace(replace(COALESCE((
+                    SELECT group_concat(t.name, ' ')
+                    FROM VideoTags vt
+                    JOIN Tags t ON t.id = vt.tag_id
+                    WHERE vt.video_id = OLD.video_id
+                ), ''), 'ё', 'е'), 'Ё', 'Е')
+                WHERE rowid = OLD.video_id;
+            END
+            ''',
+            '''
+            CREATE TRIGGER IF NOT EXISTS trg_video_search_author_update AFTER UPDATE OF username ON Users BEGIN
+                UPDATE VideoSearch SET author = replace(replace(NEW.username, 'ё', 'е'), 'Ё', 'Е')
+                WHERE rowid IN (SELECT id FROM Videos WHERE user_id = NEW.id);
+            END
+            ''',
+        ]
+    ),
+    (
+        3,
+        "Предрассчитанные рейтинги рекомендаций VideoScores",
+        [
+            # base_score = popularity + recency, персональный бонус добавляется при выборке
+            '''
+            CREATE TABLE IF NOT EXISTS VideoScores (
+                video_id INTEGER PRIMARY KEY,
+                category_id INTEGER,
+                popularity REAL NOT NULL DEFAULT 0.0,
+                recency REAL NOT NULL DEFAULT 1.0,
+                base_score REAL NOT NULL DEFAULT 0.0,
+                upload_date DATETIME,
+                FOREIGN KEY (video_id) REFERENCES Videos (id) ON DELETE CASCADE
+            )
+            ''',
+            'CREATE INDEX IF NOT EXISTS idx_video_scores_rank ON VideoScores (base_score DESC, upload_date DESC)',
+            '''
+            CREATE INDEX IF NOT EXISTS idx_video_scores_category_rank
+            ON VideoScores (category_id, base_score DESC, upload_date DESC)
+            ''',
+            # Пересчитывать корзину актуальности нужно только у видео моложе 30 дней
+            '''
+            CREATE INDEX IF NOT EXISTS idx_video_scores_young
+            ON VideoScores (upload_date) WHERE recency > 1.0
+            ''',
+            f'''
+            INSERT OR REPLACE INTO VideoScores (video_id, category_id, popularity, recency, base_score, upload_date)
+            SELECT
+                id,
+                category_id,
+                {POPULARITY_SQL.format(views='views_count')},
+                {RECENCY_SQL.format(date='upload_date')},
+                {POPULARITY_SQL.format(views='views_count')} + {RECENCY_SQL.format(date='upload_date')},
+                upload_date
+            FROM Videos
+            ''',
+            f'''
+            CREATE TRIGGER IF NOT EXISTS trg_video_scores_insert AFTER INSERT ON Videos BEGIN
+                INSERT OR REPLACE INTO VideoScores (video_id, category_id, popularity, recency, base_score, upload_date)
+                VALUES (
+                    NEW.id,
+                    NEW.category_id,
+                    {POPULARITY_SQL.format(views='NEW.views_count')},
+                    {RECENCY_SQL.format(date='NEW.upload_date')},
+                    {POPULARITY_SQL.format(views='NEW.views_count')} + {RECENCY_SQL.format(date='NEW.upload_date')},
+                    NEW.upload_date
+                );
+            END
+            ''',
+            f'''
+            CREATE TRIGGER IF NOT EXISTS trg_video_scores_update
+            AFTER UPDATE OF views_count, category_id, upload_date ON Videos BEGIN
+                UPDATE VideoScores SET
+                    category_id = NEW.category_id,
+                    popularity = {POPULARITY_SQL.format(views='NEW.views_count')},
+                    recency = {RECENCY_SQL.format(date='NEW.upload_date')},
+                    base_score = {POPULARITY_SQL.format(views='NEW.views_count')} + {RECENCY_SQL.format(date='NEW.upload_date')},
+                    upload_date = NEW.upload_date
+                WHERE video_id = NEW.id;
+            END
+            ''',
+            '''
+            CREATE TRIGGER IF NOT EXISTS trg_video_scores_delete AFTER DELETE ON Videos BEGIN
+                DELETE FROM VideoScores WHERE video_id = OLD.id;
+            END
+            ''',
+        ]
+    ),
+    (
+        4,
+        "Индексы для постраничной выдачи рекомендаций по ключу",
+        [
+            # Ключ страницы — (base_score, upload_date, video_id): id различает видео с равным рейтингом и датой
+            '''
+            CREATE INDEX IF NOT EXISTS idx_video_scores_keyset
+            ON VideoScores (base_score DESC, upload_date DESC, video_id DESC)
+            ''',
+            '''
+            CREATE INDEX IF NOT EXISTS idx_video_scores_category_keyset
+            ON VideoScores (category_id, base_score DESC, upload_date DESC, video_id DESC)
+            ''',
+            # Новые индексы покрывают прежние
+            'DROP INDEX IF EXISTS idx_video_scores_rank',
+            'DROP INDEX IF EXISTS idx_video_scores_category_rank',
+        ]
+    ),
+    (
+        5,
+        "Служебная таблица AppMeta",
+        [
+            # Состояние служебных задач запуска: контрольная сумма категорий, прогресс очистки истории
+            '''
+            CREATE TABLE IF NOT EXISTS AppMeta (
+                key TEXT PRIMARY KEY,
+                value TEXT
+            )
+            ''',
+        ]
+    ),
+    (
+        6,
+        "Учет ссылок на файлы хранилища медиа",
+        [
+            # Файл хранилища (media_store.py) и число видео, ссылающихся на него как на видео или превью
+            '''
+            CREATE TABLE IF NOT EXISTS MediaBlobs (
+                sha256 TEXT PRIMARY KEY,
+                path TEXT UNIQUE NOT NULL,
+                size INTEGER NOT NULL,
+                ref_count INTEGER NOT NULL DEFAULT 0,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+            ''',
+            # Быстрый поиск файлов без ссылок при сборке мусора
+            'CREATE INDEX IF NOT EXISTS idx_media_blobs_unreferenced ON MediaBlobs (ref_count) WHERE ref_count <= 0',
+            # Счетчики ссылок ведутся триггерами: пути вне хранилища не найдутся в MediaBlobs
+            '''
+            CREATE TRIGGER IF NOT EXISTS trg_media_blobs_video_insert AFTER INSERT ON Videos BEGIN
+                UPDATE MediaBlobs SET ref_count = ref_count + 1 WHERE path = NEW.video_path;
+                UPDATE MediaBlobs SET ref_count = ref_count + 1 WHERE path = NEW.thumbnail;
+            END
+            ''',
+            '''
+            CREATE TRIGGER IF NOT EXISTS trg_media_blobs_video_update AFTER UPDATE OF video_path, thumbnail ON Videos BEGIN
+                UPDATE MediaBlobs SET ref_count = ref_count - 1 WHERE path = OLD.video_path;
+                UPDATE MediaBlobs SET ref_count = ref_count - 1 WHERE path = OLD.thumbnail;
+                UPDATE MediaBlobs SET ref_count = ref_count + 1 WHERE path = NEW.video_path;
+                UPDATE MediaBlobs SET ref_count = ref_count + 1 WHERE path = NEW.thumbnail;
+            END
+            ''',
+            '''
+            CREATE TRIGGER IF NOT EXISTS trg_media_blobs_video_delete AFTER DELETE ON Videos BEGIN
+                UPDATE MediaBlobs SET ref_count = ref_count - 1 WHERE path = OLD.video_path;
+                UPDATE MediaBlobs SET ref_count = ref_count - 1 WHERE path = OLD.thumbnail;
+            END
+            ''',
+        ]
+    ),
+    (
+        7,
+        "Варианты превью фиксированных размеров",
+        [
+            # Превью, заранее подготовленные под размер карточек (thumbnail_variants.py)
+            '''
+            CREATE TABLE IF NOT EXISTS VideoThumbnails (
+                video_id INTEGER NOT NULL,
+                variant TEXT NOT NULL,
+                path TEXT NOT NULL,
+                width INTEGER NOT NULL,
+                height INTEGER NOT NULL,
+                PRIMARY KEY (video_id, variant)
+            ) WITHOUT ROWID
+            ''',
+            # Файлы вариантов лежат в хранилище медиа и учитываются в MediaBlobs так же, как Videos
+            '''
+            CREATE TRIGGER IF NOT EXISTS trg_media_blobs_thumbnail_insert AFTER INSERT ON VideoThumbnails BEGIN
+                UPDATE MediaBlobs SET ref_count = ref_count + 1 WHERE path = NEW.path;
+            END
+            ''',
+            '''
+            CREATE TRIGGER IF NOT EXISTS trg_media_blobs_thumbnail_delete AFTER DELETE ON VideoThumbnails BEGIN
+                UPDATE MediaBlobs SET ref_count = ref_count - 1 WHERE path = OLD.path;
+            END
+            ''',
+            '''
+            CREATE TRIGGER IF NOT EXISTS trg_video_thumbnails_video_delete AFTER DELETE ON Videos BEGIN
+                DELETE FROM VideoThumbnails WHERE video_id = OLD.id;
+            END
+            ''',
+        ]
+    ),
+    (
+        8,
+        "Триграммный индекс для поиска подстроки в истории просмотров",
+        [
+            # trigram находит запрос от 3 символов внутри слов ("thon" в "python") без перебора строк,
+            # регистр не учитывается для любых букв. Тексты хранятся с заменой ё -> е, как в VideoSearch
+            '''
+            CREATE VIRTUAL TABLE IF NOT EXISTS VideoSubstringSearch USING fts5(
+                title, author, tags,
+                tokenize = 'trigram'
+            )
+            ''',
+            '''
+            INSERT INTO VideoSubstringSearch (rowid, title, author, tags)
+            SELECT
+                v.id,
+                replace(replace(v.title, 'ё', 'е'), 'Ё', 'Е'),
+                replace(replace(COALESCE(u.username, ''), 'ё', 'е'), 'Ё', 'Е'),
+                replace(replace(COALESCE((
+                    SELECT group_concat(t.name, ' ')
+                    FROM VideoTags vt
+                    JOIN Tags t ON t.id = vt.tag_id
+                    WHERE vt.video_id = v.id
+                ), ''), 'ё', 'е'), 'Ё', 'Е')
+            FROM Videos v
+            LEFT JOIN Users u ON u.id = v.user_id
+            ''',
+            '''
+            CREATE TRIGGER IF NOT EXISTS trg_video_substring_insert AFTER INSERT ON Videos BEGIN
+                INSERT INTO VideoSubstringSearch (rowid, title, author, tags)
+                VALUES (
+                    NEW.id,
+                    replace(replace(NEW.title, 'ё', 'е'), 'Ё', 'Е'),
+                    replace(replace(COALESCE((SELECT username FROM Users WHERE id = NEW.user_id), ''), 'ё', 'е'), 'Ё', 'Е'),
+                    ''
+                );
+            END
+            ''',
+            '''
+            CREATE TRIGGER IF NOT EXISTS trg_video_substring_update AFTER UPDATE OF title, user_id ON Videos BEGIN
+                UPDATE VideoSubstringSearch SET
+                    title = replace(replace(NEW.title, 'ё', 'е'), 'Ё', 'Е'),
+                    author = replace(replace(COALESCE((SELECT username FROM Users WHERE id = NEW.user_id), ''), 'ё', 'е'), 'Ё', 'Е')
+                WHERE rowid = NEW.id;
+            END
+            ''',
+            '''
+            CREATE TRIGGER IF NOT EXISTS trg_video_substring_delete AFTER DELETE ON Videos BEGIN
+                DELETE FROM VideoSubstringSearch WHERE rowid = OLD.id;
+            END
+            ''',
+            '''
+            CREATE TRIGGER IF NOT EXISTS trg_video_substring_tag_insert AFTER INSERT ON VideoTags BEGIN
+                UPDATE VideoSubstringSearch SET tags = replace(replace(COALESCE((
+                        SELECT group_concat(t.name, ' ')
+                        FROM VideoTags vt
+                        JOIN Tags t ON t.id = vt.tag_id
+                        WHERE vt.video_id = NEW.video_id
+                    ), ''), 'ё', 'е'), 'Ё', 'Е')
+                WHERE rowid = NEW.video_id;
+            END
+            ''',
+            '''
+            CREATE TRIGGER IF NOT EXISTS trg_video_substring_tag_delete AFTER DELETE ON VideoTags BEGIN
+                UPDATE VideoSubstringSearch SET tags = replace(replace(COALESCE((
+                        SELECT group_concat(t.name, ' ')
+                        FROM VideoTags vt
+                        JOIN Tags t ON t.id = vt.tag_id
+                        WHERE vt.video_id = OLD.video_id
+                    ), ''), 'ё', 'е'), 'Ё', 'Е')
+                WHERE rowid = OLD.video_id;
+            END
+            ''',
+            '''
+            CREATE TRIGGER IF NOT EXISTS trg_video_substring_author_update AFTER UPDATE OF username ON Users BEGIN
+                UPDATE VideoSubstringSearch SET author = replace(replace(NEW.username, 'ё', 'е'), 'Ё', 'Е')
+                WHERE rowid IN (SELECT id FROM Videos WHERE user_id = NEW.id);
+            END
+            ''',
+        ]
+    ),
+]
+
+
+def get_schema_version(conn: sqlite3.Connection) -> int:
+    """Возвращает текущую версию схемы"""
+    return conn.execute('PRAGMA user_version').fetchone()[0]
+
+
+def migrate(conn: sqlite3.Connection) -> int:
+    """
+    Применяет недостающие миграции по порядку, каждую в отдельной транзакции.
+    Возвращает итоговую версию схемы.
+    """
+    if conn.in_transaction:
+        conn.commit()
+
+    version = get_schema_version(conn)
+    for target_version, _, steps in MIGRATIONS:
+        if target_version <= version:
+            continue
+
+        conn.execute('BEGIN')
+        try:
+            if callable(steps):
+                steps(conn)
+            else:
+                for statement in steps:
+                    conn.execute(statement)
+            # PRAGMA не поддерживает параметры, версия — целое число из MIGRATIONS
+            conn.execute(f'PRAGMA user_version = {int(target_version)}')
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        version = target_version
+
+    return version
@@ -0,0 +1,402 @@
+import sqlite3
+import threading
+import time
+
+
+# Пути к вариантам превью под размер карточек (NULL у видео без вариантов, см. thumbnail_variants.py)
+THUMBNAIL_VARIANT_COLUMNS = (
+    "(SELECT path FROM VideoThumbnails WHERE video_id = v.id AND variant = 'tile') AS thumbnail_tile, "
+    "(SELECT path FROM VideoThumbnails WHERE video_id = v.id AND variant = 'card') AS thumbnail_card"
+)
+
+# Данные карточки видео: те же поля, что и в get_video_info, плюс id
+VIDEO_INFO_COLUMNS = (
+    'v.id, u.username, v.title, v.video_path, v.description, '
+    'v.views_count, v.upload_date, v.thumbnail, v.duration, '
+    + THUMBNAIL_VARIANT_COLUMNS
+)
+
+
+class NamedQueryConnection(sqlite3.Connection):
+    """Соединение, запоминающее, какие именованные запросы на нем уже подготовлены"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.prepared_queries = set()
+
+
+class QueryRegistry:
+    """
+    Реестр именованных запросов. Текст каждого запроса неизменен, поэтому на долгоживущем
+    соединении он разбирается один раз и дальше берется из кэша выражений sqlite3
+    (cached_statements). Для каждого запроса собирается время первого выполнения
+    на соединении (разбор + выполнение) и повторных (только выполнение).
+    """
+
+    def __init__(self):
+        self._queries = {}
+        self._stats = {}
+        self._hooks = []
+        self._lock = threading.Lock()
+
+    def register(self, name: str, sql: str) -> str:
+        if name in self._queries:
+            raise ValueError(f"Запрос {name} уже зарегистрирован")
+        self._queries[name] = sql
+        return sql
+
+    def sql(self, name: str) -> str:
+        return self._queries[name]
+
+    def names(self) -> list:
+        return list(self._queries)
+
+    def add_hook(self, hook):
+        """hook(name, elapsed_ms, first) вызывается после каждого выполнения запроса"""
+        self._hooks.append(hook)
+
+    def remove_hook(self, hook):
+        self._hooks.remove(hook)
+
+    def execute(self, conn: sqlite3.Connection, name: str, params=()) -> sqlite3.Cursor:
+        """
+        Выполняет именованный запрос. Замеряется вызов execute: подготовка выражения
+        (при первом выполнении на соединении) и шаг до первой строки результата.
+        """
+        sql = self._queries[name]
+        prepared = getattr(conn, 'prepared_queries', None)
+        first = prepared is not None and name not in prepared
+
+        started = time.perf_counter()
+        cursor = conn.execute(sql, params)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+
+        if first:
+            prepared.add(name)
+        self._record(name, elapsed_ms, first)
+        for hook in self._hooks:
+            hook(name, elapsed_ms, first)
+        return cursor
+
+    def _record(self, name: str, elapsed_ms: float, first: bool):
+        with self._lock:
+            stats = self._stats.get(name)
+            if stats is None:
+                stats = self._stats[name] = {
+                    'first_count': 0, 'first_total_ms': 0.0,
+                    'cached_count': 0, 'cached_total_ms': 0.0,
+                    'max_ms': 0.0,
+                }
+            key = 'first' if first else 'cached'
+            stats[f'{key}_count'] += 1
+            stats[f'{key}_total_ms'] += elapsed_ms
+            stats['max_ms'] = max(stats['max_ms'], elapsed_ms)
+
+    def stats(self) -> dict:
+        """
+        Статистика по запросам: среднее время первого выполнения (разбор + выполнение),
+        повторного (выполнение) и их разница — оценка времени разбора.
+        """
+        result = {}
+        with self._lock:
+            for name, stats in self._stats.items():
+                first_avg = stats['first_total_ms'] / stats['first_count'] if stats['first_count'] else None
+                cached_avg = stats['cached_total_ms'] / stats['cached_count'] if stats['cached_count'] else None
+                result[name] = {
+                    'calls': stats['first_count'] + stats['cached_count'],
+                    'first_avg_ms': first_avg,
+                    'cached_avg_ms': cached_avg,
+                    'parse_estimate_ms': (
+                        max(0.0, first_avg - cached_avg)
+                        if first_avg is not None and cached_avg is not None else None
+                    ),
+                    'max_ms': stats['max_ms'],
+                }
+        return result
+
+    def reset_stats(self):
+        with self._lock:
+            self._stats.clear()
+
+
+QUERIES = QueryRegistry()
+
+# Карточка одного видео (get_video_info)
+QUERIES.register('video_info', f'''
+    SELECT u.username, v.title, v.video_path, v.description, v.views_count, v.upload_date, v.thumbnail, v.duration,
+        {THUMBNAIL_VARIANT_COLUMNS}
+    FROM Videos v
+    JOIN Users u ON v.user_id = u.id
+    WHERE v.id = ?
+''')
+
+# Карточки списка видео в исходном порядке (get_videos_info_bulk)
+QUERIES.register('videos_info_bulk', f'''
+    SELECT {VIDEO_INFO_COLUMNS}
+    FROM json_each(?) AS ids
+    JOIN Videos v ON v.id = ids.value
+    JOIN Users u ON v.user_id = u.id
+    ORDER BY ids.key
+''')
+
+# Видео пользователя, новые первыми (get_videos_by_user).
+# Ключ страницы — (upload_date, id): индекс (user_id, upload_date) неявно заканчивается rowid,
+# поэтому он же задает порядок и для продолжения после курсора
+KEYSET_VIDEOS_BY_USER = 'AND (v.upload_date, v.id) < (:date, :id)'
+
+VIDEOS_BY_USER = '''
+    SELECT v.id, v.upload_date
+    FROM Videos v
+    WHERE v.user_id = :user_id
+    {after}
+    ORDER BY v.upload_date DESC, v.id DESC
+    LIMIT :limit
+'''
+QUERIES.register('videos_by_user', VIDEOS_BY_USER.format(after=''))
+QUERIES.register('videos_by_user_after', VIDEOS_BY_USER.format(after=KEYSET_VIDEOS_BY_USER))
+
+VIDEOS_BY_USER_INFO = f'''
+    SELECT {VIDEO_INFO_COLUMNS}
+    FROM Videos v
+    JOIN Users u ON v.user_id = u.id
+    WHERE v.user_id = :user_id
+    {{after}}
+    ORDER BY v.upload_date DESC, v.id DESC
+    LIMIT :limit
+'''
+QUERIES.register('videos_by_user_info', VIDEOS_BY_USER_INFO.format(after=''))
+QUERIES.register('videos_by_user_info_after', VIDEOS_BY_USER_INFO.format(after=KEYSET_VIDEOS_BY_USER))
+
+# Полнотекстовый поиск видео с ранжированием (search_videos).
+# Порядок (relevance_score, views_count, id) по убыванию — ключ для постраничной выдачи
+SEARCH_VIDEOS_SCORED = f'''
+    SELECT
+        {VIDEO_INFO_COLUMNS},
+        (
+            -- Точное совпадение в названии (50 баллов)
+            CASE WHEN fold_search(v.title) = :query THEN 50 ELSE 0 END
+            +
+            -- Название начинается с запроса (30 баллов)
+            CASE WHEN instr(fold_search(v.title), :query) = 1 THEN 30 ELSE 0 END
+            +
+            -- Точное совпадение автора (25 баллов)
+            CASE WHEN fold_search(u.username) = :query THEN 25 ELSE 0 END
+            +
+            -- Автор начинается с запроса (20 баллов)
+            CASE WHEN instr(fold_search(u.username), :query) = 1 THEN 20 ELSE 0 END
+            +
+            -- Релевантность bm25 (макс 15 баллов): название > автор > теги > описание
+            MIN(15.0, -bm25(VideoSearch, 10.0, 1.0, 5.0, 2.0))
+            +
+            -- Популярность (логарифмическая, макс 5 баллов)
+            CASE 
+                WHEN v.views_count > 0 THEN MIN(5.0, LOG10(v.views_count + 1))
+                ELSE 0
+            END
+        ) as relevance_score
+    FROM VideoSearch
+    JOIN Videos v ON v.id = VideoSearch.rowid
+    JOIN Users u ON v.user_id = u.id
+    WHERE VideoSearch MATCH :match
+'''
+
+QUERIES.register('search_videos', f'''
+    SELECT * FROM ({SEARCH_VIDEOS_SCORED})
+    ORDER BY relevance_score DESC, views_count DESC, id DESC
+    LIMIT :limit
+''')
+
+QUERIES.register('search_videos_after', f'''
+    SELECT * FROM ({SEARCH_VIDEOS_SCORED})
+    WHERE (relevance_score, views_count, id) < (:score, :views, :id)
+    ORDER BY relevance_score DESC, views_count DESC, id DESC
+    LIMIT :limit
+''')
+
+# История просмотров пользователя (get_user_history).
+# Ключ страницы — (watched_at, history_id), индекс History (user_id, watched_at)
+USER_HISTORY = f'''
+    SELECT h.*, v.*, u.username, u.pfp_path, h.id AS history_id, {THUMBNAIL_VARIANT_COLUMNS}
+    FROM History h
+    JOIN Videos v ON h.video_id = v.id
+    JOIN Users u ON v.user_id = u.id
+    WHERE h.user_id = :user_id
+    {{after}}
+    ORDER BY h.watched_at DESC, h.id DESC
+    LIMIT :limit
+'''
+QUERIES.register('user_history', USER_HISTORY.format(after=''))
+QUERIES.register(
+    'user_history_after',
+    USER_HISTORY.format(after='AND (h.watched_at, h.id) < (:watched_at, :id)')
+)
+
+# Поиск по истории просмотров (search_user_history).
+# Последний просмотр каждого видео из истории пользователя (индекс History по user_id),
+# в котором запрос встречается как подстрока названия, автора или тега ({substring})
+# либо слова запроса находятся индексом VideoSearch по префиксу ({fts_match})
+SEARCH_USER_HISTORY = f'''
+    WITH watched AS MATERIALIZED (
+        SELECT
+            h.id AS history_id,
+            h.watched_at,
+            fold_search(v.title) AS folded_title,
+            fold_search(u.username) AS folded_author
+        FROM History h
+        JOIN Videos v ON v.id = h.video_id
+        JOIN Users u ON v.user_id = u.id
+        WHERE h.user_id = :user_id
+          AND (
+            {{fts_match}}
+            {{substring}}
+          )
+          AND h.id = (
+            SELECT h2.id
+            FROM History h2
+            WHERE h2.user_id = :user_id AND h2.video_id = h.video_id
+            ORDER BY h2.watched_at DESC
+            LIMIT 1
+          )
+    ),
+    ranked AS (
+        SELECT
+            history_id,
+            watched_at,
+            (
+                -- Точное совпадение в названии (50 баллов)
+                CASE WHEN folded_title = :query THEN 50 ELSE 0 END
+                +
+                -- Название начинается с запроса (30 баллов)
+                CASE WHEN instr(folded_title, :query) = 1 THEN 30 ELSE 0 END
+                +
+                -- Название содержит запрос (15 баллов)
+                CASE WHEN instr(folded_title, :query) > 0 THEN 15 ELSE 0 END
+                +
+                -- Точное совпадение автора (40 баллов)
+                CASE WHEN folded_author = :query THEN 40 ELSE 0 END
+                +
+                -- Автор начинается с запроса (25 баллов)
+                CASE WHEN instr(folded_author, :query) = 1 THEN 25 ELSE 0 END
+                +
+                -- Автор содержит запрос (10 баллов)
+                CASE WHEN instr(folded_author, :query) > 0 THEN 10 ELSE 0 END
+            ) AS relevance_score
+        FROM watched
+    ),
+    top AS MATERIALIZED (
+        SELECT history_id, relevance_score
+        FROM ranked
+        ORDER BY relevance_score DESC, watched_at DESC
+        LIMIT :limit
+    )
+    SELECT h.*, v.*, u.username, u.pfp_path, r.relevance_score, {THUMBNAIL_VARIANT_COLUMNS}
+    FROM top r
+    JOIN History h ON h.id = r.history_id
+    JOIN Videos v ON h.video_id = v.id
+    JOIN Users u ON v.user_id = u.id
+    ORDER BY r.relevance_score DESC, h.watched_at DESC
+'''
+HISTORY_FTS_MATCH = 'h.video_id IN (SELECT rowid FROM VideoSearch WHERE VideoSearch MATCH :match) OR'
+# Подстрока от 3 символов находится триграммным индексом VideoSubstringSearch
+HISTORY_SUBSTRING_TRIGRAM = (
+    'h.video_id IN (SELECT rowid FROM VideoSubstringSearch WHERE VideoSubstringSearch MATCH :substring)'
+)
+# Более короткую подстроку триграммы не находят: свертка текста видео для каждой строки истории
+HISTORY_SUBSTRING_SCAN = '''
+            instr(fold_search(v.title || char(10) || u.username || char(10) || COALESCE((
+                SELECT group_concat(t.name, char(10))
+                FROM VideoTags vt
+                JOIN Tags t ON t.id = vt.tag_id
+                WHERE vt.video_id = h.video_id
+            ), '')), :query) > 0
+'''.strip()
+QUERIES.register(
+    'search_user_history',
+    SEARCH_USER_HISTORY.format(fts_match=HISTORY_FTS_MATCH, substring=HISTORY_SUBSTRING_TRIGRAM)
+)
+QUERIES.register(
+    'search_user_history_short',
+    SEARCH_USER_HISTORY.format(fts_match=HISTORY_FTS_MATCH, substring=HISTORY_SUBSTRING_SCAN)
+)
+# Запрос без слов (только знаки): индекс VideoSearch не используется, остается поиск подстроки
+QUERIES.register(
+    'search_user_history_substring',
+    SEARCH_USER_HISTORY.format(fts_match='', substring=HISTORY_SUBSTRING_TRIGRAM)
+)
+QUERIES.register(
+    'search_user_history_substring_short',
+    SEARCH_USER_HISTORY.format(fts_match='', substring=HISTORY_SUBSTRING_SCAN)
+)
+
+# Комментарии к видео (get_video_comments).
+# Ключ страницы — (created_at, id), индекс Comments (video_id, created_at)
+VIDEO_COMMENTS = '''
+    SELECT c.*, u.username, u.pfp_path
+    FROM Comments c
+    JOIN Users u ON c.user_id = u.id
+    WHERE c.video_id = :video_id
+    {after}
+    ORDER BY c.created_at DESC, c.id DESC
+    LIMIT :limit
+'''
+QUERIES.register('video_comments', VIDEO_COMMENTS.format(after=''))
+QUERIES.register(
+    'video_comments_after',
+    VIDEO_COMMENTS.format(after='AND (c.created_at, c.id) < (:created_at, :id)')
+)
+
+# Лайкнутые видео пользователя (get_liked_videos).
+# Ключ страницы — (liked_at, like_id), индекс Likes (user_id, is_like, timestamp)
+LIKED_VIDEOS = f'''
+    SELECT v.*, u.username, u.pfp_path, l.id AS like_id, l.timestamp AS liked_at, {THUMBNAIL_VARIANT_COLUMNS}
+    FROM Likes l
+    JOIN Videos v ON v.id = l.video_id
+    JOIN Users u ON v.user_id = u.id
+    WHERE l.user_id = :user_id AND l.is_like = 1
+    {{after}}
+    ORDER BY l.timestamp DESC, l.id DESC
+    LIMIT :limit
+'''
+QUERIES.register('liked_videos', LIKED_VIDEOS.format(after=''))
+QUERIES.register(
+    'liked_videos_after',
+    LIKED_VIDEOS.format(after='AND (l.timestamp, l.id) < (:liked_at, :id)')
+)
+
+# Рекомендации: видео непредпочитаемых категорий по базовому рейтингу.
+# :excluded — JSON-список предпочитаемых категорий, их видео берутся из отдельных топов
+RECOMMENDED_TOP = '''
+    SELECT video_id, category_id, base_score, upload_date
+    FROM VideoScores
+    WHERE (category_id IS NULL OR category_id NOT IN (SELECT value FROM json_each(:excluded)))
+    {after}
+    ORDER BY base_score DESC, upload_date DESC, video_id DESC
+    LIMIT :limit
+'''
+QUERIES.register('recommended_top', RECOMMENDED_TOP.format(after=''))
+QUERIES.register(
+    'recommended_top_after',
+    RECOMMENDED_TOP.format(after='AND (base_score, upload_date, video_id) < (:base, :date, :id)')
+)
+
+# Рекомендации: бонусы предпочитаемых категорий (макс 10 баллов)
+QUERIES.register('recommended_bonuses', '''
+    SELECT category_id, MIN(10.0, score / 10.0) AS bonus
+    FROM UserPreferences
+    WHERE user_id = ? AND score > 0
+''')
+
+# Рекомендации: топ предпочитаемой категории
+RECOMMENDED_CATEGORY_TOP = '''
+    SELECT video_id, category_id, base_score, upload_date
+    FROM VideoScores
+    WHERE category_id = :category_id
+    {after}
+    ORDER BY base_score DESC, upload_date DESC, video_id DESC
+    LIMIT :limit
+'''
+QUERIES.register('recommended_category_top', RECOMMENDED_CATEGORY_TOP.format(after=''))
+QUERIES.register(
+    'recommended_category_top_after',
+    RECOMMENDED_CATEGORY_TOP.format(after='AND (base_score, upload_date, video_id) < (:base, :date, :id)')
+)
@@ -0,0 +1,217 @@
+import functools
+import json
+import os
+import threading
+
+from PyQt6.QtCore import QObject, QRect, QRunnable, QSize, QThreadPool, pyqtSignal
+from PyQt6.QtGui import QImage, QPainter, QPixmap
+
+from async_db import BackgroundRequest
+from disk_budget import DiskBudget
+from lazy_import import lazy_module
+from media_probe import file_fingerprint, probe_media
+
+# OpenCV нужен только фоновой задаче, которая строит лист кадров
+cv2 = lazy_module('cv2')
+
+
+INDEX_VERSION = 1
+FRAME_SIZE = QSize(160, 90)   # Размер кадра предпросмотра над ползунком
+COLUMNS = 10                  # Кадров в строке листа
+MIN_INTERVAL_MS = 2000        # Кадр не чаще, чем раз в 2 секунды...
+MAX_FRAMES = 300              # ...и не больше 300 кадров на видео (лист до 1600x2700)
+
+
+class SeekPreviewSheet:
+    """
+    Лист кадров видео для предпросмотра перемотки: кадр для позиции находится
+    арифметикой по индексу, без обращений к декодеру.
+    """
+
+    def __init__(self, pixmap: QPixmap, index: dict):
+        self.pixmap = pixmap
+        self.interval_ms = index['interval_ms']
+        self.count = index['count']
+        self.columns = index['columns']
+        self.frame_width = index['frame_width']
+        self.frame_height = index['frame_height']
+
+    def frame_rect(self, position_ms: int) -> QRect:
+        """Область листа с кадром, ближайшим к position_ms слева"""
+        i = min(self.count - 1, max(0, int(position_ms) // self.interval_ms))
+        return QRect(
+            (i % self.columns) * self.frame_width, (i // self.columns) * self.frame_height,
+            self.frame_width, self.frame_height
+        )
+
+    def frame_at(self, position_ms: int) -> QPixmap:
+        return self.pixmap.copy(self.frame_rect(position_ms))
+
+
+def frame_interval_ms(duration_ms: int) -> int:
+    """Шаг между кадрами: не чаще MIN_INTERVAL_MS и не больше MAX_FRAMES кадров"""
+    return max(MIN_INTERVAL_MS, -(-duration_ms // MAX_FRAMES))
+
+
+def build_sprite_sheet(video_path: str, duration_ms: int, is_cancelled=None):
+    """
+    Извлекает кадр каждые frame_interval_ms и собирает их в один лист.
+    Возвращает (QImage листа, индекс) или None, если кадры не читаются (нет OpenCV, битый файл)
+    или построение отменено (is_cancelled() проверяется перед каждым кадром).
+    """
+    interval = frame_interval_ms(duration_ms)
+    count = max(1, -(-duration_ms // interval))
+    rows = -(-count // COLUMNS)
+    width, height = FRAME_SIZE.width(), FRAME_SIZE.height()
+
+    try:
+        capture = cv2.VideoCapture(video_path)
+    except ImportError:
+        print("OpenCV не установлен: предпросмотр перемотки недоступен")
+        return None
+    try:
+        if not capture.isOpened():
+            return None
+        sheet = QImage(min(count, COLUMNS) * width, rows * height, QImage.Format.Format_RGB888)
+        sheet.fill(0)
+        painter = QPainter(sheet)
+        extracted = 0
+        for i in range(count):
+            if is_cancelled is not None and is_cancelled():
+                extracted = 0
+                break
+            # Кадр из середины интервала лучше соответствует позициям внутри него
+            capture.set(cv2.CAP_PROP_POS_MSEC, min(i * interval + interval // 2, max(0, duration_ms - 1)))
+            ok, frame = capture.read()
+            if not ok or frame is None:
+                continue
+            frame = cv2.resize(frame, (width, height), interpolation=cv2.INTER_AREA)
+            frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+            image = QImage(frame.data, width, height, frame.strides[0], QImage.Format.Format_RGB888)
+            painter.drawImage((i % COLUMNS) * width, (i // COLUMNS) * height, image)
+            extracted += 1
+        painter.end()
+    finally:
+        capture.release()
+
+    if not extracted:
+        return None
+    index = {
+        'version': INDEX_VERSION,
+        'duration_ms': duration_ms,
+        'interval_ms': interval,
+        'count': count,
+        'columns': COLUMNS,
+        'frame_width': width,
+        'frame_height': height,
+    }
+    return sheet, index
+
+
+class SeekPreviewRequest(BackgroundRequest):
+    """Фоновая подготовка листа кадров. Результат (SeekPreviewSheet) приходит сигналом loaded"""
+    loaded = pyqtSignal(object)
+
+    def _deliver(self, image, index):
+        self.finish()
+        if self.is_cancelled() or image is None:
+            return
+        # QPixmap создается только в GUI-потоке
+        self.loaded.emit(SeekPreviewSheet(QPixmap.fromImage(image), index))
+
+
+class _SeekPreviewTask(QRunnable):
+    def __init__(self, store: 'SeekPreviewStore', request: SeekPreviewRequest, video_path: str):
+        super().__init__()
+        self.store = store
+        self.request = request
+        self.video_path = video_path
+
+    def run(self):
+        request = self.request
+        result = None
+        if not request.is_cancelled():
+            try:
+                result = self.store.load_or_build(self.video_path, request)
+            except Exception as e:
+                print(f"Ошибка подготовки предпросмотра {self.video_path}: {e}")
+        image, index = result if result is not None else (None, None)
+        request.post(request._deliver, image, index)
+
+
+class SeekPreviewStore:
+    """
+    Листы кадров на диске: cache/previews/<отпечаток файла>/sheet.jpg и index.json.
+    Лист строится один раз в фоне, дальше читается с диска. Размер каталога
+    ограничен max_disk_bytes: листы, построенные раньше всех, удаляются первыми.
+    """
+
+    def __init__(self, cache_dir: str = 'cache/previews', max_disk_bytes: int = 200 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.max_disk_bytes = max_disk_bytes
+        self.disk_budget = DiskBudget(cache_dir, max_disk_bytes)
+        self._build_lock = threading.Lock()
+        # Один поток: построение листа — долгая фоновая работа, не мешающая воспроизведению
+        self.thread_pool = QThreadPool()
+        self.thread_pool.setMaxThreadCount(1)
+
+    def paths(self, video_path: str):
+        folder = os.path.join(self.cache_dir, file_fingerprint(video_path))
+        return os.path.join(folder, 'sheet.jpg'), os.path.join(folder, 'index.json')
+
+    def load(self, sheet_path: str, index_path: str):
+        """Готовый лист с диска: (QImage, индекс) или None"""
+        try:
+            with open(index_path, encoding='utf-8') as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if index.get('version') != INDEX_VERSION:
+            return None
+        image = QImage(sheet_path)
+        if image.isNull():
+            return None
+        self.disk_budget.touch(sheet_path)
+        self.disk_budget.touch(index_path)
+        return image, index
+
+    def load_or_build(self, video_path: str, request: SeekPreviewRequest = None):
+        sheet_path, index_path = self.paths(video_path)
+        cached = self.load(sheet_path, index_path)
+        if cached is not None:
+            return cached
+
+        with self._build_lock:
+            info = probe_media(video_path)
+            if info is None or not info.duration_ms or (request is not None and request.is_cancelled()):
+                return None
+            built = build_sprite_sheet(
+                video_path, info.duration_ms,
+                is_cancelled=request.is_cancelled if request is not None else None
+            )
+            if built is None:
+                return None
+            image, index = built
+            os.makedirs(os.path.dirname(sheet_path), exist_ok=True)
+            # Сначала лист, затем индекс: индекс без листа не появится
+            tmp_path = f'{sheet_path}.{threading.get_ident()}.tmp'
+            if image.save(tmp_path, 'JPG', 80):
+                os.replace(tmp_path, sheet_path)
+                with open(f'{index_path}.tmp', 'w', encoding='utf-8') as f:
+                    json.dump(index, f)
+                os.replace(f'{index_path}.tmp', index_path)
+                self.disk_budget.add(os.path.getsize(sheet_path) + os.path.getsize(index_path))
+            return image, index
+
+    def request(self, video_path: str, on_loaded, owner: QObject = None) -> SeekPreviewRequest:
+        """Готовит лист кадров в фоне; on_loaded(SeekPreviewSheet) вызывается в GUI-потоке"""
+        request = SeekPreviewRequest(owner)
+        request.loaded.connect(on_loaded)
+        self.thread_pool.start(_SeekPreviewTask(self, request, video_path))
+        return request
+
+
+@functools.cache
+def get_seek_preview_store() -> SeekPreviewStore:
+    """Общее хранилище листов кадров приложения"""
+    return SeekPreviewStore()
@@ -0,0 +1,112 @@
+import sys
+import threading
+import time
+
+
+class StartupTimer:
+    """
+    Засекает этапы запуска приложения (мс от создания таймера).
+    Создается как можно раньше, отметки ставятся один раз.
+    verbose — печатать этапы по мере наступления (при профилировании запуска).
+    """
+
+    def __init__(self, verbose: bool = False):
+        self.started = time.perf_counter()
+        self.marks = {}
+        self.verbose = verbose
+
+    def elapsed_ms(self) -> float:
+        return (time.perf_counter() - self.started) * 1000
+
+    def mark(self, name: str) -> float:
+        """Запоминает время этапа name (повторные отметки игнорируются)"""
+        if name not in self.marks:
+            self.marks[name] = self.elapsed_ms()
+            if self.verbose:
+                print(f"[запуск] {name}: {self.marks[name]:.0f} мс")
+        return self.marks[name]
+
+    def report(self) -> dict:
+        """Отметки этапов в порядке их наступления"""
+        return dict(sorted(self.marks.items(), key=lambda item: item[1]))
+
+
+# Общий таймер: отсчет идет от первого импорта модуля
+STARTUP = StartupTimer()
+
+
+class _TimedLoader:
+    """Обертка загрузчика модуля, засекающая выполнение модуля"""
+
+    def __init__(self, loader, profiler: 'ImportProfiler'):
+        self._loader = loader
+        self._profiler = profiler
+
+    def create_module(self, spec):
+        return self._loader.create_module(spec)
+
+    def exec_module(self, module):
+        self._profiler._enter()
+        try:
+            self._loader.exec_module(module)
+        finally:
+            self._profiler._leave(module.__name__)
+
+    def __getattr__(self, attr):
+        return getattr(self._loader, attr)
+
+
+class ImportProfiler:
+    """
+    Профилировщик импорта внутри приложения, аналог python -X importtime:
+    для каждого модуля — собственное время выполнения и время вместе с вложенными импортами.
+    Устанавливается в sys.meta_path до импорта профилируемых модулей.
+    """
+
+    def __init__(self):
+        self.records = []   # (модуль, собственное мс, всего мс, глубина)
+        self._stack = []    # [начало, время вложенных импортов]
+        self._finding = threading.local()
+
+    def install(self) -> 'ImportProfiler':
+        if self not in sys.meta_path:
+            sys.meta_path.insert(0, self)
+        return self
+
+    def uninstall(self):
+        if self in sys.meta_path:
+            sys.meta_path.remove(self)
+
+    def find_spec(self, fullname, path, target=None):
+        if getattr(self._finding, 'active', False):
+            return None
+        self._finding.active = True
+        try:
+            for finder in sys.meta_path:
+                if finder is self or not hasattr(finder, 'find_spec'):
+                    continue
+                spec = finder.find_spec(fullname, path, target)
+                if spec is not None:
+                    if spec.loader is not None and hasattr(spec.loader, 'exec_module'):
+                        spec.loader = _TimedLoader(spec.loader, self)
+                    return spec
+            return None
+        finally:
+            self._finding.active = False
+
+    def _enter(self):
+        self._stack.append([time.perf_counter(), 0.0])
+
+    def _leave(self, name: str):
+        started, children_ms = self._stack.pop()
+        total_ms = (time.perf_counter() - started) * 1000
+        if self._stack:
+            self._stack[-1][1] += total_ms
+        self.records.append((name, total_ms - children_ms, total_ms, len(self._stack)))
+
+    def report(self, limit: int = 25) -> str:
+        """Самые дорогие модули по времени вместе с вложенными импортами"""
+        lines = [f"{'собств., мс':>12} | {'всего, мс':>10} | модуль"]
+        for name, self_ms, total_ms, depth in sorted(self.records, key=lambda r: r[2], reverse=True)[:limit]:
+            lines.append(f"{self_ms:12.1f} | {total_ms:10.1f} | {'  ' * depth}{name}")
+        return '\n'.join(lines)
@@ -0,0 +1,288 @@
+import functools
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+from PyQt6.QtCore import Qt, QObject, QRectF, QRunnable, QSize, QThreadPool, pyqtSignal
+from PyQt6.QtGui import QColor, QImage, QImageReader, QPainter, QPainterPath, QPixmap
+
+from async_db import BackgroundRequest
+from disk_budget import DiskBudget
+
+
+def render_rounded_thumbnail(image: QImage, size: QSize, radius: int) -> QImage:
+    """
+    Масштабирует изображение под size (с заполнением, как KeepAspectRatioByExpanding)
+    и скругляет углы радиусом radius. Работает с QImage, поэтому безопасно вне GUI-потока.
+    """
+    if image.size() == size:
+        # Вариант превью нужного размера (thumbnail_variants.py) — только скругление
+        scaled = image
+    else:
+        scaled = image.scaled(
+            size, Qt.AspectRatioMode.KeepAspectRatioByExpanding,
+            Qt.TransformationMode.SmoothTransformation
+        )
+    result = QImage(scaled.size(), QImage.Format.Format_ARGB32_Premultiplied)
+    result.fill(Qt.GlobalColor.transparent)
+
+    path = QPainterPath()
+    path.addRoundedRect(QRectF(0, 0, scaled.width(), scaled.height()), radius, radius)
+
+    painter = QPainter(result)
+    painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+    painter.setClipPath(path)
+    painter.drawImage(0, 0, scaled)
+    painter.end()
+    return result
+
+
+def decode_scaled(path: str, size: QSize):
+    """
+    Декодирует изображение сразу в размере, покрывающем size (как KeepAspectRatioByExpanding).
+    Для JPEG это масштабирование при декодировании: полноразмерный кадр в памяти не создается.
+    """
+    reader = QImageReader(path)
+    source_size = reader.size()
+    if source_size.isValid() and (source_size.width() > size.width() or source_size.height() > size.height()):
+        reader.setScaledSize(source_size.scaled(size, Qt.AspectRatioMode.KeepAspectRatioByExpanding))
+    image = reader.read()
+    return None if image.isNull() else image
+
+
+class ThumbnailRequest(BackgroundRequest):
+    """
+    Фоновая загрузка одного превью. Результат приходит сигналом loaded в GUI-поток.
+    owner — карточка: после ее удаления (refresh/search) превью ей больше не нужно.
+    """
+    loaded = pyqtSignal(QPixmap)
+
+    def __init__(self, cache: 'ThumbnailCache', key: str, owner: QObject = None):
+        super().__init__(owner)
+        self.cache = cache
+        self.key = key
+
+    def _deliver(self, image):
+        self.finish()
+        if image is None:
+            return
+        # QPixmap создается только в GUI-потоке
+        pixmap = QPixmap.fromImage(image)
+        self.cache.put_memory(self.key, pixmap)
+        if not self.is_cancelled():
+            self.loaded.emit(pixmap)
+
+
+class _ThumbnailTask(QRunnable):
+    def __init__(self, request: ThumbnailRequest, path: str, size: QSize, radius: int):
+        super().__init__()
+        self.request = request
+        self.path = path
+        self.size = QSize(size)
+        self.radius = radius
+
+    def run(self):
+        request = self.request
+        image = None
+        if not request.is_cancelled():
+            try:
+                image = request.cache.load_image(self.path, self.size, self.radius, request.key)
+            except Exception as e:
+                print(f"Ошибка загрузки превью {self.path}: {e}")
+        request.post(request._deliver, image)
+
+
+class ThumbnailCache:
+    """
+    Двухуровневый кэш превью: LRU готовых QPixmap в памяти и PNG уже масштабированных
+    и скругленных превью на диске. Ключ — (путь, время изменения, размер, радиус),
+    поэтому измененный файл превью автоматически получает новую запись.
+    """
+
+    def __init__(self, cache_dir: str = 'cache/thumbnails', max_items: int = 256,
+                 max_disk_bytes: int = 200 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.max_items = max_items
+        self.max_disk_bytes = max_disk_bytes
+        self._memory = OrderedDict()
+        self._placeholders = {}
+        self._lock = threading.Lock()
+        self.disk_budget = DiskBudget(cache_dir, max_disk_bytes)
+        self.thread_pool = QThreadPool()
+        self.thread_pool.setMaxThreadCount(max(2, QThreadPool.globalInstance().maxThreadCount() - 1))
+
+        # Статистика
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def key(self, path: str, size: QSize, radius: int):
+        """Ключ кэша или None, если файла нет"""
+        try:
+            stat = os.stat(path)
+        except (OSError, TypeError, ValueError):
+            return None
+        raw = f'{os.path.abspath(path)}|{stat.st_mtime_ns}|{stat.st_size}|{size.width()}x{size.height()}|{radius}'
+        return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+    def disk_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], f'{key}.png')
+
+    # === ПАМЯТЬ ===
+    def get_memory(self, key: str):
+        with self._lock:
+            pixmap = self._memory.get(key)
+            if pixmap is not None:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+            return pixmap
+
+    def put_memory(self, key: str, pixmap: QPixmap):
+        with self._lock:
+            self._memory[key] = pixmap
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_items:
+                self._memory.popitem(last=False)
+
+    # === ДИСК ===
+    def load_disk(self, key: str):
+        """Читает готовое превью с диска (QImage), None если его нет"""
+        path = self.disk_path(key)
+        image = QImage(path)
+        if image.isNull():
+            return None
+        self.disk_budget.touch(path)
+        with self._lock:
+            self.disk_hits += 1
+        return image
+
+    def save_disk(self, key: str, image: QImage):
+        path = self.disk_path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Пишем во временный файл и переименовываем, чтобы не оставить оборванный PNG
+            tmp_path = f'{path}.{threading.get_ident()}.tmp'
+            if not image.save(tmp_path, 'PNG'):
+                return
+            os.replace(tmp_path, path)
+            size = os.path.getsize(path)
+        except OSError as e:
+            print(f"Не удалось сохранить превью в кэш: {e}")
+            return
+        # Старые превью удаляются, когда записанное за сеанс превышает max_disk_bytes
+        self.disk_budget.add(size)
+
+    def prune_disk(self):
+        """Удаляет самые старые файлы, если кэш на диске превысил max_disk_bytes"""
+        self.disk_budget.prune(self.max_disk_bytes)
+
+    # === ПОЛУЧЕНИЕ ПРЕВЬЮ ===
+    def load_image(self, path: str, size: QSize, radius: int, key: str = None):
+        """
+        Готовое превью в виде QImage: с диска или декодирование исходника с сохранением в кэш.
+        Не создает QPixmap, поэтому может выполняться в фоновом потоке.
+        """
+        key = key or self.key(path, size, radius)
+        if key is None:
+            return None
+        image = self.load_disk(key)
+        if image is not None:
+            return image
+
+        source = decode_scaled(path, size)
+        if source is None:
+            return None
+        with self._lock:
+            self.misses += 1
+        image = render_rounded_thumbnail(source, size, radius)
+        self.save_disk(key, image)
+        return image
+
+    def get(self, path: str, size: QSize, radius: int):
+        """Возвращает QPixmap превью или None, если файл не найден или не читается"""
+        key = self.key(path, size, radius)
+        if key is None:
+            return None
+        pixmap = self.get_memory(key)
+        if pixmap is not None:
+            return pixmap
+
+        image = self.load_image(path, size, radius, key)
+        if image is None:
+            return None
+        pixmap = QPixmap.fromImage(image)
+        self.put_memory(key, pixmap)
+        return pixmap
+
+    def get_async(self, path: str, size: QSize, radius: int, on_loaded, owner: QObject = None):
+        """
+        Возвращает (QPixmap, None), если превью уже в памяти. Иначе запускает декодирование
+        в пуле потоков и возвращает (None, ThumbnailRequest); on_loaded(pixmap) будет вызван
+        в GUI-потоке, если запрос не отменен и owner к этому моменту еще существует.
+        """
+        key = self.key(path, size, radius)
+        if key is None:
+            return None, None
+        pixmap = self.get_memory(key)
+        if pixmap is not None:
+            return pixmap, None
+
+        request = ThumbnailRequest(self, key, owner)
+        request.loaded.connect(on_loaded)
+        self.thread_pool.start(_ThumbnailTask(request, path, size, radius))
+        return None, request
+
+    def placeholder(self, size: QSize, radius: int) -> QPixmap:
+        """Заглушка со скругленными углами на время загрузки превью"""
+        key = (size.width(), size.height(), radius)
+        pixmap = self._placeholders.get(key)
+        if pixmap is None:
+            pixmap = QPixmap(size)
+            pixmap.fill(Qt.GlobalColor.transparent)
+            path = QPainterPath()
+            path.addRoundedRect(QRectF(0, 0, size.width(), size.height()), radius, radius)
+            painter = QPainter(pixmap)
+            painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+            painter.fillPath(path, QColor('#e6d5d6'))
+            painter.end()
+            self._placeholders[key] = pixmap
+        return pixmap
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'memory_items': len(self._memory),
+                'memory_hits': self.memory_hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+            }
+
+
+@functools.cache
+def get_thumbnail_cache() -> ThumbnailCache:
+    """Общий кэш превью приложения"""
+    return ThumbnailCache()
+
+
+def get_rounded_thumbnail(path: str, size: QSize, radius: int):
+    """Масштабированное превью со скругленными углами из общего кэша"""
+    return get_thumbnail_cache().get(path, size, radius)
+
+
+def set_thumbnail_async(label, path: str, radius: int, owner: QObject):
+    """
+    Показывает в label превью из кэша, а если его еще нет в памяти — заглушку,
+    которая заменяется превью по окончании фонового декодирования.
+    Возвращает запрос (или None), чтобы его можно было отменить при переиспользовании label.
+    """
+    cache = get_thumbnail_cache()
+    size = label.size()
+
+    def on_loaded(pixmap):
+        label.setPixmap(pixmap)
+
+    pixmap, request = cache.get_async(path, size, radius, on_loaded, owner=owner)
+    label.setPixmap(pixmap if pixmap is not None else cache.placeholder(size, radius))
+    label.setScaledContents(True)
+    return request
@@ -0,0 +1,114 @@
+from PyQt6.QtCore import Qt, QBuffer, QByteArray, QIODevice, QRect, QSize
+from PyQt6.QtGui import QImage, QImageWriter
+
+from lazy_import import lazy_module
+from thumbnail_cache import decode_scaled
+
+# OpenCV нужен только для кадра из видео при загрузке
+cv2 = lazy_module('cv2')
+
+
+# Размеры превью, в которых их показывают карточки (размер QLabel thumnbnail в ui/*.py).
+# Варианты создаются при загрузке видео, поэтому при показе превью не масштабируется
+THUMBNAIL_VARIANTS = {
+    'tile': QSize(332, 167),   # Плитка ленты (ui/video_ui.py)
+    'card': QSize(327, 165),   # Длинная карточка истории и профиля (ui/video_horizontal_long_ui.py)
+}
+
+JPEG_QUALITY = 85
+WEBP_QUALITY = 80
+FRAME_POSITION = 0.1       # Кадр для превью — 10% длительности видео...
+MAX_FRAME_OFFSET_MS = 10000  # ...но не дальше 10 секунд от начала
+
+
+def variant_path(video_info, variant: str) -> str:
+    """
+    Путь к превью нужного размера для строки видео из БД (thumbnail_tile, thumbnail_card),
+    либо исходное превью, если вариантов нет (видео, загруженные до их появления)
+    """
+    column = f'thumbnail_{variant}'
+    if column in video_info.keys() and video_info[column]:
+        return video_info[column]
+    return video_info['thumbnail']
+
+
+def image_format() -> tuple:
+    """(формат Qt, расширение, качество): WebP, если есть плагин qtimageformats, иначе JPEG"""
+    if b'webp' in QImageWriter.supportedImageFormats():
+        return 'WEBP', '.webp', WEBP_QUALITY
+    return 'JPEG', '.jpg', JPEG_QUALITY
+
+
+def grab_video_frame(path: str, duration_ms: int = 0):
+    """Кадр из видео для превью (QImage) или None, если OpenCV недоступен или кадр не читается"""
+    try:
+        capture = cv2.VideoCapture(path)
+    except ImportError:
+        print("OpenCV не установлен: превью из кадра видео не создается")
+        return None
+    try:
+        if not capture.isOpened():
+            return None
+        offset_ms = min(duration_ms * FRAME_POSITION, MAX_FRAME_OFFSET_MS)
+        if offset_ms > 0:
+            capture.set(cv2.CAP_PROP_POS_MSEC, offset_ms)
+        ok, frame = capture.read()
+        if not ok and offset_ms > 0:
+            # Поиск по времени поддерживается не всеми контейнерами — берем первый кадр
+            capture.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            ok, frame = capture.read()
+        if not ok or frame is None:
+            return None
+        frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        height, width = frame.shape[:2]
+        # copy(): QImage не владеет буфером numpy
+        return QImage(frame.data, width, height, frame.strides[0], QImage.Format.Format_RGB888).copy()
+    finally:
+        capture.release()
+
+
+def load_source_image(thumbnail_path: str = None, video_path: str = None, duration_ms: int = 0):
+    """Исходное изображение для вариантов: выбранное пользователем превью или кадр из видео"""
+    if thumbnail_path:
+        # Декодируется сразу в размере, достаточном для самого крупного варианта
+        largest = max(THUMBNAIL_VARIANTS.values(), key=lambda size: size.width() * size.height())
+        image = decode_scaled(thumbnail_path, largest)
+        if image is not None:
+            return image
+    if video_path:
+        return grab_video_frame(video_path, duration_ms)
+    return None
+
+
+def render_variant(image: QImage, size: QSize) -> QImage:
+    """Масштабирует с заполнением и обрезает по центру ровно до size"""
+    scaled = image.scaled(
+        size, Qt.AspectRatioMode.KeepAspectRatioByExpanding,
+        Qt.TransformationMode.SmoothTransformation
+    )
+    x = (scaled.width() - size.width()) // 2
+    y = (scaled.height() - size.height()) // 2
+    return scaled.copy(QRect(x, y, size.width(), size.height()))
+
+
+def encode_image(image: QImage, fmt: str, quality: int) -> bytes:
+    data = QByteArray()
+    buffer = QBuffer(data)
+    buffer.open(QIODevice.OpenModeFlag.WriteOnly)
+    if not image.convertToFormat(QImage.Format.Format_RGB888).save(buffer, fmt, quality):
+        raise ValueError(f"Не удалось закодировать превью в {fmt}")
+    buffer.close()
+    return bytes(data)
+
+
+def build_thumbnail_variants(source: QImage) -> dict:
+    """
+    Кодирует все варианты превью. Возвращает {вариант: (данные, расширение, ширина, высота)}.
+    Работает только с QImage, поэтому выполняется в потоке загрузки.
+    """
+    fmt, extension, quality = image_format()
+    variants = {}
+    for name, size in THUMBNAIL_VARIANTS.items():
+        image = render_variant(source, size)
+        variants[name] = (encode_image(image, fmt, quality), extension, size.width(), size.height())
+    return variants
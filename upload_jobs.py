@@ -0,0 +1,202 @@
+import os
+import time
+
+from PyQt6.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
+
+from async_db import BackgroundRequest, instance_for
+from db import Database
+from file_transfer import CHUNK_SIZE, TransferCancelled, remove_quietly
+from media_probe import probe_media
+from thumbnail_variants import build_thumbnail_variants, load_source_image
+
+
+class UploadJob(BackgroundRequest):
+    """
+    Загрузка одного видео: копирование файлов в хранилище медиа (media_store.py), проверка копии
+    и только после этого запись в БД. Сигналы доставляются в GUI-поток.
+    Отмена (cancel) действует до записи в БД.
+    """
+    # Этапы загрузки (для отображения в интерфейсе)
+    STAGE_COPY = 'Копирование'
+    STAGE_VERIFY = 'Проверка'
+    STAGE_THUMBNAILS = 'Создание превью'
+    STAGE_SAVE = 'Сохранение'
+
+    progress = pyqtSignal(object, object, float)  # Скопировано байт, всего байт, скорость (байт/с)
+    stageChanged = pyqtSignal(str)
+    finished = pyqtSignal(dict)                    # Данные загруженного видео (с video_id)
+    failed = pyqtSignal(str)
+    cancelled = pyqtSignal()
+
+    def __init__(self, video_data: dict):
+        super().__init__()
+        self.video_data = dict(video_data)
+
+    def _deliver_result(self, video_data):
+        self.finish()
+        self.finished.emit(video_data)
+
+    def _deliver_error(self, message):
+        self.finish()
+        print(f"Ошибка загрузки видео: {message}")
+        self.failed.emit(message)
+
+    def _deliver_cancel(self):
+        self.finish()
+        self.cancelled.emit()
+
+
+class _UploadTask(QRunnable):
+    def __init__(self, job: UploadJob, db: Database, chunk_size: int):
+        super().__init__()
+        self.job = job
+        self.db = db
+        self.store = db.media_store
+        self.chunk_size = chunk_size
+
+    def run(self):
+        job = self.job
+        staged = []  # (временная копия, sha256)
+        try:
+            video_data = self.upload(staged)
+        except TransferCancelled:
+            self.discard(staged)
+            job.post(job._deliver_cancel)
+        except Exception as e:
+            self.discard(staged)
+            job.post(job._deliver_error, str(e))
+        else:
+            job.post(job._deliver_result, video_data)
+
+    def upload(self, staged: list) -> dict:
+        job = self.job
+        video_data = dict(job.video_data)
+        sources = [video_data['file_path']]
+        if video_data.get('thumbnail_path'):
+            sources.append(video_data['thumbnail_path'])
+
+        # Общий прогресс по всем файлам задачи
+        total = sum(os.path.getsize(path) for path in sources)
+        done_bytes = 0
+        started = time.perf_counter()
+
+        def on_progress(copied, _file_total, _speed):
+            current = done_bytes + copied
+            job.post(job.progress.emit, current, total, current / max(time.perf_counter() - started, 1e-6))
+
+        job.post(job.stageChanged.emit, UploadJob.STAGE_COPY)
+        for source_path in sources:
+            # Хэш содержимого считается по ходу копирования, повторного чтения исходника нет
+            staged.append(self.store.stage(
+                source_path, self.chunk_size, on_progress=on_progress, is_cancelled=job.is_cancelled
+            ))
+            done_bytes += os.path.getsize(source_path)
+
+        # Длительность определяется по копии: именно она будет воспроизводиться
+        job.post(job.stageChanged.emit, UploadJob.STAGE_VERIFY)
+        info = probe_media(staged[0][0])
+        if info is None:
+            raise ValueError("Не удалось прочитать видеофайл: формат не поддерживается")
+        video_data['duration'] = info.duration_seconds
+
+        # Превью под размеры карточек: из выбранного изображения или из кадра видео
+        job.post(job.stageChanged.emit, UploadJob.STAGE_THUMBNAILS)
+        has_thumbnail = len(staged) > 1
+        variants = self.stage_thumbnail_variants(
+            staged[1][0] if has_thumbnail else None, staged[0][0], info.duration_ms
+        )
+        staged.extend((staged_path, digest) for _, staged_path, digest, _, _ in variants)
+
+        if job.is_cancelled():
+            raise TransferCancelled()
+
+        job.post(job.stageChanged.emit, UploadJob.STAGE_SAVE)
+        # Под блокировкой хранилища файл не может быть удален сборкой мусора,
+        # пока на него не появится ссылка из Videos
+        with self.store.lock:
+            blobs = [self.place(staged_path, digest) for staged_path, digest in staged]
+            staged.clear()
+            video_data['file_path'] = blobs[0][1]
+            # Варианты идут в blobs после видео и исходного превью
+            variant_blobs = blobs[len(blobs) - len(variants):]
+            thumbnail_variants = [
+                (name, blob[1], width, height)
+                for (name, _, _, width, height), blob in zip(variants, variant_blobs)
+            ]
+            if has_thumbnail:
+                video_data['thumbnail_path'] = blobs[1][1]
+            else:
+                # Без выбранного превью исходным считается самый крупный вариант из кадра видео
+                video_data['thumbnail_path'] = max(
+                    thumbnail_variants, key=lambda variant: variant[2] * variant[3]
+                )[1] if thumbnail_variants else ''
+            try:
+                # Видео, теги, категория, варианты превью и ссылки на файлы записываются одной транзакцией
+                video_data['video_id'] = self.db.upload_video(
+                    **video_data, media_blobs=blobs, thumbnail_variants=thumbnail_variants
+                )
+            except Exception:
+                # Новые файлы без записей в MediaBlobs удаляются, общие с другими видео остаются
+                self.store.remove([path for digest, path, _ in blobs if self.db.get_media_blob(digest) is None])
+                raise
+        return video_data
+
+    def stage_thumbnail_variants(self, thumbnail_path, video_path, duration_ms):
+        """Создает варианты превью во временном каталоге: [(вариант, путь, sha256, ширина, высота)]"""
+        try:
+            source = load_source_image(thumbnail_path, video_path, duration_ms)
+            built = build_thumbnail_variants(source) if source is not None else {}
+        except Exception as e:
+            # Без вариантов видео загружается, карточки покажут исходное превью
+            print(f"Не удалось создать превью: {e}")
+            return []
+        variants = []
+        for name, (data, extension, width, height) in built.items():
+            staged_path, digest = self.store.stage_bytes(data, extension)
+            variants.append((name, staged_path, digest, width, height))
+        return variants
+
+    def place(self, staged_path: str, digest: str):
+        """Переносит копию в хранилище (файл с тем же содержимым переиспользуется): (sha256, путь, размер)"""
+        path = self.store.place(staged_path, digest)
+        return digest, path, os.path.getsize(path)
+
+    @staticmethod
+    def discard(staged):
+        """Удаляет временные копии незавершенной загрузки"""
+        for staged_path, _ in staged:
+            remove_quietly(staged_path)
+
+
+class UploadManager(QObject):
+    """
+    Очередь загрузок видео. Файлы копируются в хранилище медиа (Database.media_store);
+    загрузки выполняются по одной, чтобы не делить пропускную способность диска.
+    """
+    def __init__(self, db: Database, chunk_size: int = CHUNK_SIZE):
+        super().__init__()
+        self.db = db
+        self.chunk_size = chunk_size
+        self.thread_pool = QThreadPool()
+        self.thread_pool.setMaxThreadCount(1)
+
+    @classmethod
+    def of(cls, db: Database) -> 'UploadManager':
+        """Возвращает общую очередь загрузок для экземпляра Database"""
+        return instance_for(cls, db)
+
+    def submit(self, video_data: dict) -> UploadJob:
+        """
+        Ставит загрузку в очередь. video_data — аргументы Database.upload_video
+        без duration (она определяется по скопированному файлу).
+        """
+        job = UploadJob(video_data)
+        self.thread_pool.start(_UploadTask(job, self.db, self.chunk_size))
+        return job
+
+    def cancel_all(self):
+        for job in UploadJob.pending():
+            job.cancel()
+
+    def wait_for_done(self, msecs: int = -1) -> bool:
+        return self.thread_pool.waitForDone(msecs)
@@ -0,0 +1,199 @@
+import functools
+import os
+import threading
+from collections import OrderedDict
+
+from PyQt6.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
+
+from async_db import BackgroundRequest
+from media_probe import get_media_probe, nearest_keyframe_ms, probe_media
+
+
+class KeyframeRequest(BackgroundRequest):
+    """Поиск ключевого кадра для позиции старта. Результат приходит сигналом resolved(start_ms, мс)"""
+    resolved = pyqtSignal(int, int)
+
+    def _deliver(self, start_ms, position_ms):
+        self.finish()
+        if not self.is_cancelled():
+            self.resolved.emit(start_ms, position_ms)
+
+
+class _KeyframeTask(QRunnable):
+    def __init__(self, request: KeyframeRequest, path: str, start_ms: int):
+        super().__init__()
+        self.request = request
+        self.path = path
+        self.start_ms = start_ms
+
+    def run(self):
+        request = self.request
+        position_ms = self.start_ms
+        try:
+            if not request.is_cancelled():
+                position_ms = nearest_keyframe_ms(self.path, self.start_ms)
+        except Exception as e:
+            # Любая ошибка разбора индекса: плеер стартует с точной позиции
+            print(f"Не удалось прочитать индекс ключевых кадров {self.path}: {e}")
+        finally:
+            # Ответ приходит всегда, иначе запрос так и останется в числе активных
+            request.post(request._deliver, self.start_ms, position_ms)
+
+
+class _PrefetchTask(QRunnable):
+    def __init__(self, prefetcher: 'VideoPrefetcher', path: str):
+        super().__init__()
+        self.prefetcher = prefetcher
+        self.path = path
+
+    def run(self):
+        try:
+            self.prefetcher.warm_file(self.path)
+        except OSError as e:
+            print(f"Не удалось подготовить видео {self.path}: {e}")
+        finally:
+            self.prefetcher._finish(self.path)
+
+
+class VideoPrefetcher:
+    """
+    Заранее читает в страничный кэш ОС начало и конец видео, которые вероятно откроют следующими
+    (следующие в ленте рекомендаций). Начало — первые секунды потока, конец — индекс
+    контейнера (moov в MP4, Cues в MKV, idx1 в AVI), поэтому открытие такого видео
+    не ждет диска ни на разборе контейнера, ни на первых кадрах.
+    """
+    HEAD_SECONDS = 5                  # Сколько секунд видео прочитать с начала файла
+    MIN_HEAD_BYTES = 1024 * 1024
+    MAX_HEAD_BYTES = 16 * 1024 * 1024
+    TAIL_BYTES = 1024 * 1024          # Индекс контейнера в конце файла
+    READ_CHUNK = 1024 * 1024
+    MAX_TRACKED = 64                  # Сколько подготовленных файлов помнить
+
+    def __init__(self):
+        self._warm = OrderedDict()    # path -> (mtime_ns, size) на момент подготовки
+        self._pending = set()
+        self._lock = threading.Lock()
+        # Один поток: подготовка не должна конкурировать с воспроизведением за диск
+        self.thread_pool = QThreadPool()
+        self.thread_pool.setMaxThreadCount(1)
+
+        # Статистика
+        self.warmed_files = 0
+        self.warmed_bytes = 0
+        self._opens = {True: [], False: []}  # Время до первого кадра: подготовленные / холодные
+
+    # === ПОДГОТОВКА ===
+    def prefetch(self, paths):
+        """
+        Ставит видео в очередь подготовки (в порядке вероятности открытия).
+        Еще не начатая подготовка прежних предсказаний отменяется — они уже неактуальны.
+        """
+        self.thread_pool.clear()
+        with self._lock:
+            # Задачи, удаленные из очереди, так и не выполнятся
+            self._pending.clear()
+        for path in paths:
+            if not path or self.is_warm(path):
+                continue
+            with self._lock:
+                if path in self._pending:
+                    continue
+                self._pending.add(path)
+            self.thread_pool.start(_PrefetchTask(self, path))
+
+    def head_bytes(self, path: str, size: int) -> int:
+        """Размер начала файла для HEAD_SECONDS секунд по среднему битрейту"""
+        info = probe_media(path)
+        if info is None or not info.bitrate:
+            return min(size, self.MIN_HEAD_BYTES)
+        head = info.bitrate // 8 * self.HEAD_SECONDS
+        return min(size, max(self.MIN_HEAD_BYTES, min(self.MAX_HEAD_BYTES, head)))
+
+    def warm_file(self, path: str):
+        """Читает начало и индекс файла в страничный кэш ОС (выполняется в фоновом потоке)"""
+        stat = os.stat(path)
+        size = stat.st_size
+        head = self.head_bytes(path, size)
+        tail_start = max(head, size - self.TAIL_BYTES)
+        ranges = [(0, head)] + ([(tail_start, size - tail_start)] if tail_start < size else [])
+
+        with open(path, 'rb', buffering=0) as f:
+            if hasattr(os, 'posix_fadvise'):
+                # Ядро читает диапазоны асинхронно, данные не копируются в процесс
+                for offset, length in ranges:
+                    os.posix_fadvise(f.fileno(), offset, length, os.POSIX_FADV_WILLNEED)
+            else:
+                # Windows: обычное чтение в один переиспользуемый буфер
+                buffer = bytearray(self.READ_CHUNK)
+                view = memoryview(buffer)
+                for offset, length in ranges:
+                    f.seek(offset)
+                    while length > 0:
+                        read = f.readinto(view[:min(length, self.READ_CHUNK)])
+                        if not read:
+                            break
+                        length -= read
+
+        # Индекс ключевых кадров для продолжения просмотра — из уже подготовленных частей файла
+        get_media_probe().keyframes(path)
+
+        with self._lock:
+            self._warm[path] = (stat.st_mtime_ns, size)
+            self._warm.move_to_end(path)
+            while len(self._warm) > self.MAX_TRACKED:
+                self._warm.popitem(last=False)
+            self.warmed_files += 1
+            self.warmed_bytes += sum(length for _, length in ranges)
+
+    def _finish(self, path: str):
+        with self._lock:
+            self._pending.discard(path)
+
+    def is_warm(self, path: str) -> bool:
+        """True, если файл подготовлен и с тех пор не изменился"""
+        with self._lock:
+            state = self._warm.get(path)
+        if state is None:
+            return False
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return False
+        return state == (stat.st_mtime_ns, stat.st_size)
+
+    def resolve_keyframe(self, path: str, start_ms: int, on_resolved, owner: QObject = None) -> KeyframeRequest:
+        """
+        Ищет ключевой кадр для start_ms в фоне (отпечаток файла и разбор индекса не выполняются
+        в GUI-потоке); on_resolved(start_ms, позиция) вызывается в GUI-потоке.
+        Выполняется в общем пуле, а не в очереди подготовки, которую prefetch() очищает.
+        """
+        request = KeyframeRequest(owner)
+        request.resolved.connect(on_resolved)
+        QThreadPool.globalInstance().start(_KeyframeTask(request, path, start_ms))
+        return request
+
+    # === ВРЕМЯ ДО ПЕРВОГО КАДРА ===
+    def record_open(self, first_frame_ms: float, warm: bool):
+        """Запоминает время до первого кадра открытого видео (warm — было ли оно подготовлено)"""
+        with self._lock:
+            self._opens[bool(warm)].append(first_frame_ms)
+
+    def stats(self) -> dict:
+        def summary(values):
+            if not values:
+                return {'count': 0, 'avg_ms': None, 'max_ms': None}
+            return {'count': len(values), 'avg_ms': sum(values) / len(values), 'max_ms': max(values)}
+
+        with self._lock:
+            return {
+                'warmed_files': self.warmed_files,
+                'warmed_bytes': self.warmed_bytes,
+                'first_frame_warm': summary(self._opens[True]),
+                'first_frame_cold': summary(self._opens[False]),
+            }
+
+
+@functools.cache
+def get_video_prefetcher() -> VideoPrefetcher:
+    """Общий экземпляр VideoPrefetcher приложения"""
+    return VideoPrefetcher()
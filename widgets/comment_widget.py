@@ -5,12 +5,13 @@ from PyQt6.QtGui import QPixmap, QColor
 from help import create_rounded_pixmap
 
 class CommentWidget(QWidget):
-    def __init__(self, author: str, date: str, text: str, avatar_path: str = "", parent=None):
+    def __init__(self, author: str = "", date: str = "", text: str = "", avatar_path: str = "", parent=None):
         super().__init__(parent)
-        self.avatar_path = avatar_path
-        self.setup_ui(author, date, text)
+        self.avatar_path = None
+        self.setup_ui()
+        self.bind(author, date, text, avatar_path)
         
-    def setup_ui(self, author: str, date: str, text: str):
+    def setup_ui(self):
         self.setAttribute(Qt.WidgetAttribute.WA_StyledBackground, True)
         self.setObjectName("comment_widget")
         self.setStyleSheet("""
@@ -29,7 +30,7 @@ class CommentWidget(QWidget):
         top_row_layout.setAlignment(Qt.AlignmentFlag.AlignVCenter | Qt.AlignmentFlag.AlignLeft)
         
         # Avatar
-        avatar_label = QLabel()
+        self.avatar_label = avatar_label = QLabel()
         avatar_label.setObjectName("avatar")
         avatar_label.setFixedSize(30, 30)
 
@@ -41,24 +42,11 @@ class CommentWidget(QWidget):
             }
         """)
 
-        pixmap = QPixmap(self.avatar_path)
-        avatar_size = QSize(30, 30)
-
-        if not pixmap.isNull():
-            rounded = create_rounded_pixmap(pixmap, avatar_size)
-            avatar_label.setPixmap(rounded)
-        else:
-            # создаём серую заглушку как pixmap и тоже обрезаем кругом
-            placeholder = QPixmap(avatar_size.width(), avatar_size.height())
-            placeholder.fill(QColor("#ccc"))
-            rounded_placeholder = create_rounded_pixmap(placeholder, avatar_size)
-            avatar_label.setPixmap(rounded_placeholder)
-
-        author_label = QLabel(author)
+        self.author_label = author_label = QLabel()
         author_label.setObjectName("author")
         author_label.setSizePolicy(QSizePolicy.Policy.Minimum, QSizePolicy.Policy.Fixed)
         
-        date_label = QLabel(date)
+        self.date_label = date_label = QLabel()
         date_label.setObjectName("date")
         date_label.setSizePolicy(QSizePolicy.Policy.Fixed, QSizePolicy.Policy.Fixed)
         
@@ -67,7 +55,7 @@ class CommentWidget(QWidget):
         top_row_layout.addStretch()   # толкает дату вправо, а автор остаётся рядом с аватаром
         top_row_layout.addWidget(date_label)
         
-        text_label = QLabel(text)
+        self.text_label = text_label = QLabel()
         text_label.setObjectName("text")
         text_label.setWordWrap(True)
         text_label.setStyleSheet("""
@@ -83,3 +71,27 @@ class CommentWidget(QWidget):
         
         layout.addWidget(top_row)
         layout.addWidget(text_label)
+
+    def bind(self, author: str, date: str, text: str, avatar_path: str = ""):
+        """Заполняет виджет данными комментария (виджеты переиспользуются через WidgetPool)"""
+        self.author_label.setText(author)
+        self.date_label.setText(date)
+        self.text_label.setText(text)
+        # Аватар перерисовываем, только если он сменился
+        if avatar_path != self.avatar_path:
+            self.avatar_path = avatar_path
+            self.set_avatar(avatar_path)
+
+    def set_avatar(self, avatar_path: str):
+        pixmap = QPixmap(avatar_path)
+        avatar_size = QSize(30, 30)
+
+        if not pixmap.isNull():
+            rounded = create_rounded_pixmap(pixmap, avatar_size)
+            self.avatar_label.setPixmap(rounded)
+        else:
+            # создаём серую заглушку как pixmap и тоже обрезаем кругом
+            placeholder = QPixmap(avatar_size.width(), avatar_size.height())
+            placeholder.fill(QColor("#ccc"))
+            rounded_placeholder = create_rounded_pixmap(placeholder, avatar_size)
+            self.avatar_label.setPixmap(rounded_placeholder)
@@ -2,9 +2,11 @@ from PyQt6.QtWidgets import QWidget, QVBoxLayout, QLabel, QScrollArea, QHBoxLayo
 from PyQt6.QtCore import Qt
 from datetime import datetime
 from .comment_widget import CommentWidget
+from .widget_pool import WidgetPool
 
 from help import apply_scroll_style
 from db import Database
+from async_db import AsyncDatabase
 
 
 class CommentsWidget(QWidget):
@@ -13,6 +15,10 @@ class CommentsWidget(QWidget):
         self.db = db
         self.video_id = video_id
         self.user_id = user_id
+        self.async_db = AsyncDatabase.of(db) if db else None
+        self._comments_request = None  # Текущий фоновый запрос комментариев
+        # Виджеты комментариев переиспользуются при переходе к другому видео и перезагрузке
+        self.comment_pool = WidgetPool(CommentWidget, max_size=100)
         self.setFixedHeight(500)
         self.layout = QVBoxLayout(self)
         self.layout.setContentsMargins(0, 0, 0, 0)
@@ -201,7 +207,8 @@ class CommentsWidget(QWidget):
             self.load_comments()
         
     def add_comment(self, author: str, text: str, date: str, avatar_path: str = ''):
-        comment = CommentWidget(author, date, text, avatar_path)
+        comment = self.comment_pool.acquire()
+        comment.bind(author, date, text, avatar_path)
         if self.empty_label:
             self.comments_container_layout.removeWidget(self.empty_label)
             self.empty_label.deleteLater()
@@ -209,6 +216,7 @@ class CommentsWidget(QWidget):
         # Добавляем комментарий перед stretch (в позицию count-1)
         insert_pos = max(0, self.comments_container_layout.count() - 1)
         self.comments_container_layout.insertWidget(insert_pos, comment)
+        comment.show()
         
     def on_send_clicked(self):
         text = self.comment_input.toPlainText().strip()
@@ -246,50 +254,72 @@ class CommentsWidget(QWidget):
             
     def load_comments(self):
         """
-        Загружает комментарии из БД
+        Загружает комментарии из БД в фоновом потоке, пока показывает заглушку
         """
         if not self.video_id or not self.db:
             return
         
+        # Предыдущий незавершенный запрос мог относиться к другому видео
+        if self._comments_request is not None:
+            self._comments_request.cancel()
+        
+        self.show_status_label("Loading comments...")
+        self._comments_request = self.async_db.call(
+            'get_video_comments', self.video_id,
+            on_result=self.show_comments, on_error=self.on_comments_error, owner=self
+        )
+    
+    def show_status_label(self, text: str):
+        """
+        Очищает список и показывает надпись вместо комментариев
+        """
         # Очищаем текущие комментарии, НО сохраняем stretch
-        # Удаляем все виджеты кроме последнего элемента (stretch)
+        # Комментарии возвращаем в пул, остальные виджеты кроме последнего элемента (stretch) удаляем
+        self.comment_pool.release_from_layout(self.comments_container_layout, CommentWidget)
         while self.comments_container_layout.count() > 1:
             item = self.comments_container_layout.takeAt(0)
             if widget := item.widget():
                 widget.deleteLater()
         
-        # Сбрасываем empty_label
-        self.empty_label = None
-        
-        # Загружаем комментарии из БД
-        comments = self.db.get_video_comments(self.video_id)
+        self.empty_label = QLabel(text)
+        self.empty_label.setStyleSheet("""
+            QLabel {
+                font-family: 'Source Sans Pro';
+                font-size: 16px;
+                color: #888;
+                text-align: center;
+                padding: 20px;
+            }
+        """)
+        self.empty_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        # Добавляем empty_label перед stretch
+        insert_pos = max(0, self.comments_container_layout.count() - 1)
+        self.comments_container_layout.insertWidget(insert_pos, self.empty_label)
+    
+    def show_comments(self, comments):
+        """
+        Показывает комментарии, полученные из БД
+        """
+        self._comments_request = None
         
         if not comments:
             # Показываем "No comments"
-            self.empty_label = QLabel("No comments")
-            self.empty_label.setStyleSheet("""
-                QLabel {
-                    font-family: 'Source Sans Pro';
-                    font-size: 16px;
-                    color: #888;
-                    text-align: center;
-                    padding: 20px;
-                }
-            """)
-            self.empty_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
-            # Добавляем empty_label перед stretch
-            insert_pos = max(0, self.comments_container_layout.count() - 1)
-            self.comments_container_layout.insertWidget(insert_pos, self.empty_label)
-        else:
-            # Добавляем комментарии
-            for comment in comments:
-                author = comment['username']
-                text = comment['text']
-                # Форматируем дату
-                created_at = comment['created_at']
-                avatar_path = comment['pfp_path'] or ''
-                
-                self.add_comment(author, text, created_at, avatar_path)
+            self.show_status_label("No comments")
+            return
+        
+        # Добавляем комментарии (add_comment уберет заглушку загрузки)
+        for comment in comments:
+            author = comment['username']
+            text = comment['text']
+            # Форматируем дату
+            created_at = comment['created_at']
+            avatar_path = comment['pfp_path'] or ''
+            
+            self.add_comment(author, text, created_at, avatar_path)
+    
+    def on_comments_error(self, message: str):
+        self._comments_request = None
+        self.show_status_label("Failed to load comments")
     
     def set_video_id(self, video_id):
         """
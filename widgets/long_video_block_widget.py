@@ -3,16 +3,18 @@ from PyQt6.QtWidgets import QWidget, QVBoxLayout, QLabel
 
 from db import Database
 from widgets.video_horizontal_long_widget import HorizontalVideoLong
+from widgets.widget_pool import WidgetPool
 
 
 class LongVideoBlock(QWidget):
     videoClicked = pyqtSignal(int, int)
     
-    def __init__(self, db: Database, heading: str, videos_data: list, parent=None):
+    def __init__(self, db: Database, heading: str, videos_data: list, pool: WidgetPool = None, parent=None):
         super().__init__(parent)
         self.db = db
         self.date = heading
         self.videos_data = videos_data
+        self.pool = pool  # Пул карточек HorizontalVideoLong, общий для всех блоков страницы
         self.setup_ui()
 
     def setup_ui(self):
@@ -52,10 +54,24 @@ class LongVideoBlock(QWidget):
         self.videos_layout.setSpacing(12)
 
         # Добавляем видео (без возможности удаления в истории)
-        for video_data in self.videos_data:
-            video_widget = HorizontalVideoLong(self.db, *video_data, can_delete=False)
-            video_widget.videoClicked.connect(self.videoClicked.emit)
+        # videos_data: (video_id, watch_duration[, video_info]) — строка истории содержит данные карточки
+        for video_id, watch_duration, *video_info in self.videos_data:
+            video_info = video_info[0] if video_info else None
+            if self.pool is not None:
+                # Карточки из пула уже подключены к странице (см. фабрику пула)
+                if video_info is None:
+                    video_info = self.db.get_video_info(video_id)
+                if not video_info:
+                    continue
+                video_widget = self.pool.acquire()
+                video_widget.bind(video_info, video_id, watch_duration, can_delete=False)
+            else:
+                video_widget = HorizontalVideoLong(
+                    self.db, video_id, watch_duration, can_delete=False, video_info=video_info
+                )
+                video_widget.videoClicked.connect(self.videoClicked.emit)
             self.videos_layout.addWidget(video_widget)
+            video_widget.show()
         
         # Добавляем stretch в конец, чтобы видео не распределялись равномерно
         self.videos_layout.addStretch()
@@ -63,3 +79,8 @@ class LongVideoBlock(QWidget):
         layout.addWidget(self.videos_container)
 
         self.adjustSize()
+
+    def release_videos(self):
+        """Возвращает карточки в пул перед удалением блока"""
+        if self.pool is not None:
+            self.pool.release_from_layout(self.videos_layout, HorizontalVideoLong, detach=True)
@@ -4,8 +4,10 @@ from PyQt6.QtGui import QIcon
 
 from widgets.video_horizontal_long_widget import HorizontalVideoLong
 from widgets.upload_video_widget import VideoUploadWidget
+from widgets.widget_pool import WidgetPool
 from help import apply_scroll_style
 from db import Database
+from async_db import AsyncDatabase
 
 
 class UploadDialog(QDialog):
@@ -35,6 +37,11 @@ class UploadDialog(QDialog):
         self.upload_widget = VideoUploadWidget(self.db, self.user_id)
         main_layout.addWidget(self.upload_widget)
 
+    def reject(self):
+        # Закрытие окна прерывает незавершенную загрузку
+        self.upload_widget.cancel_upload()
+        super().reject()
+
 
 class ProfileVideos(QWidget):
     def __init__(self, db: Database, user_id, current_user_id=None, is_own_profile=True, parent=None):
@@ -43,6 +50,11 @@ class ProfileVideos(QWidget):
         self.user_id = user_id  # ID профиля, который отображается
         self.current_user_id = current_user_id  # ID авторизованного пользователя
         self.is_own_profile = is_own_profile
+        self.async_db = AsyncDatabase.of(db)
+        self._videos_request = None  # Текущий фоновый запрос списка видео
+        self.loading_label = None
+        # Карточки видео переиспользуются при обновлении списка (например, после загрузки видео)
+        self.video_pool = WidgetPool(lambda: HorizontalVideoLong(self.db, can_delete=self.is_own_profile))
         self.setup_ui()
         self.load_user_videos()
 
@@ -121,13 +133,43 @@ class ProfileVideos(QWidget):
         vertical_layout.addWidget(self.scroll_area)
 
     def load_user_videos(self):
-        videos = self.db.get_videos_by_user(self.user_id)
+        """Запрашивает видео пользователя в фоновом потоке, пока показывает заглушку"""
+        if self._videos_request is not None:
+            self._videos_request.cancel()
+        
+        self.loading_label = QLabel("Загрузка видео...")
+        self.loading_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        self.loading_label.setStyleSheet('''
+            font-family: 'Segoe UI';
+            font-size: 20px;
+            color: #888888;
+            border: none;
+            background: transparent;
+            padding: 30px;
+        ''')
+        self.container_layout.addWidget(self.loading_label)
+        
+        self._videos_request = self.async_db.call(
+            'get_videos_by_user', self.user_id, with_info=True,
+            on_result=self.show_user_videos, on_error=lambda _: self.hide_loading(), owner=self
+        )
+
+    def hide_loading(self):
+        self._videos_request = None
+        if self.loading_label is not None:
+            self.loading_label.deleteLater()
+            self.loading_label = None
+
+    def show_user_videos(self, videos):
+        self.hide_loading()
         if not videos:
             return
-        for video_id in videos:
+        for video_info in videos:
             # Разрешаем удаление видео только для своего профиля
-            video_widget = HorizontalVideoLong(self.db, video_id, can_delete=self.is_own_profile)
+            video_widget = self.video_pool.acquire()
+            video_widget.bind(video_info, can_delete=self.is_own_profile)
             self.container_layout.addWidget(video_widget)
+            video_widget.show()
 
     def refresh_videos_ui(self):
         self.clear_videos()
@@ -159,6 +201,8 @@ class ProfileVideos(QWidget):
         scrollbar.setValue(0)
 
     def clear_videos(self):
+        self.loading_label = None
+        self.video_pool.release_from_layout(self.container_layout, HorizontalVideoLong)
         for i in reversed(range(self.container_layout.count())):
             widget = self.container_layout.itemAt(i).widget()
             if widget:
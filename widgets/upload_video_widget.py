@@ -1,11 +1,12 @@
 from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QScrollArea, QLabel, 
                             QLineEdit, QTextEdit, QComboBox, QPushButton, 
-                            QFileDialog, QHBoxLayout, QCompleter, QApplication)
-from PyQt6.QtCore import Qt, QRectF, QTimer, pyqtSignal, QEvent
-from PyQt6.QtGui import QPixmap, QBitmap, QPainterPath, QPainter
+                            QFileDialog, QHBoxLayout, QCompleter, QApplication, QProgressBar)
+from PyQt6.QtCore import Qt, QTimer, pyqtSignal, QEvent
 
-from help import apply_scroll_style, get_duration, get_font
+from help import apply_scroll_style, get_font
 from db import Database
+from thumbnail_cache import get_rounded_thumbnail
+from upload_jobs import UploadJob, UploadManager
 
 
 class VideoUploadWidget(QWidget):
@@ -17,6 +18,8 @@ class VideoUploadWidget(QWidget):
         self.user_id = user_id
         self.selected_file_path = ""
         self.selected_thumbnail_path = ""
+        self.upload_manager = UploadManager.of(db)
+        self.upload_job = None  # Текущая фоновая загрузка
         self.setup_ui()
 
     def setup_ui(self):
@@ -109,7 +112,7 @@ class VideoUploadWidget(QWidget):
         self.container_layout.addWidget(self.form_error_label)
 
         # Кнопка загрузки
-        upload_button = QPushButton("Загрузить видео")
+        self.upload_button = upload_button = QPushButton("Загрузить видео")
         upload_button.setStyleSheet(
             '''
                 QPushButton {
@@ -127,12 +130,20 @@ class VideoUploadWidget(QWidget):
                 QPushButton:pressed {
                     background: #e04848;
                 }
+                QPushButton:disabled {
+                    background: #f4a3a3;
+                }
             '''
         )
         upload_button.setFixedHeight(50)
         upload_button.clicked.connect(self.upload_video)
         self.container_layout.addWidget(upload_button)
 
+        # Прогресс загрузки и кнопка отмены (видны только во время загрузки)
+        self.progress_section = self.create_progress_section()
+        self.progress_section.setVisible(False)
+        self.container_layout.addWidget(self.progress_section)
+
         # Добавляем растягивающийся элемент в конце
         self.container_layout.addStretch()
 
@@ -301,7 +312,7 @@ class VideoUploadWidget(QWidget):
         layout.addWidget(thumbnail_widget)
 
         # Подсказка
-        hint = QLabel("Поддерживаемые форматы: JPG, PNG, GIF")
+        hint = QLabel("Поддерживаемые форматы: JPG, PNG, GIF. Без превью будет взят кадр из видео")
         hint.setStyleSheet(
             '''
                 font-size: 12px;
@@ -314,6 +325,72 @@ class VideoUploadWidget(QWidget):
 
         return section
 
+    def create_progress_section(self):
+        section = QWidget()
+        section.setStyleSheet('background: transparent; border: none;')
+        layout = QVBoxLayout(section)
+        layout.setContentsMargins(0, 0, 0, 0)
+        layout.setSpacing(8)
+
+        progress_row = QWidget()
+        progress_layout = QHBoxLayout(progress_row)
+        progress_layout.setContentsMargins(0, 0, 0, 0)
+        progress_layout.setSpacing(10)
+
+        self.progress_bar = QProgressBar()
+        self.progress_bar.setRange(0, 1000)
+        self.progress_bar.setTextVisible(False)
+        self.progress_bar.setFixedHeight(12)
+        self.progress_bar.setStyleSheet(
+            '''
+                QProgressBar {
+                    background: white;
+                    border: 1px solid #ddd;
+                    border-radius: 6px;
+                }
+                QProgressBar::chunk {
+                    background: #ff6d6d;
+                    border-radius: 5px;
+                }
+            '''
+        )
+
+        self.cancel_button = QPushButton("Отмена")
+        self.cancel_button.setStyleSheet(
+            '''
+                QPushButton {
+                    background: white;
+                    color: #c62828;
+                    border: 1px solid #f44336;
+                    border-radius: 10px;
+                    padding: 6px 15px;
+                    font-size: 14px;
+                }
+                QPushButton:hover {
+                    background: #ffebee;
+                }
+            '''
+        )
+        self.cancel_button.setFixedSize(100, 35)
+        self.cancel_button.clicked.connect(self.cancel_upload)
+
+        progress_layout.addWidget(self.progress_bar, 1)
+        progress_layout.addWidget(self.cancel_button)
+        layout.addWidget(progress_row)
+
+        self.progress_label = QLabel()
+        self.progress_label.setStyleSheet(
+            '''
+                font-size: 12px;
+                color: #888;
+                background: transparent;
+                border: none;
+            '''
+        )
+        layout.addWidget(self.progress_label)
+
+        return section
+
     def create_input_section(self, label_text, input_widget):
         section = QWidget()
         section.setStyleSheet('background: transparent; border: none;')
@@ -494,26 +571,17 @@ class VideoUploadWidget(QWidget):
             )
             
             # Загружаем и отображаем превью
-            pixmap = QPixmap(file_path)
-            if not pixmap.isNull():
-                scaled = pixmap.scaled(self.thumbnail_preview.size(), Qt.AspectRatioMode.KeepAspectRatioByExpanding,
-                                    Qt.TransformationMode.SmoothTransformation)
-                mask = QBitmap(scaled.size())
-                mask.fill(Qt.GlobalColor.color0)
-
-                path = QPainterPath()
-                path.addRoundedRect(QRectF(0, 0, scaled.width(), scaled.height()), 6, 6)
-
-                mask_painter = QPainter(mask)
-                mask_painter.fillPath(path, Qt.GlobalColor.color1)
-                mask_painter.end()
-
-                scaled.setMask(mask)
-                self.thumbnail_preview.setPixmap(scaled)
+            # Превью через общий кэш (тот же путь масштабирования и скругления, что у карточек)
+            pixmap = get_rounded_thumbnail(file_path, self.thumbnail_preview.size(), 6)
+            if pixmap is not None:
+                self.thumbnail_preview.setPixmap(pixmap)
                 self.thumbnail_preview.setScaledContents(True)
                 self.thumbnail_preview.setVisible(True)
 
     def upload_video(self):
+        if self.upload_job is not None:
+            return
+
         # Проверяем, выбран ли файл
         if not self.selected_file_path:
             self.show_file_error("Выберите видеофайл")
@@ -529,7 +597,7 @@ class VideoUploadWidget(QWidget):
             self.show_form_error("Выберите существующую категорию")
             return
 
-        # Собираем данные
+        # Собираем данные (длительность определяется по скопированному файлу)
         video_data = {
             'user_id': self.user_id,
             'file_path': self.selected_file_path,
@@ -538,21 +606,71 @@ class VideoUploadWidget(QWidget):
             'description': self.description_input.toPlainText().strip(),
             'category': self.category_combo.currentText(),
             'tags': [tag.strip() for tag in self.tags_input.text().split(',') if tag.strip()],
-            'duration': get_duration(self.selected_file_path)
         }
 
-        self.db.upload_video(**video_data)
+        # Копирование и запись в БД выполняются в фоне, форма остается отзывчивой
+        self.upload_job = self.upload_manager.submit(video_data)
+        self.upload_job.progress.connect(self.on_upload_progress)
+        self.upload_job.stageChanged.connect(self.on_upload_stage)
+        self.upload_job.finished.connect(self.on_upload_finished)
+        self.upload_job.failed.connect(self.on_upload_failed)
+        self.upload_job.cancelled.connect(self.on_upload_cancelled)
+        self.set_uploading(True)
+
+    def cancel_upload(self):
+        """Отменяет текущую загрузку (скопированные файлы будут удалены)"""
+        if self.upload_job is not None:
+            self.upload_job.cancel()
+            self.cancel_button.setEnabled(False)
+            self.progress_label.setText("Отмена загрузки...")
+
+    def set_uploading(self, uploading):
+        self.upload_button.setEnabled(not uploading)
+        self.cancel_button.setEnabled(uploading)
+        self.progress_bar.setValue(0)
+        self.progress_label.setText("")
+        self.progress_section.setVisible(uploading)
+        if uploading:
+            self.hide_form_error()
+            QTimer.singleShot(50, lambda: self.scroll_area.verticalScrollBar().setValue(
+                self.scroll_area.verticalScrollBar().maximum()
+            ))
+
+    def on_upload_stage(self, stage):
+        if stage != UploadJob.STAGE_COPY:
+            self.progress_label.setText(f"{stage}...")
+
+    def on_upload_progress(self, copied, total, speed):
+        self.progress_bar.setValue(int(copied * 1000 / total) if total else 1000)
+        mb = 1024 * 1024
+        self.progress_label.setText(
+            f"{copied / mb:.1f} из {total / mb:.1f} МБ · {speed / mb:.1f} МБ/с"
+        )
+
+    def on_upload_finished(self, video_data):
+        self.upload_job = None
+        self.set_uploading(False)
         print("Загрузка видео:", video_data)
-        
+
         # Показываем сообщение об успехе
         self.show_success("Видео успешно загружено!")
-        
+
         # Испускаем сигнал об успешной загрузке
         self.upload_successful.emit(video_data)
-        
+
         # Очищаем форму после успешной загрузки
         self.clear_form()
 
+    def on_upload_failed(self, message):
+        self.upload_job = None
+        self.set_uploading(False)
+        self.show_form_error(f"Не удалось загрузить видео: {message}")
+
+    def on_upload_cancelled(self):
+        self.upload_job = None
+        self.set_uploading(False)
+        self.show_form_error("Загрузка отменена")
+
     def show_file_error(self, message):
         """Показывает ошибку связанную с файлом в file_label"""
         self.file_label.setText(message)
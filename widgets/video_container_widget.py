@@ -1,18 +1,47 @@
-from PyQt6.QtWidgets import QWidget, QGridLayout, QScrollArea
-from PyQt6.QtCore import Qt
+from PyQt6.QtWidgets import QWidget, QScrollArea
+from PyQt6.QtCore import Qt, QTimer
 
 from widgets.video_tile_widget import VideoTileWidget
+from widgets.widget_pool import WidgetPool
 from db import Database
+from async_db import AsyncDatabase
 from PyQt6.QtCore import pyqtSignal
 
 
 class VideoContainer(QScrollArea):
+    """
+    Лента видео с виртуализацией: карточки создаются только для видимых строк
+    и переиспользуются при прокрутке, следующие страницы подгружаются по курсору.
+    """
     videoClicked = pyqtSignal(int)
+    pageLoaded = pyqtSignal(int)  # Страница показана, аргумент — сколько видео в ленте
+
+    COLUMNS = 3
+    TILE_WIDTH = 330
+    TILE_HEIGHT = 226
+    H_SPACING = 17
+    V_SPACING = 20
+    MARGINS = (17, 10, 17, 20)  # left, top, right, bottom
+    PAGE_SIZE = 24               # Кратно числу колонок
+    BUFFER_ROWS = 1              # Запас строк выше и ниже видимой области
+    PREFETCH_ROWS = 3            # За сколько строк до конца ленты подгружать следующую страницу
 
     def __init__(self, db: Database, user_id: int = None, parent=None):
         super().__init__(parent)
         self.db = db
+        self.async_db = AsyncDatabase.of(db)
         self.user_id = user_id
+
+        self.query = None         # Поисковый запрос, None — рекомендации
+        self.videos = []          # Данные карточек загруженных страниц
+        self._video_ids = set()   # Защита от повторов между страницами
+        self.next_cursor = None
+        self._has_more = False
+        self._page_request = None
+
+        self._visible_tiles = {}  # Индекс в self.videos -> карточка
+        self.tile_pool = WidgetPool(self.create_tile)  # Скрытые карточки для переиспользования
+
         self.setup_ui()
 
     def setup_ui(self):
@@ -21,16 +50,13 @@ class VideoContainer(QScrollArea):
         self.setHorizontalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
         self.setFrameShape(QScrollArea.Shape.NoFrame)
 
-        # Контейнер для сетки видео
+        # Контейнер без layout: карточки расставляются вручную по индексу
         self.container_widget = QWidget()
-        self.videos_layout = QGridLayout(self.container_widget)
-        self.videos_layout.setContentsMargins(17, 10, 17, 20)
-        self.videos_layout.setHorizontalSpacing(17)
-        self.videos_layout.setVerticalSpacing(20)
-
         self.setWidget(self.container_widget)
         self.apply_scrollbar_style()
 
+        self.verticalScrollBar().valueChanged.connect(self.update_visible_tiles)
+
     def apply_scrollbar_style(self):
         scrollbar_style = """
         QScrollBar:vertical {
@@ -70,48 +96,134 @@ class VideoContainer(QScrollArea):
         """
         self.setStyleSheet(scrollbar_style)
 
+    # === ЗАГРУЗКА СТРАНИЦ ===
     def add_video_widgets(self):
-        # Используем систему рекомендаций
-        video_ids = self.db.get_recommended_videos(user_id=self.user_id, limit=20)
-        if video_ids:
-            for idx, video_id in enumerate(video_ids):
-                row = idx // 3
-                col = idx % 3
-                video_widget = VideoTileWidget(self.db, video_id)
-                video_widget.videoClicked.connect(self.videoClicked.emit)
-                self.videos_layout.addWidget(video_widget, row, col)
+        """Показывает рекомендации с первой страницы"""
+        self.reset(query=None)
 
     def search(self, query: str):
         """Выполняет поиск видео и отображает результаты"""
-        # Очищаем текущие виджеты
-        while self.videos_layout.count():
-            item = self.videos_layout.takeAt(0)
-            if widget := item.widget():
-                widget.deleteLater()
-        
         # Если запрос пустой, показываем рекомендации
         if not query or not query.strip():
-            self.add_video_widgets()
+            self.reset(query=None)
             return
-        
-        # Выполняем поиск
-        video_ids = self.db.search_videos(query, limit=20)
-        if video_ids:
-            for i in range(len(video_ids)):
-                row = i // 3
-                col = i % 3
-                video_widget = VideoTileWidget(self.db, video_ids[i])
-                video_widget.videoClicked.connect(self.videoClicked.emit)
-                self.videos_layout.addWidget(video_widget, row, col)
+        self.reset(query=query)
 
     def refresh(self):
-        while self.videos_layout.count():
-            item = self.videos_layout.takeAt(0)
-            if widget := item.widget():
-                widget.deleteLater()
-        
-        self.add_video_widgets()
-    
+        self.reset(query=None)
+
+    def reset(self, query=None):
+        """Сбрасывает ленту и загружает первую страницу"""
+        if self._page_request is not None:
+            self._page_request.cancel()
+            self._page_request = None
+
+        for tile in self._visible_tiles.values():
+            self.tile_pool.release(tile)
+        self._visible_tiles.clear()
+
+        self.query = query
+        self.videos = []
+        self._video_ids = set()
+        self.next_cursor = None
+        self._has_more = True
+        self.verticalScrollBar().setValue(0)
+        self._update_content_height()
+        self.load_next_page()
+
+    def load_next_page(self):
+        """Запрашивает следующую страницу в фоне (не более одного запроса одновременно)"""
+        if self._page_request is not None or not self._has_more:
+            return
+        if self.query is None:
+            self._page_request = self.async_db.call(
+                'get_recommended_videos', user_id=self.user_id, limit=self.PAGE_SIZE,
+                with_info=True, cursor=self.next_cursor,
+                on_result=self.on_page_loaded, on_error=self.on_page_error, owner=self
+            )
+        else:
+            self._page_request = self.async_db.call(
+                'search_videos', self.query, limit=self.PAGE_SIZE,
+                with_info=True, cursor=self.next_cursor,
+                on_result=self.on_page_loaded, on_error=self.on_page_error, owner=self
+            )
+
+    def on_page_loaded(self, page):
+        self._page_request = None
+        self.next_cursor = page.next_cursor
+        self._has_more = page.next_cursor is not None
+
+        for video_info in page:
+            if video_info['id'] in self._video_ids:
+                continue
+            self._video_ids.add(video_info['id'])
+            self.videos.append(video_info)
+
+        self._update_content_height()
+        self.update_visible_tiles()
+        self.pageLoaded.emit(len(self.videos))
+
+    def on_page_error(self, message: str):
+        self._page_request = None
+        self._has_more = False
+
+    # === ВИРТУАЛИЗАЦИЯ ===
+    def _row_height(self) -> int:
+        return self.TILE_HEIGHT + self.V_SPACING
+
+    def _update_content_height(self):
+        left, top, right, bottom = self.MARGINS
+        rows = (len(self.videos) + self.COLUMNS - 1) // self.COLUMNS
+        height = top + bottom + max(0, rows * self._row_height() - self.V_SPACING)
+        self.container_widget.setMinimumHeight(height)
+
+    def _tile_position(self, index: int):
+        left, top, _, _ = self.MARGINS
+        row, col = divmod(index, self.COLUMNS)
+        return left + col * (self.TILE_WIDTH + self.H_SPACING), top + row * self._row_height()
+
+    def create_tile(self) -> VideoTileWidget:
+        tile = VideoTileWidget(self.db, parent=self.container_widget)
+        tile.videoClicked.connect(self.videoClicked.emit)
+        return tile
+
+    def update_visible_tiles(self):
+        """Привязывает карточки к видимым строкам, остальные возвращает в запас"""
+        _, top, _, _ = self.MARGINS
+        row_height = self._row_height()
+        scroll_top = self.verticalScrollBar().value()
+        viewport_height = self.viewport().height()
+
+        first_row = max(0, (scroll_top - top) // row_height - self.BUFFER_ROWS)
+        last_row = (scroll_top + viewport_height - top) // row_height + self.BUFFER_ROWS
+        first = first_row * self.COLUMNS
+        last = min(len(self.videos), (last_row + 1) * self.COLUMNS)
+        visible = range(first, last)
+
+        # Освобождаем карточки ушедших из видимой области строк
+        for index in list(self._visible_tiles):
+            if index not in visible:
+                self.tile_pool.release(self._visible_tiles.pop(index))
+
+        for index in visible:
+            if index in self._visible_tiles:
+                continue
+            tile = self.tile_pool.acquire()
+            tile.bind(self.videos[index])
+            tile.move(*self._tile_position(index))
+            tile.show()
+            self._visible_tiles[index] = tile
+
+        # Близко к концу ленты — подгружаем следующую страницу
+        loaded_rows = (len(self.videos) + self.COLUMNS - 1) // self.COLUMNS
+        if last_row + self.PREFETCH_ROWS >= loaded_rows:
+            self.load_next_page()
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        # Высота окна изменилась — видимых строк может стать больше
+        QTimer.singleShot(0, self.update_visible_tiles)
+
     def set_user_id(self, user_id: int):
         """Обновляет user_id для персонализированных рекомендаций"""
         self.user_id = user_id
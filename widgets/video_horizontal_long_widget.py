@@ -1,16 +1,19 @@
 from PyQt6.QtWidgets import QWidget, QMessageBox
-from PyQt6.QtCore import Qt, QRectF, QSize, pyqtSignal
-from PyQt6.QtGui import QPixmap, QPainter, QPainterPath, QBitmap, QIcon
+from PyQt6.QtCore import Qt, QSize, pyqtSignal
+from PyQt6.QtGui import QIcon
 
 from ui.video_horizontal_long_ui import Ui_video
 from widgets.confirmation_dialog import ConfirmationDialog
 from db import Database
+from thumbnail_cache import set_thumbnail_async
+from thumbnail_variants import variant_path
 
 
 class HorizontalVideoLong(QWidget, Ui_video):
     videoClicked = pyqtSignal(int, int)
 
-    def __init__(self, db: Database, video_id: int, watch_duration: int = None, can_delete: bool = True, parent=None):
+    def __init__(self, db: Database, video_id: int = None, watch_duration: int = None, can_delete: bool = True,
+                 video_info=None, parent=None):
         super().__init__(parent)
         self.setupUi(self)
         self.setFixedSize(960, 165)
@@ -19,55 +22,55 @@ class HorizontalVideoLong(QWidget, Ui_video):
         self.video_id = video_id
         self.watch_duration = watch_duration if watch_duration is not None else 0
         self.can_delete = can_delete
-
-        # Получаем информацию о видео (теперь включая длительность)
-        video_info = self.db.get_video_info(self.video_id)
-        if not video_info:
-            return
-            
-        # Распаковываем данные (добавляем duration)
-        username, title, _, _, views_count, upload_date, thumbnail_path, duration = video_info
-        
-        self.duration = duration  # Сохраняем для использования
-
-        self.title.setText(title)
-        self.nickname.setText(username)
-        self.views.setText(f"{views_count} просмотров")
-        self.date.setText(upload_date)
+        self.duration = 0
+        self._thumbnail_request = None
 
         self.remove_btn.setIcon(QIcon('icons/cross.svg'))
         self.remove_btn.setIconSize(QSize(41, 41))
         self.remove_btn.clicked.connect(self.remove_video)
-        
+
+        if video_id is None:
+            return  # Пустая карточка из пула, данные придут через bind()
+
+        # Данные карточки обычно приходят из списка (история, get_videos_by_user(with_info=True)),
+        # отдельный запрос — только если их не передали
+        if video_info is None:
+            video_info = self.db.get_video_info(self.video_id)
+        if video_info:
+            self.bind(video_info, video_id, watch_duration, can_delete)
+
+    def bind(self, video_info, video_id: int = None, watch_duration: int = None, can_delete: bool = None):
+        """Заполняет карточку данными видео (карточки переиспользуются через WidgetPool)"""
+        self.video_id = video_id if video_id is not None else video_info['id']
+        self.watch_duration = watch_duration if watch_duration is not None else 0
+        if can_delete is not None:
+            self.can_delete = can_delete
+
+        duration = video_info['duration']
+        self.duration = duration  # Сохраняем для использования
+
+        self.title.setText(video_info['title'])
+        self.nickname.setText(video_info['username'])
+        self.views.setText(f"{video_info['views_count']} просмотров")
+        self.date.setText(video_info['upload_date'])
+
         # Скрываем кнопку удаления, если удаление запрещено
-        if not self.can_delete:
-            self.remove_btn.hide()
+        self.remove_btn.setVisible(self.can_delete)
 
         self.set_duration(duration)
         
-        # Отображаем прогресс, если есть время просмотра
+        # Отображаем прогресс, если есть время просмотра (прогресс прошлого видео сбрасываем)
+        self.progress_container.setVisible(False)
         if self.watch_duration > 0 and duration > 0:
             self.set_watch_progress(self.watch_duration, duration)
 
-        pixmap = QPixmap(thumbnail_path)
-        if not pixmap.isNull():
-            scaled = pixmap.scaled(
-                self.thumnbnail.size(), Qt.AspectRatioMode.KeepAspectRatioByExpanding,
-                Qt.TransformationMode.SmoothTransformation
-            )
-            mask = QBitmap(scaled.size())
-            mask.fill(Qt.GlobalColor.color0)
-
-            path = QPainterPath()
-            path.addRoundedRect(QRectF(0, 0, scaled.width(), scaled.height()), 20, 20)
-
-            mask_painter = QPainter(mask)
-            mask_painter.fillPath(path, Qt.GlobalColor.color1)
-            mask_painter.end()
-
-            scaled.setMask(mask)
-            self.thumnbnail.setPixmap(scaled)
-            self.thumnbnail.setScaledContents(True)
+        # Превью предыдущего видео этой карточки больше не нужно
+        if self._thumbnail_request is not None:
+            self._thumbnail_request.cancel()
+        # Сразу показываем заглушку, превью декодируется в фоне (или берется из кэша)
+        self._thumbnail_request = set_thumbnail_async(
+            self.thumnbnail, variant_path(video_info, 'card'), 20, owner=self
+        )
 
     def set_duration(self, duration_seconds: int):
         if duration_seconds <= 0:
@@ -92,10 +95,13 @@ class HorizontalVideoLong(QWidget, Ui_video):
         
         # Откладываем отрисовку прогресса до полной инициализации виджета
         from PyQt6.QtCore import QTimer
-        QTimer.singleShot(0, lambda: self._update_progress(watch_duration, total_duration))
+        video_id = self.video_id
+        QTimer.singleShot(0, lambda: self._update_progress(watch_duration, total_duration, video_id))
     
-    def _update_progress(self, watch_duration: int, total_duration: int):
+    def _update_progress(self, watch_duration: int, total_duration: int, video_id: int = None):
         """Обновляет визуальный прогресс просмотра"""
+        if video_id is not None and video_id != self.video_id:
+            return  # Карточку уже переиспользовали для другого видео
         progress_percent = min(watch_duration / total_duration, 1.0)
         
         # Используем фиксированную ширину контейнера (246 пикселей из UI)
@@ -1,8 +1,7 @@
 from PyQt6.QtWidgets import QWidget
-from PyQt6.QtCore import Qt, QRectF
-from PyQt6.QtGui import QPixmap, QPainter, QPainterPath, QBitmap
 
 from ui.video_horizontal_ui import Ui_video
+from thumbnail_cache import get_rounded_thumbnail
 
 
 class HorizontalVideo(QWidget, Ui_video):
@@ -16,22 +15,8 @@ class HorizontalVideo(QWidget, Ui_video):
         self.views.setText(f"{views} просмотров")
         self.date.setText(date)
 
-        pixmap = QPixmap(thumbnail_path)
-        if not pixmap.isNull():
-            scaled = pixmap.scaled(
-                self.thumnbnail.size(), Qt.AspectRatioMode.KeepAspectRatioByExpanding,
-                Qt.TransformationMode.SmoothTransformation
-            )
-            mask = QBitmap(scaled.size())
-            mask.fill(Qt.GlobalColor.color0)
-
-            path = QPainterPath()
-            path.addRoundedRect(QRectF(0, 0, scaled.width(), scaled.height()), 20, 20)
-
-            mask_painter = QPainter(mask)
-            mask_painter.fillPath(path, Qt.GlobalColor.color1)
-            mask_painter.end()
-
-            scaled.setMask(mask)
-            self.thumnbnail.setPixmap(scaled)
+        # Превью из кэша: без повторного декодирования и скругления при каждом создании карточки
+        pixmap = get_rounded_thumbnail(thumbnail_path, self.thumnbnail.size(), 20)
+        if pixmap is not None:
+            self.thumnbnail.setPixmap(pixmap)
             self.thumnbnail.setScaledContents(True)
@@ -1,21 +1,36 @@
+import time
+
 from PyQt6.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout,
     QPushButton, QSlider, QLabel, QMenu,
-    QToolButton, QFrame
+    QToolButton, QFrame, QStyle
 )
-from PyQt6.QtCore import QUrl, Qt, QTimer, pyqtSignal, QSize, QEvent
+from PyQt6.QtCore import QUrl, Qt, QTimer, pyqtSignal, QSize, QEvent, QPoint
 from PyQt6.QtMultimedia import QMediaPlayer, QAudioOutput
 from PyQt6.QtMultimediaWidgets import QVideoWidget
 from PyQt6.QtGui import QAction, QActionGroup, QIcon, QPixmap, QKeyEvent
 
+from seek_previews import FRAME_SIZE, get_seek_preview_store
+from video_prefetch import get_video_prefetcher
+
 
 class VideoPlayerWithControls(QWidget):
     playClicked = pyqtSignal()
     pauseClicked = pyqtSignal()
+    firstFrameRendered = pyqtSignal(float)  # Время от load_video до первого кадра, мс
+
+    SLIDER_HANDLE_WIDTH = 12  # Ширина ручки progress_slider (см. стиль в setup_ui)
 
     def __init__(self, video_path: str = None, parent=None):
         super().__init__(parent)
         self.video_path = video_path
+        self.seek_sheet = None           # Лист кадров текущего видео (seek_previews.py)
+        self._seek_sheet_request = None
+        self._load_started = None        # Момент load_video, пока не показан первый кадр
+        self._pending_start = None       # Позиция старта (мс), применяется при LoadedMedia
+        self._start_keyframe = None      # (позиция старта, ее ключевой кадр), найденные в фоне
+        self._exact_start = None         # Позиция, примененная до ответа поиска ключевого кадра
+        self._keyframe_request = None
         self.setup_ui()
         self.setup_media_player()
         self.setup_connections()
@@ -221,6 +236,47 @@ class VideoPlayerWithControls(QWidget):
 
         layout.addWidget(self.control_panel)
 
+        self.setup_seek_preview()
+
+    def setup_seek_preview(self):
+        """Всплывающий кадр над ползунком прогресса при наведении и перетаскивании"""
+        self.seek_preview = QFrame(self)
+        self.seek_preview.setStyleSheet(
+            '''
+                QFrame {
+                    background: #f3dad4;
+                    border: 1px solid #ccc;
+                    border-radius: 6px;
+                }
+            '''
+        )
+        preview_layout = QVBoxLayout(self.seek_preview)
+        preview_layout.setContentsMargins(3, 3, 3, 2)
+        preview_layout.setSpacing(2)
+
+        self.seek_preview_image = QLabel()
+        self.seek_preview_image.setFixedSize(FRAME_SIZE)
+        self.seek_preview_image.setStyleSheet('border: none; border-radius: 4px;')
+        preview_layout.addWidget(self.seek_preview_image)
+
+        self.seek_preview_time = QLabel("00:00")
+        self.seek_preview_time.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        self.seek_preview_time.setStyleSheet(
+            '''
+                color: black;
+                font-size: 11px;
+                font-family: 'Segoe UI';
+                border: none;
+                background: transparent;
+            '''
+        )
+        preview_layout.addWidget(self.seek_preview_time)
+        self.seek_preview.adjustSize()
+        self.seek_preview.hide()
+
+        self.progress_slider.setMouseTracking(True)
+        self.progress_slider.installEventFilter(self)
+
     def setup_media_player(self):
         """Настраивает медиаплеер"""
         self.media_player = QMediaPlayer()
@@ -254,6 +310,7 @@ class VideoPlayerWithControls(QWidget):
         self.media_player.positionChanged.connect(self.update_position)
         self.media_player.durationChanged.connect(self.update_duration)
         self.media_player.playbackStateChanged.connect(self.update_play_button)
+        self.media_player.mediaStatusChanged.connect(self.on_media_status_changed)
 
         # Таймер UI
         self.ui_timer.timeout.connect(self.update_ui)
@@ -351,6 +408,7 @@ class VideoPlayerWithControls(QWidget):
 
     def slider_released(self):
         """Вызывается при отпускании слайдера прогресса - выполняем перемотку"""
+        self.seek_preview.hide()
         position = self.progress_slider.value()
         self.media_player.setPosition(position)
         self.ui_timer.start()  # Возобновляем автообновление
@@ -363,6 +421,9 @@ class VideoPlayerWithControls(QWidget):
         """Обрабатывает изменение значения слайдера без немедленной перемотки"""
         # Только обновляем время, но не перематываем
         self.current_time_label.setText(self.format_time(position))
+        if self.progress_slider.isSliderDown():
+            # Кадр берется из листа, декодер не перематывается до отпускания ползунка
+            self.show_seek_preview(position, self.slider_x_for_position(position))
 
         # Обновляем оставшееся время
         duration = self.media_player.duration()
@@ -370,12 +431,151 @@ class VideoPlayerWithControls(QWidget):
             remaining = duration - position
             self.remain_label.setText(f"-{self.format_time(remaining)}")
 
-    def load_video(self, video_path: str):
-        """Загружает видео из указанного пути"""
+    def load_video(self, video_path: str, start_ms: int = 0):
+        """
+        Загружает видео из указанного пути и запускает воспроизведение с позиции start_ms.
+        Позиция применяется один раз, когда медиа загружено (LoadedMedia), до первого кадра:
+        декодер не показывает начало видео и не перематывает повторно.
+        """
+        url = QUrl.fromLocalFile(video_path)
+        same_source = self.media_player.source() == url
         self.video_path = video_path
-        self.media_player.setSource(QUrl.fromLocalFile(video_path))
-        # Автоматически запускаем воспроизведение
-        QTimer.singleShot(100, self.play)
+        self._pending_start = max(0, int(start_ms))
+        self._exact_start = None
+        self.resolve_start_keyframe()
+        self.watch_first_frame()
+        self.media_player.setSource(url)
+        self.load_seek_sheet(video_path)
+        # Тот же файл плеер не загружает заново и LoadedMedia больше не придет
+        if same_source and self.media_player.mediaStatus() in (
+            QMediaPlayer.MediaStatus.LoadedMedia,
+            QMediaPlayer.MediaStatus.BufferedMedia,
+            QMediaPlayer.MediaStatus.EndOfMedia,
+        ):
+            if not self._pending_start:
+                self.media_player.setPosition(0)
+            self.start_pending()
+
+    def resolve_start_keyframe(self):
+        """Запускает фоновый поиск ключевого кадра для позиции старта"""
+        if self._keyframe_request is not None:
+            self._keyframe_request.cancel()
+            self._keyframe_request = None
+        self._start_keyframe = None
+        if self._pending_start:
+            self._keyframe_request = get_video_prefetcher().resolve_keyframe(
+                self.video_path, self._pending_start, self.on_start_keyframe_resolved, owner=self
+            )
+
+    def on_start_keyframe_resolved(self, start_ms, keyframe_ms):
+        self._keyframe_request = None
+        self._start_keyframe = (start_ms, keyframe_ms)
+        exact_start, self._exact_start = self._exact_start, None
+        if exact_start == start_ms and self._load_started is not None and keyframe_ms != start_ms:
+            # Медиа загрузилось раньше, чем прочитан индекс, но кадр еще не показан:
+            # перемотка на ключевой кадр избавляет декодер от кадров перед позицией
+            self.media_player.setPosition(keyframe_ms)
+
+    def on_media_status_changed(self, status):
+        """Запуск воспроизведения загруженного видео с ожидающей позиции"""
+        if status == QMediaPlayer.MediaStatus.InvalidMedia:
+            self._pending_start = None
+            return
+        if status == QMediaPlayer.MediaStatus.LoadedMedia:
+            self.start_pending()
+
+    def start_pending(self):
+        """Применяет ожидающую позицию старта и запускает воспроизведение"""
+        if self._pending_start is None:
+            return
+        start_ms, self._pending_start = self._pending_start, None
+        if start_ms > 0:
+            # С ключевого кадра первый кадр показывается без декодирования предшествующих.
+            # Если индекс еще не прочитан, ждать его не стоит — перемотка на точную позицию,
+            # а ключевой кадр применится при ответе, если первый кадр еще не показан
+            position_ms = start_ms
+            if self._start_keyframe is not None and self._start_keyframe[0] == start_ms:
+                position_ms = self._start_keyframe[1]
+            elif self._keyframe_request is not None:
+                self._exact_start = start_ms
+            self.media_player.setPosition(position_ms)
+        self.play()
+
+    def watch_first_frame(self):
+        """Подключает слот кадров для замера времени от load_video до первого кадра"""
+        if self._load_started is None:
+            self.video_widget.videoSink().videoFrameChanged.connect(self.on_video_frame)
+        self._load_started = time.perf_counter()
+
+    def unwatch_first_frame(self):
+        """Отключает слот кадров: после первого кадра он не нужен"""
+        if self._load_started is not None:
+            self._load_started = None
+            self.video_widget.videoSink().videoFrameChanged.disconnect(self.on_video_frame)
+
+    def on_video_frame(self, frame):
+        """Первый кадр после load_video — замер времени до первого кадра, затем слот отключается"""
+        if self._load_started is None or not frame.isValid():
+            return
+        elapsed_ms = (time.perf_counter() - self._load_started) * 1000
+        self._exact_start = None
+        self.unwatch_first_frame()
+        self.firstFrameRendered.emit(elapsed_ms)
+
+    # === ПРЕДПРОСМОТР ПЕРЕМОТКИ ===
+    def load_seek_sheet(self, video_path: str):
+        """Запрашивает лист кадров видео; до его готовности предпросмотр показывает только время"""
+        if self._seek_sheet_request is not None:
+            self._seek_sheet_request.cancel()
+        self.seek_sheet = None
+        self.seek_preview.hide()
+        self._seek_sheet_request = get_seek_preview_store().request(
+            video_path, self.on_seek_sheet_loaded, owner=self
+        )
+
+    def on_seek_sheet_loaded(self, sheet):
+        self._seek_sheet_request = None
+        self.seek_sheet = sheet
+
+    def slider_position_for_x(self, x: int) -> int:
+        """Позиция видео (мс) под точкой x ползунка"""
+        slider = self.progress_slider
+        return QStyle.sliderValueFromPosition(
+            slider.minimum(), slider.maximum(),
+            x - self.SLIDER_HANDLE_WIDTH // 2, max(1, slider.width() - self.SLIDER_HANDLE_WIDTH)
+        )
+
+    def slider_x_for_position(self, position: int) -> int:
+        slider = self.progress_slider
+        return QStyle.sliderPositionFromValue(
+            slider.minimum(), slider.maximum(),
+            position, max(1, slider.width() - self.SLIDER_HANDLE_WIDTH)
+        ) + self.SLIDER_HANDLE_WIDTH // 2
+
+    def show_seek_preview(self, position: int, slider_x: int):
+        """Показывает над ползунком кадр для позиции position"""
+        if self.media_player.duration() <= 0:
+            return
+        if self.seek_sheet is not None:
+            self.seek_preview_image.setPixmap(self.seek_sheet.frame_at(position))
+        self.seek_preview_image.setVisible(self.seek_sheet is not None)
+        self.seek_preview_time.setText(self.format_time(position))
+        self.seek_preview.adjustSize()
+
+        anchor = self.progress_slider.mapTo(self, QPoint(slider_x, 0))
+        x = min(max(0, anchor.x() - self.seek_preview.width() // 2), self.width() - self.seek_preview.width())
+        self.seek_preview.move(x, anchor.y() - self.seek_preview.height() - 6)
+        self.seek_preview.raise_()
+        self.seek_preview.show()
+
+    def eventFilter(self, obj, event):
+        if obj is self.progress_slider:
+            if event.type() == QEvent.Type.MouseMove and not self.progress_slider.isSliderDown():
+                x = int(event.position().x())
+                self.show_seek_preview(self.slider_position_for_x(x), x)
+            elif event.type() == QEvent.Type.Leave and not self.progress_slider.isSliderDown():
+                self.seek_preview.hide()
+        return super().eventFilter(obj, event)
 
     def play(self):
         """Начинает воспроизведение видео"""
@@ -463,6 +663,15 @@ class VideoPlayerWithControls(QWidget):
 
     def cleanup(self):
         """Очищает ресурсы"""
+        if self._seek_sheet_request is not None:
+            self._seek_sheet_request.cancel()
+            self._seek_sheet_request = None
+        if self._keyframe_request is not None:
+            self._keyframe_request.cancel()
+            self._keyframe_request = None
+        self._exact_start = None
+        self.unwatch_first_frame()
+        self.seek_preview.hide()
         self.stop()
         self.ui_timer.stop()
         self.media_player.setSource(QUrl())
@@ -473,6 +682,12 @@ class VideoPlayerWithControls(QWidget):
     
     def set_position(self, seconds: int):
         """Устанавливает позицию воспроизведения в секундах"""
+        if self._pending_start is not None:
+            # Видео еще загружается: позиция будет применена при LoadedMedia
+            self._pending_start = seconds * 1000
+            self.resolve_start_keyframe()
+            return
+        self._exact_start = None
         self.media_player.setPosition(seconds * 1000)
     
     def keyPressEvent(self, event: QKeyEvent):
@@ -7,6 +7,32 @@ from ui.video_profile_ui import Ui_Form
 from help import create_rounded_pixmap
 from db import Database
 from widgets.confirmation_dialog import ConfirmationDialog
+from async_db import AsyncDatabase
+
+
+def fetch_user_status(db: Database, video_id: int, user_id: int, channel_id: int):
+    """Подписка и оценка пользователя: (is_subscribed, like_status). Выполняется в фоновом потоке"""
+    if not user_id or not channel_id:
+        return False, None
+    is_subscribed = user_id != channel_id and db.is_subscribed(user_id, channel_id)
+    return is_subscribed, db.get_user_like_status(user_id, video_id)
+
+
+def fetch_video_profile(db: Database, video_id: int, user_id: int):
+    """Все данные для VideoProfileWidget одним фоновым запросом"""
+    video = db.get_video_info(video_id)
+    if not video:
+        return None
+    profile = db.get_video_profile_info(video_id)
+    if not profile:
+        return None
+    channel_id = db.get_channel_id_by_video(video_id)
+    return {
+        'video': video,
+        'profile': profile,
+        'channel_id': channel_id,
+        'status': fetch_user_status(db, video_id, user_id, channel_id),
+    }
 
 
 class VideoProfileWidget(QWidget, Ui_Form):
@@ -19,6 +45,12 @@ class VideoProfileWidget(QWidget, Ui_Form):
         self.video_id = video_id
         self.user_id = user_id
         self.channel_id = None
+        self.async_db = AsyncDatabase.of(db)
+        self._data_request = None    # Фоновый запрос данных видео
+        self._status_request = None  # Фоновый запрос статуса пользователя
+        self.is_liked = False
+        self.is_disliked = False
+        self.is_subscribed = False
         
         self.setupUi(self)
         
@@ -45,20 +77,42 @@ class VideoProfileWidget(QWidget, Ui_Form):
         self.load_data()
         
     def load_data(self):
+        """Запрашивает данные видео в фоновом потоке и показывает заглушку до их прихода"""
         if not self.video_id:
             return
-        video_data = self.db.get_video_info(self.video_id)
-        if not video_data:
-            return
-            
-        profile_info = self.db.get_video_profile_info(self.video_id)
-        if not profile_info:
+        
+        if self._data_request is not None:
+            self._data_request.cancel()
+        
+        self.show_placeholder()
+        self._data_request = self.async_db.call(
+            fetch_video_profile, self.db, self.video_id, self.user_id,
+            on_result=self.apply_data, owner=self
+        )
+    
+    def show_placeholder(self):
+        self.title.setText("Загрузка...")
+        self.nickname.setText("")
+        self.views.setText("")
+        self.date.setText("")
+        self.subscribers.setText("")
+        placeholder = QPixmap(50, 50)
+        placeholder.fill(QColor("#ccc"))
+        self.pfp.setPixmap(create_rounded_pixmap(placeholder, QSize(50, 50)))
+        self.pushButton.hide()
+    
+    def apply_data(self, data):
+        """Заполняет виджет данными, полученными из БД"""
+        self._data_request = None
+        if not data:
             return
-            
-        username, title, _, _, views_count, upload_date, _, _ = video_data
-        subscribers_count, likes_count, dislikes_count, pfp_path = profile_info
         
-        self.channel_id = self.db.get_channel_id_by_video(self.video_id)
+        video = data['video']
+        username, title = video['username'], video['title']
+        views_count, upload_date = video['views_count'], video['upload_date']
+        subscribers_count, likes_count, dislikes_count, pfp_path = data['profile']
+        
+        self.channel_id = data['channel_id']
         
         self.title.setText(title)
         self.nickname.setText(username)
@@ -75,49 +129,51 @@ class VideoProfileWidget(QWidget, Ui_Form):
             pixmap = QPixmap(pfp_path)
             rounded = create_rounded_pixmap(pixmap, QSize(50, 50))
             self.pfp.setPixmap(rounded)
-        else:
-            placeholder = QPixmap(50, 50)
-            placeholder.fill(QColor("#ccc"))
-            rounded_placeholder = create_rounded_pixmap(placeholder, QSize(50, 50))
-            self.pfp.setPixmap(rounded_placeholder)
 
-        self.load_user_status()
+        self.apply_user_status(data['status'])
         self.setup_like_dislike_buttons()
     
     def load_user_status(self):
-        if not self.user_id or not self.channel_id:
-            self.is_liked = False
-            self.is_disliked = False
-            self.is_subscribed = False
+        """Запрашивает подписку и оценку текущего пользователя в фоновом потоке"""
+        if self._status_request is not None:
+            self._status_request.cancel()
+        self._status_request = self.async_db.call(
+            fetch_user_status, self.db, self.video_id, self.user_id, self.channel_id,
+            on_result=self.on_user_status_loaded, owner=self
+        )
+    
+    def on_user_status_loaded(self, status):
+        self._status_request = None
+        self.apply_user_status(status)
+        self._update_button_styles()
+    
+    def apply_user_status(self, status):
+        is_subscribed, like_status = status
+        self.is_subscribed = is_subscribed
+        self.is_liked = like_status is True
+        self.is_disliked = like_status is False
+        
+        if not self.user_id or not self.channel_id or self.user_id == self.channel_id:
             self.pushButton.hide()
             return
         
-        if self.user_id == self.channel_id:
-            self.pushButton.hide()
-            self.is_subscribed = False
+        self.pushButton.show()
+        if self.is_subscribed:
+            self.pushButton.setText("Отписаться")
+            self.pushButton.setStyleSheet(
+                "background: #E0E0E0;"
+                "border: 1px solid #ccc;"
+                "border-radius: 15px;"
+                "color: #606060;"
+            )
         else:
-            self.pushButton.show()
-            self.is_subscribed = self.db.is_subscribed(self.user_id, self.channel_id)
-            if self.is_subscribed:
-                self.pushButton.setText("Отписаться")
-                self.pushButton.setStyleSheet(
-                    "background: #E0E0E0;"
-                    "border: 1px solid #ccc;"
-                    "border-radius: 15px;"
-                    "color: #606060;"
-                )
-            else:
-                self.pushButton.setText("Subscribe")
-                self.pushButton.setStyleSheet(
-                    "background: #FF6D6D;"
-                    "border: 1px solid #ccc;"
-                    "border-radius: 15px;"
-                    "color: white;"
-                )
-        
-        like_status = self.db.get_user_like_status(self.user_id, self.video_id)
-        self.is_liked = like_status is True
-        self.is_disliked = like_status is False
+            self.pushButton.setText("Subscribe")
+            self.pushButton.setStyleSheet(
+                "background: #FF6D6D;"
+                "border: 1px solid #ccc;"
+                "border-radius: 15px;"
+                "color: white;"
+            )
     
     def setup_like_dislike_buttons(self):
         self.like_btn.setIcon(self.like_icon)
@@ -241,5 +297,8 @@ class VideoProfileWidget(QWidget, Ui_Form):
     def set_user_id(self, user_id):
         """Обновляет user_id"""
         self.user_id = user_id
-        self.load_user_status()
-        self._update_button_styles()
+        if self._data_request is not None:
+            # Данные видео еще загружаются — перезапрашиваем их вместе со статусом нового пользователя
+            self.load_data()
+        else:
+            self.load_user_status()
@@ -1,51 +1,50 @@
 # video_tile_widget.py
-from PyQt6.QtCore import Qt, QRectF, pyqtSignal
-from PyQt6.QtGui import QPixmap, QBitmap, QPainterPath, QPainter
+from PyQt6.QtCore import pyqtSignal
 from PyQt6.QtWidgets import QWidget
 
 from ui.video_ui import Ui_video
 from db import Database
+from thumbnail_cache import set_thumbnail_async
+from thumbnail_variants import variant_path
 
 class VideoTileWidget(QWidget, Ui_video):
     videoClicked = pyqtSignal(int)  # Сигнал при клике на видео
     
-    def __init__(self, db: Database, video_id: int, parent=None):
+    def __init__(self, db: Database, video_id: int = None, video_info=None, parent=None):
         super().__init__(parent)
         self.db = db
         self.video_id = video_id
+        self._thumbnail_request = None
         self.setupUi(self)
         self.setFixedSize(330, 226)
 
-        video_info = self.db.get_video_info(video_id)
-        if not video_info:
-            return
-
-        username, title, _, _, views_count, upload_date, thumbnail, duration = video_info
-            
-        self.title.setText(title)
-        self.nickname.setText(username)
-        self.views.setText(f"{views_count} просмотров")
-        self.date.setText(upload_date)
+        if video_id is None:
+            return  # Пустая карточка, данные придут через bind()
 
-        self.set_duration(duration)
+        # Данные карточки обычно приходят из списка (get_videos_info_bulk / with_info=True)
+        if video_info is None:
+            video_info = self.db.get_video_info(video_id)
+        if video_info:
+            self.bind(video_info, video_id)
 
-        pixmap = QPixmap(thumbnail)
-        if not pixmap.isNull():
-            scaled = pixmap.scaled(self.thumnbnail.size(), Qt.AspectRatioMode.KeepAspectRatioByExpanding,
-                                   Qt.TransformationMode.SmoothTransformation)
-            mask = QBitmap(scaled.size())
-            mask.fill(Qt.GlobalColor.color0)
+    def bind(self, video_info, video_id: int = None):
+        """Заполняет карточку данными видео (карточки переиспользуются при прокрутке ленты)"""
+        self.video_id = video_id if video_id is not None else video_info['id']
 
-            path = QPainterPath()
-            path.addRoundedRect(QRectF(0, 0, scaled.width(), scaled.height()), 20, 20)
+        self.title.setText(video_info['title'])
+        self.nickname.setText(video_info['username'])
+        self.views.setText(f"{video_info['views_count']} просмотров")
+        self.date.setText(video_info['upload_date'])
 
-            mask_painter = QPainter(mask)
-            mask_painter.fillPath(path, Qt.GlobalColor.color1)
-            mask_painter.end()
+        self.set_duration(video_info['duration'])
 
-            scaled.setMask(mask)
-            self.thumnbnail.setPixmap(scaled)
-            self.thumnbnail.setScaledContents(True)
+        # Превью предыдущего видео этой карточки больше не нужно
+        if self._thumbnail_request is not None:
+            self._thumbnail_request.cancel()
+        # Сразу показываем заглушку, превью декодируется в фоне (или берется из кэша)
+        self._thumbnail_request = set_thumbnail_async(
+            self.thumnbnail, variant_path(video_info, 'tile'), 20, owner=self
+        )
 
     def set_duration(self, duration_seconds: int):
         if duration_seconds <= 0:
@@ -0,0 +1,62 @@
+from PyQt6.QtWidgets import QWidget
+
+
+class WidgetPool:
+    """
+    Пул переиспользуемых виджетов одного типа.
+    Вместо удаления и повторного создания (setupUi, разбор стилей, дочерние виджеты)
+    виджет возвращается в пул и при следующем показе заполняется новыми данными через bind().
+    """
+
+    def __init__(self, factory, max_size: int = 64):
+        self.factory = factory      # Создает новый виджет, когда свободных нет
+        self.max_size = max_size    # Сколько свободных виджетов хранить
+        self._free = []
+
+        # Статистика
+        self.created = 0
+        self.reused = 0
+
+    def acquire(self, parent: QWidget = None) -> QWidget:
+        """Возвращает свободный виджет из пула или создает новый"""
+        if self._free:
+            widget = self._free.pop()
+            self.reused += 1
+        else:
+            widget = self.factory()
+            self.created += 1
+        if parent is not None and widget.parent() is not parent:
+            widget.setParent(parent)
+        return widget
+
+    def release(self, widget: QWidget, detach: bool = False):
+        """
+        Скрывает виджет и возвращает его в пул.
+        detach=True отвязывает его от родителя — нужно, если родитель сейчас будет удален.
+        """
+        widget.hide()
+        if len(self._free) >= self.max_size:
+            widget.setParent(None)
+            widget.deleteLater()
+            return
+        if detach:
+            widget.setParent(None)
+        self._free.append(widget)
+
+    def release_from_layout(self, layout, widget_type, detach: bool = False):
+        """Вынимает из layout все виджеты типа widget_type и возвращает их в пул"""
+        for i in reversed(range(layout.count())):
+            widget = layout.itemAt(i).widget()
+            if isinstance(widget, widget_type):
+                layout.takeAt(i)
+                self.release(widget, detach=detach)
+
+    def clear(self):
+        """Удаляет все свободные виджеты"""
+        for widget in self._free:
+            widget.setParent(None)
+            widget.deleteLater()
+        self._free.clear()
+
+    def stats(self) -> dict:
+        return {'free': len(self._free), 'created': self.created, 'reused': self.reused}
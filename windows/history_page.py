@@ -3,9 +3,12 @@ from PyQt6.QtCore import Qt, pyqtSignal
 from datetime import datetime, timedelta
 
 from widgets.long_video_block_widget import LongVideoBlock
+from widgets.video_horizontal_long_widget import HorizontalVideoLong
+from widgets.widget_pool import WidgetPool
 from windows.base_page import BasePage
 from help import apply_scroll_style
 from db import Database
+from async_db import AsyncDatabase
 
 
 class HistoryPage(BasePage):
@@ -13,9 +16,18 @@ class HistoryPage(BasePage):
     
     def __init__(self, db: Database, user_id: int = None, page='history'):
         self.db = db
+        self.async_db = AsyncDatabase.of(db)
         self.user_id = user_id
+        self._history_request = None  # Текущий фоновый запрос истории
+        # Карточки видео переживают refresh и поиск: блоки дат пересоздаются, карточки — нет
+        self.video_pool = WidgetPool(self.create_video_widget, max_size=100)
         super().__init__(page)
 
+    def create_video_widget(self) -> HorizontalVideoLong:
+        video_widget = HorizontalVideoLong(self.db, can_delete=False)
+        video_widget.videoClicked.connect(self.videoClicked.emit)
+        return video_widget
+
     def create_content_widget(self):
         scroll_area = QScrollArea()
         scroll_area.setWidgetResizable(True)
@@ -59,8 +71,24 @@ class HistoryPage(BasePage):
         )
         self.empty_label.hide()
 
+        # Заглушка на время загрузки истории
+        self.loading_label = QLabel("Загрузка...")
+        self.loading_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        self.loading_label.setStyleSheet(
+            """
+            font-family: 'Segoe UI';
+            font-size: 24px;
+            color: #888888;
+            border: none;
+            background: transparent;
+            padding: 50px;
+            """
+        )
+        self.loading_label.hide()
+
         self.container_layout.addWidget(self.auth_required_label)
         self.container_layout.addWidget(self.empty_label)
+        self.container_layout.addWidget(self.loading_label)
         # Добавляем stretch в конец, чтобы блоки не распределялись равномерно
         self.container_layout.addStretch()
         scroll_area.setWidget(self.container)
@@ -83,9 +111,9 @@ class HistoryPage(BasePage):
             self.empty_label.hide()
         if self.auth_required_label.isVisible():
             self.auth_required_label.hide()
+        self.loading_label.hide()
 
-        date_block = LongVideoBlock(self.db, date, videos_data)
-        date_block.videoClicked.connect(self.videoClicked.emit)
+        date_block = LongVideoBlock(self.db, date, videos_data, pool=self.video_pool)
         # Добавляем блок перед stretch (в позицию count-1)
         insert_pos = max(0, self.container_layout.count() - 1)
         self.container_layout.insertWidget(insert_pos, date_block)
@@ -96,8 +124,11 @@ class HistoryPage(BasePage):
             item = self.container_layout.itemAt(i)
             if item:
                 widget = item.widget()
-                if widget and widget != self.empty_label and widget != self.auth_required_label:
+                if widget and widget not in (self.empty_label, self.auth_required_label, self.loading_label):
+                    if isinstance(widget, LongVideoBlock):
+                        widget.release_videos()
                     widget.deleteLater()
+        self.loading_label.hide()
         
         # Показываем соответствующую заглушку
         if not self.user_id:
@@ -107,22 +138,58 @@ class HistoryPage(BasePage):
             self.empty_label.show()
             self.auth_required_label.hide()
 
+    def show_loading(self):
+        """Показывает заглушку загрузки, пока запрос выполняется в фоне"""
+        self.empty_label.hide()
+        self.auth_required_label.hide()
+        self.loading_label.show()
+
+    def cancel_history_request(self):
+        """Отменяет незавершенный фоновый запрос, чтобы устаревший результат не попал на страницу"""
+        if self._history_request is not None:
+            self._history_request.cancel()
+            self._history_request = None
+
+    def request_history(self, method: str, *args):
+        """Запускает фоновый запрос истории, отменяя предыдущий незавершенный"""
+        self.cancel_history_request()
+        self.show_loading()
+        db = self.db
+        fetch = getattr(db, method)
+
+        def flush_and_fetch():
+            # Отложенные записи истории сохраняются в фоновом потоке, перед самим запросом
+            db.flush()
+            return fetch(*args)
+
+        self._history_request = self.async_db.call(
+            flush_and_fetch, on_result=self.show_history, on_error=self.on_history_error, owner=self
+        )
+
     def load_history_data(self):
-        """Загружает реальную историю из БД"""
+        """Загружает реальную историю из БД в фоновом потоке"""
         if not self.user_id:
+            self.cancel_history_request()
             self.auth_required_label.show()
             self.empty_label.hide()
             return
         
-        history = self.db.get_user_history(self.user_id)
+        self.request_history('get_user_history', self.user_id)
+
+    def on_history_error(self, message: str):
+        self._history_request = None
+        self.loading_label.hide()
+        self.empty_label.show()
+
+    def show_history(self, history):
+        """Группирует записи истории по датам и показывает блоки"""
+        self._history_request = None
+        self.loading_label.hide()
         if not history:
             self.empty_label.show()
             self.auth_required_label.hide()
             return
         
-        # Группируем по датам
-        from datetime import datetime, timedelta
-        
         today = datetime.now().date()
         yesterday = today - timedelta(days=1)
         week_ago = today - timedelta(days=7)
@@ -145,14 +212,15 @@ class HistoryPage(BasePage):
             except:
                 watched_date = today
             
+            # Строка истории уже содержит данные карточки (v.*, u.username)
             if watched_date == today:
-                grouped["Today"].append((video_id, watch_duration))
+                grouped["Today"].append((video_id, watch_duration, row))
             elif watched_date == yesterday:
-                grouped["Yesterday"].append((video_id, watch_duration))
+                grouped["Yesterday"].append((video_id, watch_duration, row))
             elif watched_date >= week_ago:
-                grouped["Last Week"].append((video_id, watch_duration))
+                grouped["Last Week"].append((video_id, watch_duration, row))
             else:
-                grouped["Earlier"].append((video_id, watch_duration))
+                grouped["Earlier"].append((video_id, watch_duration, row))
         
         # Добавляем блоки с видео
         for date_label, videos in grouped.items():
@@ -173,6 +241,7 @@ class HistoryPage(BasePage):
         self.clear_history()
         
         if not self.user_id:
+            self.cancel_history_request()
             self.auth_required_label.show()
             self.empty_label.hide()
             return
@@ -183,44 +252,4 @@ class HistoryPage(BasePage):
             return
         
         # Выполняем поиск
-        history = self.db.search_user_history(self.user_id, query)
-        if not history:
-            self.empty_label.show()
-            self.auth_required_label.hide()
-            return
-        
-        today = datetime.now().date()
-        yesterday = today - timedelta(days=1)
-        week_ago = today - timedelta(days=7)
-        
-        grouped = {
-            "Today": [],
-            "Yesterday": [],
-            "Last Week": [],
-            "Earlier": []
-        }
-        
-        for row in history:
-            video_id = row['video_id']
-            watch_duration = row['watch_duration'] or 0
-            watched_at = row['watched_at']
-            
-            # Преобразуем строку в datetime
-            try:
-                watched_date = datetime.strptime(watched_at.split()[0], '%Y-%m-%d').date()
-            except:
-                watched_date = today
-            
-            if watched_date == today:
-                grouped["Today"].append((video_id, watch_duration))
-            elif watched_date == yesterday:
-                grouped["Yesterday"].append((video_id, watch_duration))
-            elif watched_date >= week_ago:
-                grouped["Last Week"].append((video_id, watch_duration))
-            else:
-                grouped["Earlier"].append((video_id, watch_duration))
-        
-        # Добавляем блоки с видео
-        for date_label, videos in grouped.items():
-            if videos:
-                self.add_date_block(date_label, videos)
+        self.request_history('search_user_history', self.user_id, query)
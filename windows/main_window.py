@@ -1,16 +1,29 @@
 from PyQt6.QtWidgets import QMainWindow, QStackedWidget
 from PyQt6.QtCore import QTimer
+from typing import TYPE_CHECKING
+
 from windows.main_page import MainPage
-from windows.history_page import HistoryPage
-from windows.profile_page import ProfilePage
-from windows.video_view_page import VideoViewPage
 from db import Database
+from startup_timing import StartupTimer
+from video_prefetch import get_video_prefetcher
+
+if TYPE_CHECKING:
+    from windows.history_page import HistoryPage
+    from windows.profile_page import ProfilePage
+    from windows.video_view_page import VideoViewPage
 
 class MainWindow(QMainWindow):
-    def __init__(self, db: Database):
+    # Страницы, которые создаются заранее в простое после первой отрисовки ленты
+    PREWARM_PAGES = ('history', 'profile', 'video')
+    PREWARM_DELAY_MS = 200  # Пауза между созданием страниц, чтобы не блокировать ввод
+    PREFETCH_NEXT_VIDEOS = 3  # Сколько следующих видео ленты готовить заранее
+
+    def __init__(self, db: Database, startup_timer: StartupTimer = None, prewarm: bool = True):
         super().__init__()
         self.db = db
         self.current_user_id = None
+        self.startup_timer = startup_timer
+        self.prewarm = prewarm
         self.setWindowTitle("Video Platform")
         self.setFixedSize(1201, 897)
 
@@ -18,83 +31,195 @@ class MainWindow(QMainWindow):
         self.stacked_widget = QStackedWidget()
         self.setCentralWidget(self.stacked_widget)
 
-        # Создаем страницы
-        self.main_page = MainPage(db, self.current_user_id)
-        self.history_page = HistoryPage(db, self.current_user_id)
-        self.profile_page = ProfilePage(db, self.current_user_id)
-        self.video_view_page = VideoViewPage(db, self.current_user_id)
-
-        # Добавляем страницы в stacked widget
-        self.stacked_widget.addWidget(self.main_page)
-        self.stacked_widget.addWidget(self.history_page)
-        self.stacked_widget.addWidget(self.profile_page)
-        self.stacked_widget.addWidget(self.video_view_page)
-
-        # Подключаем сигналы
-        self.main_page.menu_widget.pageChanged.connect(self.switch_page)
-        self.history_page.menu_widget.pageChanged.connect(self.switch_page)
-        self.profile_page.menu_widget.pageChanged.connect(self.switch_page)
-        self.video_view_page.menu_widget.pageChanged.connect(self.switch_page)
-        
-        self.main_page.openVideoRequested.connect(lambda vid: self.open_video(vid, 0))
-        self.history_page.videoClicked.connect(self.open_video)
-        
-        self.profile_page.loggedIn.connect(self.handle_login)
-        self.profile_page.loggedOut.connect(self.handle_logout)
-        
-        self.video_view_page.userProfileRequested.connect(self.view_user_profile)
-        
+        # Страницы создаются при первом переходе на них (или заранее в простое)
+        self.page_factories = {
+            'main': self.create_main_page,
+            'history': self.create_history_page,
+            'profile': self.create_profile_page,
+            'video': self.create_video_view_page,
+        }
+        self.pages = {}
+        self._prewarm_queue = []
+
         # Таймер для засчитывания просмотра
         self.view_timer = QTimer()
         self.view_timer.setSingleShot(True)
         self.view_timer.timeout.connect(self.record_view)
         self.current_video_id = None
 
+        # Подготовка вероятных следующих видео и замер времени до первого кадра
+        self.prefetcher = get_video_prefetcher()
+        self._opened_warm = False
+
+        # При запуске нужна только лента
+        self.stacked_widget.setCurrentWidget(self.get_page('main'))
+
+    # === РЕЕСТР СТРАНИЦ ===
+    def get_page(self, name: str):
+        """Возвращает страницу, создавая ее при первом обращении"""
+        page = self.pages.get(name)
+        if page is None:
+            page = self.page_factories[name]()
+            page.menu_widget.pageChanged.connect(self.switch_page)
+            self.stacked_widget.addWidget(page)
+            self.pages[name] = page
+        return page
+
+    def create_main_page(self):
+        main_page = MainPage(self.db, self.current_user_id)
+        main_page.openVideoRequested.connect(lambda vid: self.open_video(vid, 0))
+        main_page.video_container.pageLoaded.connect(self.on_feed_loaded)
+        return main_page
+
+    # Модули остальных страниц импортируются вместе с их созданием:
+    # страница видео тянет QtMultimedia, профиль — виджеты загрузки видео
+    def create_history_page(self):
+        from windows.history_page import HistoryPage
+        history_page = HistoryPage(self.db, self.current_user_id)
+        history_page.videoClicked.connect(self.open_video)
+        return history_page
+
+    def create_profile_page(self):
+        from windows.profile_page import ProfilePage
+        profile_page = ProfilePage(self.db, self.current_user_id)
+        profile_page.loggedIn.connect(self.handle_login)
+        profile_page.loggedOut.connect(self.handle_logout)
+        return profile_page
+
+    def create_video_view_page(self):
+        from windows.video_view_page import VideoViewPage
+        video_view_page = VideoViewPage(self.db, self.current_user_id)
+        video_view_page.userProfileRequested.connect(self.view_user_profile)
+        video_view_page.video_player.firstFrameRendered.connect(self.on_first_frame)
+        return video_view_page
+
+    @property
+    def main_page(self) -> MainPage:
+        return self.get_page('main')
+
+    @property
+    def history_page(self) -> 'HistoryPage':
+        return self.get_page('history')
+
+    @property
+    def profile_page(self) -> 'ProfilePage':
+        return self.get_page('profile')
+
+    @property
+    def video_view_page(self) -> 'VideoViewPage':
+        return self.get_page('video')
+
+    def is_current_page(self, name: str) -> bool:
+        page = self.pages.get(name)
+        return page is not None and self.stacked_widget.currentWidget() is page
+
+    # === ЗАПУСК ===
+    def paintEvent(self, event):
+        super().paintEvent(event)
+        if self.startup_timer is not None:
+            self.startup_timer.mark('первый кадр')
+
+    def on_feed_loaded(self, count: int):
+        """Лента показала первую страницу — можно в простое готовить остальные страницы"""
+        if self.startup_timer is not None:
+            self.startup_timer.mark('лента заполнена')
+        if count <= self.main_page.video_container.PAGE_SIZE:
+            # Первая страница ленты: скорее всего откроют одно из верхних видео
+            self.prefetch_next_videos()
+        if not self.prewarm or self._prewarm_queue:
+            return
+        self._prewarm_queue = [name for name in self.PREWARM_PAGES if name not in self.pages]
+        if self._prewarm_queue:
+            QTimer.singleShot(self.PREWARM_DELAY_MS, self.prewarm_next_page)
+
+    def prewarm_next_page(self):
+        """Создает по одной странице за раз, возвращая управление циклу событий между ними"""
+        while self._prewarm_queue:
+            name = self._prewarm_queue.pop(0)
+            if name not in self.pages:
+                self.get_page(name)
+                break
+        if self._prewarm_queue:
+            QTimer.singleShot(self.PREWARM_DELAY_MS, self.prewarm_next_page)
+        elif self.startup_timer is not None:
+            self.startup_timer.mark('страницы подготовлены')
+
+    # === ПОДГОТОВКА ВИДЕО ===
+    def prefetch_next_videos(self, after_video_id=None):
+        """
+        Готовит видео, которые вероятно откроют следующими: идущие в ленте рекомендаций
+        после after_video_id (или первые в ленте)
+        """
+        feed = self.main_page.video_container.videos
+        start = 0
+        if after_video_id is not None:
+            for index, video_info in enumerate(feed):
+                if video_info['id'] == after_video_id:
+                    start = index + 1
+                    break
+        upcoming = feed[start:start + self.PREFETCH_NEXT_VIDEOS]
+        self.prefetcher.prefetch([video_info['video_path'] for video_info in upcoming])
+
+    def on_first_frame(self, elapsed_ms):
+        """Время до первого кадра — в статистику подготовки (VideoPrefetcher.stats())"""
+        self.prefetcher.record_open(elapsed_ms, self._opened_warm)
+
+    # === НАВИГАЦИЯ ===
+    def save_watch_position(self):
+        """Сохраняет время просмотра текущего видео"""
+        if self.current_video_id and self.current_user_id:
+            current_position = self.video_view_page.get_current_position()
+            # Проверяем на None и заменяем на 0
+            if current_position is None:
+                current_position = 0
+            self.db.queue_watch_history(self.current_user_id, self.current_video_id, current_position)
+
     def switch_page(self, page):
         # При уходе со страницы видео сохраняем время просмотра
-        current_widget = self.stacked_widget.currentWidget()
-        if current_widget == self.video_view_page and page != 'video':
-            if self.current_video_id and self.current_user_id:
-                current_position = self.video_view_page.get_current_position()
-                # Проверяем на None и заменяем на 0
-                if current_position is None:
-                    current_position = 0
-                self.db.add_to_watch_history(self.current_user_id, self.current_video_id, current_position)
+        if self.is_current_page('video') and page != 'video':
+            self.save_watch_position()
+            # Позиция записывается в фоне сразу, а не через интервал буфера: переход не ждет БД
+            self.db.request_flush()
             # Останавливаем таймер просмотра
             if self.view_timer.isActive():
                 self.view_timer.stop()
-        
-        pages_indexes = {
-            'main': 0,
-            'history': 1,
-            'profile': 2,
-            'video': 3
-        }
-        if page in pages_indexes:
+
+        if page in self.page_factories:
             if page == 'profile' and self.current_user_id:
                 self.profile_page.view_my_profile()
-            self.stacked_widget.setCurrentIndex(pages_indexes[page])
-        
+            self.stacked_widget.setCurrentWidget(self.get_page(page))
+
     def open_video(self, video_id, watch_duration=0):
         if self.view_timer.isActive():
             self.view_timer.stop()
-        
+
         self.video_view_page.set_video_data(video_id, watch_duration)
-        self.stacked_widget.setCurrentIndex(3)
-        
+        # Было ли открытое видео подготовлено заранее — для статистики времени до первого кадра
+        self._opened_warm = self.prefetcher.is_warm(self.video_view_page.video_player.video_path or '')
+        self.stacked_widget.setCurrentWidget(self.video_view_page)
+
         self.current_video_id = video_id
-        
+
         if self.current_user_id:
-            self.db.add_to_watch_history(self.current_user_id, video_id, watch_duration)
-        
+            self.db.queue_watch_history(self.current_user_id, video_id, watch_duration)
+
         self.view_timer.start(7000)
-    
+        # Пока смотрят это видео, готовим следующие по ленте
+        self.prefetch_next_videos(video_id)
+
     def record_view(self):
         if self.current_video_id:
-            self.db.increment_views(self.current_video_id)
-            
+            self.db.queue_view(self.current_video_id)
+
             if self.current_user_id:
-                self.db.update_preference_on_watch(self.current_user_id, self.current_video_id)
+                self.db.queue_preference_on_watch(self.current_user_id, self.current_video_id)
+
+    def closeEvent(self, event):
+        # Сохраняем позицию просмотра и записываем все отложенные изменения перед выходом
+        if self.is_current_page('video'):
+            self.save_watch_position()
+        self.db.flush()
+        super().closeEvent(event)
 
     def refresh_current_page(self):
         current_page = self.stacked_widget.currentWidget()
@@ -102,18 +227,15 @@ class MainWindow(QMainWindow):
 
     def handle_login(self, user_id):
         self.current_user_id = user_id
-        self.main_page.set_user_id(user_id)
-        self.profile_page.set_user_id(user_id)
-        self.history_page.set_user_id(user_id)
-        self.video_view_page.set_user_id(user_id)
+        # Еще не созданные страницы получат user_id при создании
+        for page in self.pages.values():
+            page.set_user_id(user_id)
 
     def handle_logout(self):
         self.current_user_id = None
-        self.main_page.set_user_id(None)
-        self.profile_page.set_user_id(None)
-        self.history_page.set_user_id(None)
-        self.video_view_page.set_user_id(None)
-    
+        for page in self.pages.values():
+            page.set_user_id(None)
+
     def view_user_profile(self, user_id):
         self.profile_page.view_user_profile(user_id)
-        self.stacked_widget.setCurrentIndex(2)
+        self.stacked_widget.setCurrentWidget(self.profile_page)
@@ -152,13 +152,10 @@ class VideoViewPage(BasePage):
         if video_data is None:
             return
         
-        _, _, video_path, description, _, _, _, _ = video_data
+        video_path, description = video_data['video_path'], video_data['description']
         
-        self.video_player.load_video(video_path)
-        
-        # Восстанавливаем время просмотра, если есть
-        if watch_duration > 0:
-            self.video_player.set_position(watch_duration)
+        # Время просмотра восстанавливается при загрузке, без перемотки после старта
+        self.video_player.load_video(video_path, start_ms=max(0, watch_duration) * 1000)
         
         self.video_profile.set_video_id(video_id)
         
@@ -0,0 +1,166 @@
+import atexit
+import datetime
+import threading
+import time
+from collections import Counter
+
+
+class WriteBehindBuffer:
+    """
+    Буфер отложенной записи для частых мелких изменений: просмотры, записи истории
+    и прирост предпочтений. Изменения копятся в памяти и сбрасываются в БД
+    одной транзакцией раз в flush_interval_ms, по явному flush() или request_flush()
+    и при выходе из программы.
+    """
+
+    def __init__(self, db, flush_interval_ms: int = 1000):
+        self.db = db
+        self.flush_interval_ms = flush_interval_ms
+
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._views = Counter()          # video_id -> прирост просмотров
+        self._history = {}               # (user_id, video_id) -> (watch_duration, watched_at)
+        self._preferences = []           # (user_id, video_id, score_delta) в порядке поступления
+
+        self._stop_event = threading.Event()
+        self._wake_event = threading.Event()   # Будит фоновый поток раньше интервала
+        self._thread = None
+        self._closed = False
+
+        # Метрики
+        self.flush_count = 0
+        self.failed_flushes = 0
+        self.flushed_items = 0
+        self.last_flush_ms = 0.0
+        self.max_flush_ms = 0.0
+        self._total_flush_ms = 0.0
+
+        atexit.register(self.close)
+
+    # === ПОСТАНОВКА В ОЧЕРЕДЬ ===
+    def add_view(self, video_id: int):
+        """Засчитывает просмотр видео"""
+        with self._lock:
+            self._views[video_id] += 1
+        self._ensure_started()
+
+    def add_history(self, user_id: int, video_id: int, watch_duration: int = 0):
+        """Добавляет или обновляет запись истории (сохраняется последняя позиция просмотра)"""
+        # Время фиксируем в момент события, в формате datetime('now') SQLite (UTC)
+        watched_at = datetime.datetime.now(datetime.timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+        with self._lock:
+            self._history[(user_id, video_id)] = (watch_duration or 0, watched_at)
+        self._ensure_started()
+
+    def add_preference(self, user_id: int, video_id: int, score_delta: float):
+        """Изменяет предпочтение пользователя для категории видео"""
+        with self._lock:
+            self._preferences.append((user_id, video_id, score_delta))
+        self._ensure_started()
+
+    def pending(self) -> int:
+        """Глубина очереди: число еще не записанных изменений"""
+        with self._lock:
+            return len(self._views) + len(self._history) + len(self._preferences)
+
+    # === ЗАПИСЬ В БД ===
+    def flush(self) -> int:
+        """Записывает накопленные изменения одной транзакцией, возвращает их количество"""
+        with self._flush_lock:
+            with self._lock:
+                views, self._views = self._views, Counter()
+                history, self._history = self._history, {}
+                preferences, self._preferences = self._preferences, []
+
+            count = len(views) + len(history) + len(preferences)
+            if not count:
+                return 0
+
+            started = time.perf_counter()
+            try:
+                self.db.apply_buffered_writes(views, history, preferences)
+            except Exception:
+                self.failed_flushes += 1
+                self._requeue(views, history, preferences)
+                raise
+
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            self.flush_count += 1
+            self.flushed_items += count
+            self.last_flush_ms = elapsed_ms
+            self.max_flush_ms = max(self.max_flush_ms, elapsed_ms)
+            self._total_flush_ms += elapsed_ms
+            return count
+
+    def request_flush(self):
+        """Просит фоновый поток записать изменения сейчас, не дожидаясь интервала (не блокирует)"""
+        self._ensure_started()
+        self._wake_event.set()
+
+    def _requeue(self, views, history, preferences):
+        # Возвращаем несохраненные изменения в начало очереди, более новые записи истории важнее
+        with self._lock:
+            views.update(self._views)
+            self._views = views
+            history.update(self._history)
+            self._history = history
+            self._preferences = preferences + self._preferences
+
+    def metrics(self) -> dict:
+        """Метрики буфера: глубина очереди и задержки сброса"""
+        return {
+            'queue_depth': self.pending(),
+            'flush_count': self.flush_count,
+            'failed_flushes': self.failed_flushes,
+            'flushed_items': self.flushed_items,
+            'last_flush_ms': self.last_flush_ms,
+            'avg_flush_ms': self._total_flush_ms / self.flush_count if self.flush_count else 0.0,
+            'max_flush_ms': self.max_flush_ms,
+        }
+
+    # === ФОНОВЫЙ СБРОС ===
+    def start(self):
+        """Запускает фоновый поток, не дожидаясь первого изменения"""
+        self._ensure_started()
+
+    def _ensure_started(self):
+        if self._thread is not None or self._closed:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='write-behind', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wake_event.wait(self.flush_interval_ms / 1000)
+            self._wake_event.clear()
+            if self._stop_event.is_set():
+                break
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"Ошибка при записи отложенных изменений: {e}")
+            # Обслуживание WAL в этом же фоновом потоке, а не в GUI
+            try:
+                self.db.checkpoint_if_due()
+            except Exception as e:
+                print(f"Ошибка checkpoint: {e}")
+            # Пересчет рейтинга по дате загрузки — здесь же, а не при чтении рекомендаций
+            try:
+                self.db.refresh_recency_if_due()
+            except Exception as e:
+                print(f"Ошибка пересчета актуальности: {e}")
+        self.db.release_connection()
+
+    def close(self):
+        """Останавливает фоновый поток и записывает оставшиеся изменения"""
+        if self._closed:
+            return
+        self._closed = True
+        self._stop_event.set()
+        self._wake_event.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.flush()